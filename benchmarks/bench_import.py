@@ -0,0 +1,74 @@
+"""Startup cost: where `import main` spends its time, and what the warm-up costs.
+
+    python -m benchmarks.bench_import [top_n]
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter. Reports
+cumulative import time per top-level package and per downloaders module
+(self time only, since downloaders modules import each other), plus the
+slowest individual modules. A second fresh interpreter times the
+background warm-up (downloaders.warmup) step by step. Prints one JSON
+object.
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WARMUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+from downloaders import warmup
+warmup.warmup.run()
+print(json.dumps({"import_ms": round(imported * 1000, 1), **warmup.warmup.stats()}))
+"""
+
+
+def parse_importtime(stderr: str):
+    """[(module, self_us, cumulative_us, depth)] in the order -X importtime prints them"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main():
+    top_n = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = parse_importtime(proc.stderr)
+
+    packages, own = {}, {}
+    for name, self_us, cumulative_us, depth in rows:
+        top = name.split(".")[0]
+        packages[top] = packages.get(top, 0) + self_us
+        if top in ("downloaders", "main"):
+            own[name] = self_us
+    total_us = next((cumulative_us for name, _, cumulative_us, _ in rows if name == "main"), 0)
+
+    def ms(us):
+        return round(us / 1000, 1)
+
+    warm = subprocess.run([sys.executable, "-c", WARMUP_SCRIPT], cwd=ROOT, capture_output=True, text=True)
+    report = {
+        "import_main_ms": ms(total_us),
+        "by_package_ms": {k: ms(v) for k, v in sorted(packages.items(), key=lambda kv: -kv[1])[:top_n]},
+        "downloaders_self_ms": {k: ms(v) for k, v in sorted(own.items(), key=lambda kv: -kv[1])},
+        "slowest_modules_ms": [{"module": name, "cumulative_ms": ms(cum), "self_ms": ms(own_us)}
+                               for name, own_us, cum, _ in sorted(rows, key=lambda r: -r[2])[:top_n]],
+        "heavy_loaded_at_import": [m for m in ("yt_dlp", "requests", "httpx", "ffmpeg", "bs4") if m in packages],
+        "warmup": json.loads(warm.stdout.strip().splitlines()[-1]) if warm.returncode == 0 else
+        {"error": warm.stderr.strip().splitlines()[-1:]},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""og:image extraction: full BeautifulSoup parse vs. streaming <head>-only parser.
+
+    python -m benchmarks.bench_meta [iterations] [body_kb]
+
+Serves a synthetic post page (og: tags in <head>, a large script-heavy
+<body> like real Instagram/Facebook pages) from a local server and times
+both paths end to end, including the download. Peak Python memory per
+call is measured with tracemalloc. Prints one JSON object.
+"""
+import json
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from bs4 import BeautifulSoup
+
+from downloaders.meta import fetch_meta
+
+
+def build_page(body_kb: int) -> bytes:
+    head = (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>post</title>'
+        + '<link rel="preload" href="/static/x.js">' * 40
+        + '<meta property="og:title" content="Some post &amp; title">'
+        + '<meta property="og:image" content="https://scontent.cdninstagram.com/v/t51/123_n.jpg?stp=dst&amp;oe=6700AB12">'
+        + '<meta property="og:video" content="https://scontent.cdninstagram.com/v/t50/456_n.mp4">'
+        + '</head>'
+    )
+    block = '<div class="x1"><span>lorem ipsum</span><script>window.__d={"a":[1,2,3]};</script></div>'
+    body = '<body>' + block * (body_kb * 1024 // len(block)) + '</body></html>'
+    return (head + body).encode()
+
+
+def serve(page: bytes):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            try:
+                self.wfile.write(page)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    class QuietServer(ThreadingHTTPServer):
+        def handle_error(self, request, client_address):
+            pass  # the streaming client hangs up after </head> on purpose
+
+    server = QuietServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bs4_og_image(url):
+    r = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=10)
+    soup = BeautifulSoup(r.text, 'html.parser')
+    og_img = soup.find("meta", property="og:image")
+    return og_img["content"] if og_img else None
+
+
+def streaming_og_image(url):
+    return fetch_meta(url).get("og:image")
+
+
+def measure(func, url, iterations):
+    expected = func(url)
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        assert func(url) == expected
+        times.append((time.perf_counter() - start) * 1000)
+    tracemalloc.start()
+    func(url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times.sort()
+    return {
+        "mean_ms": round(statistics.mean(times), 3),
+        "p50_ms": round(times[len(times) // 2], 3),
+        "peak_kb": round(peak / 1024, 1),
+        "og_image": expected,
+    }
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    body_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+    page = build_page(body_kb)
+    server = serve(page)
+    url = f"http://127.0.0.1:{server.server_port}/p/abc/"
+    try:
+        report = {
+            "page_kb": len(page) // 1024,
+            "iterations": iterations,
+            "beautifulsoup": measure(bs4_og_image, url, iterations),
+            "streaming": measure(streaming_og_image, url, iterations),
+        }
+    finally:
+        server.shutdown()
+    report["speedup"] = round(report["beautifulsoup"]["mean_ms"] / report["streaming"]["mean_ms"], 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
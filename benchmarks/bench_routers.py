@@ -0,0 +1,425 @@
+"""Load test of the download routers against a local fake upstream.
+
+    python -m benchmarks.bench_routers [--targets youtube,reddit] [--concurrency 1,8,32]
+        [--requests 200] [--latency-ms 50] [--cdn-latency-ms 10]
+        [--content-length present|absent|filesize] [--distinct 0]
+        [--output run.json] [--baseline previous.json] [--tolerance 0.2]
+
+A local HTTP server stands in for both the site and its CDN:
+
+- /page/<platform>/<id> is the watch / post page.
+- /cdn/<file> serves media. HEAD requests answer with or without
+  Content-Length, depending on --content-length.
+
+yt-dlp's extractors only match the real hosts, so YoutubeDL.extract_info is
+replaced by a stub. The stub fetches the fake page and returns a canned
+yt-dlp-style info dict whose format URLs point at the fake CDN. Everything
+after extract_info is the real code, run in-process through the ASGI app:
+rate limiter, pool, cache, format selection, size probes and serialization.
+
+Each target is driven at each concurrency level. The report holds:
+
+- p50 / p95 / p99 latency, throughput and errors.
+- RSS after the level and peak RSS.
+- Upstream requests, split into page fetches, HEAD probes and media GETs.
+
+Prints one JSON object. With --baseline, p95 or throughput that got worse
+by more than --tolerance is listed under "regressions" and the exit status
+is 1.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform as platform_info
+import resource
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode
+
+import requests
+import yt_dlp
+
+import main
+from downloaders import extraction, ratelimit, registry
+from downloaders.cache import extraction_cache
+from downloaders.executor import run_blocking
+from downloaders.utils import extract_video_info
+
+# target → (endpoint path, media URL template); None path means "call the function directly"
+TARGETS = {
+    "instagram": ("/instagram/download", "https://www.instagram.com/p/{id}/"),
+    "facebook": ("/facebook/download", "https://www.facebook.com/watch/?v={id}"),
+    "youtube": ("/download", "https://www.youtube.com/watch?v={id}"),
+    "reddit": ("/download/reddit", "https://www.reddit.com/r/videos/comments/{id}/clip/"),
+    "vimeo": ("/download/vimeo", "https://vimeo.com/{id}"),
+    "utils": (None, "https://x.com/someone/status/{id}"),
+}
+CONTENT_LENGTH_MODES = ("present", "absent", "filesize")
+MEDIA_BYTES = 48 * 1024 * 1024
+
+
+# ✅ Fake upstream: site pages + CDN, with request counters
+
+class FakeUpstream:
+    def __init__(self, latency: float, cdn_latency: float, content_length: str, page_kb: int = 256):
+        self.latency = latency
+        self.cdn_latency = cdn_latency
+        self.content_length = content_length
+        self.page = b"<html><head><title>post</title></head><body>" + b"x" * (page_kb * 1024) + b"</body></html>"
+        self.counts = {"page": 0, "cdn_head": 0, "cdn_get": 0}
+        self._lock = threading.Lock()
+        self.server = None
+
+    def count(self, kind: str):
+        with self._lock:
+            self.counts[kind] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.counts)
+
+    def start(self) -> str:
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _media_headers(self, with_length: bool):
+                self.send_response(200)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Accept-Ranges", "bytes")
+                if with_length:
+                    self.send_header("Content-Length", str(MEDIA_BYTES))
+
+            def do_HEAD(self):
+                upstream.count("cdn_head")
+                time.sleep(upstream.cdn_latency)
+                self._media_headers(upstream.content_length != "absent")
+                self.end_headers()
+
+            def do_GET(self):
+                if self.path.startswith("/page/"):
+                    upstream.count("page")
+                    time.sleep(upstream.latency)
+                    body, content_type = upstream.page, "text/html; charset=utf-8"
+                else:
+                    upstream.count("cdn_get")
+                    time.sleep(upstream.cdn_latency)
+                    body, content_type = b"\0" * 4096, "video/mp4"
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+
+
+# ✅ Canned yt-dlp output
+
+def canned_info(base: str, platform: str, media_id: str, with_filesize: bool) -> dict:
+    """Roughly what yt-dlp returns for a 3-minute video: DASH ladder, muxed files, HLS, captions"""
+    duration = 183.4
+
+    def fmt(format_id, height, vcodec, acodec, ext, tbr, protocol="https", **extra):
+        f = {
+            "format_id": format_id,
+            "url": f"{base}/cdn/{platform}/{media_id}/{format_id}.{ext}",
+            "ext": ext,
+            "protocol": protocol,
+            "vcodec": vcodec,
+            "acodec": acodec,
+            "height": height or None,
+            "width": height * 16 // 9 if height else None,
+            "fps": 30 if height else None,
+            "tbr": tbr,
+            "format_note": f"{height}p" if height else "audio",
+            "http_headers": {"User-Agent": "Mozilla/5.0", "Accept": "*/*"},
+            "filesize": int(tbr * 125 * duration) if with_filesize and protocol == "https" else None,
+            **extra,
+        }
+        if protocol != "https":
+            f["url"] = f"{base}/cdn/{platform}/{media_id}/{format_id}.m3u8"
+        return f
+
+    formats = [
+        fmt("139", 0, "none", "mp4a.40.5", "m4a", 48, abr=48),
+        fmt("140", 0, "none", "mp4a.40.2", "m4a", 129, abr=129),
+        fmt("251", 0, "none", "opus", "webm", 135, abr=135),
+        fmt("18", 360, "avc1.42001E", "mp4a.40.2", "mp4", 520),
+        fmt("22", 720, "avc1.64001F", "mp4a.40.2", "mp4", 1400),
+    ]
+    for height, tbr in ((144, 90), (240, 180), (360, 360), (480, 700), (720, 1500), (1080, 3000), (1440, 8000)):
+        formats.append(fmt(f"avc{height}", height, "avc1.4d401f", "none", "mp4", tbr))
+        formats.append(fmt(f"vp9{height}", height, "vp9", "none", "webm", tbr * 0.8))
+        formats.append(fmt(f"hls{height}", height, "avc1.4d401f", "mp4a.40.2", "mp4", tbr * 1.1,
+                           protocol="m3u8_native"))
+    captions = {
+        lang: [{"ext": ext, "url": f"{base}/cdn/captions/{media_id}/{lang}.{ext}"}
+               for ext in ("json3", "srv1", "srv2", "srv3", "ttml", "vtt")]
+        for lang in (f"l{i:02d}" for i in range(60))
+    }
+    return {
+        "id": media_id,
+        "title": f"Benchmark {platform} video {media_id}",
+        "description": "Lorem ipsum dolor sit amet. " * 80,
+        "thumbnail": f"{base}/cdn/{platform}/{media_id}/thumb.jpg",
+        "thumbnails": [{"url": f"{base}/cdn/{platform}/{media_id}/thumb{i}.jpg", "width": 120 * i}
+                       for i in range(1, 8)],
+        "duration": duration,
+        "webpage_url": f"{base}/page/{platform}/{media_id}",
+        "extractor": platform,
+        "formats": formats,
+        "automatic_captions": captions,
+        "tags": [f"tag{i}" for i in range(30)],
+    }
+
+
+def install_fake_extractor(base: str, with_filesize: bool, calls: dict):
+    """Swap yt-dlp's network extraction for page fetch + canned info (PooledYoutubeDL still wraps it)"""
+    lock = threading.Lock()
+
+    def extract_info(self, url, download=True, *args, **kwargs):
+        platform = registry.lookup(url)
+        name = platform.name if platform else "generic"
+        media_id = hashlib.sha1(url.encode()).hexdigest()[:11]
+        with lock:
+            calls[name] = calls.get(name, 0) + 1
+        requests.get(f"{base}/page/{name}/{media_id}", timeout=30).content
+        return canned_info(base, name, media_id, with_filesize)
+
+    yt_dlp.YoutubeDL.extract_info = extract_info
+
+
+def unlimit_upstreams():
+    # The benchmark measures our code, not the production request budgets
+    for guard in ratelimit.guards.values():
+        guard.base_rate = guard.rate = guard.burst = guard.tokens = 1e9
+
+
+def clear_caches():
+    extraction_cache.clear()
+    extraction.stale_cache.clear()
+
+
+# ✅ Driving the app
+
+async def asgi_get(path: str, params: dict):
+    """One GET through the ASGI app in-process; returns (status, body bytes)"""
+    messages = []
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": urlencode(params).encode(),
+        "headers": [(b"host", b"bench")], "server": ("bench", 80), "client": ("127.0.0.1", 1),
+        "root_path": "",
+    }
+    await main.app(scope, receive, send)
+    status = next(m["status"] for m in messages if m["type"] == "http.response.start")
+    body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+    return status, body
+
+
+async def call_target(target: str, media_url: str) -> bool:
+    path, _ = TARGETS[target]
+    if path is None:
+        result = await run_blocking(extract_video_info, media_url, ["twitter", "twitter:.*"])
+        return "error" not in result
+    status, _ = await asgi_get(path, {"url": media_url})
+    return status < 400
+
+
+def percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(q * len(samples) + 0.5)) - 1))
+    return samples[index]
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    except OSError:
+        return 0.0
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024, 1)
+
+
+async def run_level(target: str, concurrency: int, total: int, distinct: int, upstream: FakeUpstream,
+                    calls: dict, run_id: str) -> dict:
+    _, template = TARGETS[target]
+    clear_caches()
+    counts_before, calls_before = upstream.snapshot(), sum(calls.values())
+    latencies, errors = [], 0
+    issued = 0
+
+    async def worker():
+        nonlocal issued, errors
+        while issued < total:
+            n = issued
+            issued += 1
+            # 11 digits: a valid media ID for every platform's canonical_key pattern (YouTube wants 11)
+            media_id = f"{run_id}{concurrency:03d}{n % distinct if distinct else n:06d}"
+            start = time.perf_counter()
+            try:
+                ok = await call_target(target, template.format(id=media_id))
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    counts_after = upstream.snapshot()
+    return {
+        "target": target,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "rss_mb": rss_mb(),
+        "peak_rss_mb": peak_rss_mb(),
+        "upstream": {
+            "extract_info": sum(calls.values()) - calls_before,
+            **{kind: counts_after[kind] - counts_before[kind] for kind in counts_after},
+        },
+    }
+
+
+# ✅ Report / baseline comparison
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def compare(results, baseline, tolerance: float):
+    previous = {(r["target"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = previous.get((r["target"], r["concurrency"]))
+        if old is None:
+            continue
+        if old["p95_ms"] and r["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append({"target": r["target"], "concurrency": r["concurrency"], "metric": "p95_ms",
+                                "baseline": old["p95_ms"], "current": r["p95_ms"]})
+        if old["throughput_rps"] and r["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+            regressions.append({"target": r["target"], "concurrency": r["concurrency"],
+                                "metric": "throughput_rps", "baseline": old["throughput_rps"],
+                                "current": r["throughput_rps"]})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", default=",".join(TARGETS), help="comma-separated: " + ", ".join(TARGETS))
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per target and level")
+    parser.add_argument("--latency-ms", type=float, default=50, help="page fetch latency")
+    parser.add_argument("--cdn-latency-ms", type=float, default=10, help="CDN HEAD / GET latency")
+    parser.add_argument("--content-length", choices=CONTENT_LENGTH_MODES, default="present",
+                        help="present: HEAD has Content-Length; absent: it doesn't; "
+                             "filesize: yt-dlp already knows the size, so no probes")
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="distinct media per level (0 = every request is a cache miss)")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    return parser.parse_args(argv)
+
+
+async def run(args) -> dict:
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        raise SystemExit(f"unknown targets: {', '.join(unknown)}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    upstream = FakeUpstream(args.latency_ms / 1000, args.cdn_latency_ms / 1000, args.content_length)
+    base = upstream.start()
+    calls = {}
+    install_fake_extractor(base, args.content_length == "filesize", calls)
+    unlimit_upstreams()
+    run_id = f"{int(time.time()) % 100:02d}"
+    try:
+        # Import / first-use costs (pools, jar parsing) are not what we're measuring
+        await call_target(targets[0], TARGETS[targets[0]][1].format(id=f"{run_id}999999999"))
+        results = [await run_level(target, level, args.requests, args.distinct, upstream, calls, run_id)
+                   for target in targets for level in levels]
+    finally:
+        upstream.stop()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_revision": git_revision(),
+            "python": platform_info.python_version(),
+            "yt_dlp": yt_dlp.version.__version__,
+            "params": {
+                "requests": args.requests, "latency_ms": args.latency_ms, "cdn_latency_ms": args.cdn_latency_ms,
+                "content_length": args.content_length, "distinct": args.distinct,
+            },
+        },
+        "results": results,
+    }
+
+
+def main_cli(argv=None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(report["results"], json.load(f), args.tolerance)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,63 @@
+"""Per-request YoutubeDL setup cost: fresh instance vs. leased warm instance.
+
+    python -m benchmarks.bench_ydl_setup [iterations]
+
+Prints one JSON object with mean/p50/p95 milliseconds for each mode. The
+numbers cover construction, cookie parsing and opener setup only, which
+is exactly what the pool saves; network time is not included.
+"""
+import json
+import statistics
+import sys
+import time
+
+import yt_dlp
+
+from downloaders import ydl_pool
+
+OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'skip_download': True,
+    'forcejson': True,
+    'cookiefile': 'cookies.txt',
+}
+
+
+def fresh():
+    with yt_dlp.YoutubeDL(OPTS) as ydl:
+        ydl.cookiejar  # parsed lazily; every real request touches it
+        ydl._request_director
+
+
+def pooled():
+    with ydl_pool.lease(OPTS) as ydl:
+        ydl.cookiejar
+        ydl._request_director
+
+
+def measure(func, iterations):
+    func()  # import / first-use costs are not per-request
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    report = {"fresh": measure(fresh, iterations), "pooled": measure(pooled, iterations)}
+    report["speedup"] = round(report["fresh"]["mean_ms"] / max(report["pooled"]["mean_ms"], 1e-6), 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
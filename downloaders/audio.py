@@ -0,0 +1,166 @@
+import asyncio
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from downloaders import metrics, registry, transcode
+from downloaders.cache import canonical_key
+from downloaders.diskcache import DiskCache, content_key, pinned_response
+from downloaders.extraction import extract
+from downloaders.lazy import lazy_import
+from downloaders.sizes import SizeResult
+from downloaders.stream import format_table, safe_filename
+
+router = APIRouter(tags=["Audio"])
+ffmpeg = lazy_import("ffmpeg")
+
+AUDIO_MAX_PROCESSES = int(os.getenv("AUDIO_MAX_PROCESSES", "4"))
+AUDIO_RETRY_AFTER = int(os.getenv("AUDIO_RETRY_AFTER", "10"))
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join("cache", "audio"))
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_MB", "2048")) * 1024 * 1024
+DEFAULT_BITRATE = 192
+BITRATES = (64, 96, 128, 160, 192, 256, 320)
+
+# codec → (ffmpeg encoder, ffmpeg muxer, media type, file extension)
+CODECS = {
+    "mp3": ("libmp3lame", "mp3", "audio/mpeg", "mp3"),
+    "opus": ("libopus", "ogg", "audio/ogg", "opus"),
+}
+
+audio_cache = DiskCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES)
+_slots = threading.BoundedSemaphore(AUDIO_MAX_PROCESSES)
+
+metrics.register(metrics.Gauge(
+    "downloader_audio_cache_bytes", "Bytes of finished conversions on disk", (),
+    lambda: [((), audio_cache.stats()["bytes"])]))
+metrics.register(metrics.CounterFunc(
+    "downloader_audio_cache_hits_total", "Conversions served from the disk cache", (),
+    lambda: [((), audio_cache.hits)]))
+
+
+def audio_link(url: str, codec: str = "mp3", bitrate: int = DEFAULT_BITRATE) -> str:
+    return "/audio?" + urlencode({"url": url, "codec": codec, "bitrate": bitrate})
+
+
+def estimated_size(duration: Optional[float], bitrate: int = DEFAULT_BITRATE) -> SizeResult:
+    if not duration:
+        return SizeResult(None, "unknown")
+    return SizeResult(int(bitrate * 1000 / 8 * duration), "bitrate_estimate")
+
+
+def pick_audio_source(table: Dict) -> Dict:
+    """Best audio-only format, else the smallest muxed one (audio gets pulled out of it)"""
+    formats = table["formats"].values()
+    audios = [f for f in formats if f["has_audio"] and not f["has_video"]]
+    if audios:
+        return max(audios, key=lambda f: f["abr"])
+    muxed = [f for f in formats if f["muxed"]]
+    if muxed:
+        return min(muxed, key=lambda f: f["height"])
+    raise HTTPException(status_code=404, detail="No audio stream found")
+
+
+def build_command(fmt: Dict, codec: str, bitrate: int) -> List[str]:
+    encoder, muxer, _, _ = CODECS[codec]
+    src = ffmpeg.input(fmt["url"], **transcode.input_args(fmt))
+    out = ffmpeg.output(src.audio, "pipe:1", acodec=encoder, audio_bitrate=f"{bitrate}k", f=muxer, vn=None)
+    return out.global_args("-loglevel", "error").compile()
+
+
+def tee_to_cache(job, key: str, ext: str):
+    """Stream ffmpeg output to the client while writing it into the cache"""
+    out, tmp = audio_cache.open_temp(key)
+    complete = False
+    try:
+        for chunk in job.iter_stdout():
+            out.write(chunk)
+            yield chunk
+        complete = job.succeeded()
+    finally:
+        out.close()
+        if complete:
+            audio_cache.commit(key, ext, tmp)
+        else:
+            audio_cache.discard(tmp)
+
+
+def check_request(url: str, codec: str, bitrate: int) -> registry.Platform:
+    if codec not in CODECS:
+        raise HTTPException(status_code=400, detail=f"codec must be one of {', '.join(CODECS)}")
+    if bitrate not in BITRATES:
+        raise HTTPException(status_code=400, detail=f"bitrate must be one of {BITRATES}")
+    platform = registry.lookup(url)
+    if platform is None:
+        raise HTTPException(status_code=400, detail="Unsupported URL")
+    metrics.set_platform(platform.name)
+    return platform
+
+
+async def convert_to_cache(url: str, codec: str = "mp3", bitrate: int = DEFAULT_BITRATE,
+                           on_progress: Optional[Callable[[int], None]] = None) -> str:
+    """Run a whole conversion into the disk cache without a client attached (job mode).
+
+    Returns the cached file's path; `on_progress(bytes_written)` is called
+    from a worker thread as output arrives.
+    """
+    platform = check_request(url, codec, bitrate)
+    ext = CODECS[codec][3]
+    key = content_key(*canonical_key(url), codec, bitrate)
+    cached = await asyncio.to_thread(audio_cache.get, key, ext)
+    if cached:
+        return cached
+
+    table = await extract(f"stream:{platform.name}", url, lambda u: format_table(u, platform))
+    source = pick_audio_source(table)
+    transcode.acquire_slot(_slots, "conversions", AUDIO_RETRY_AFTER)
+    job = transcode.start(build_command(source, codec, bitrate), _slots)
+
+    def drain():
+        written = 0
+        for chunk in tee_to_cache(job, key, ext):
+            written += len(chunk)
+            if on_progress is not None:
+                on_progress(written)
+
+    try:
+        await asyncio.to_thread(drain)
+    finally:
+        job.close()
+    path = await asyncio.to_thread(audio_cache.get, key, ext)
+    if not path:
+        raise HTTPException(status_code=502, detail="Conversion failed")
+    return path
+
+
+@router.get("/audio")
+async def audio(
+    url: str = Query(...),
+    codec: str = Query("mp3", description="mp3 or opus"),
+    bitrate: int = Query(DEFAULT_BITRATE, description="kbps"),
+):
+    """Best audio stream transcoded to MP3/Opus; finished files are cached on disk"""
+    platform = check_request(url, codec, bitrate)
+    _, _, media_type, ext = CODECS[codec]
+    key = content_key(*canonical_key(url), codec, bitrate)
+    # Off the loop: the first lookup indexes the cache directory, every hit stats and touches the file
+    cached = await asyncio.to_thread(audio_cache.get, key, ext)
+    if cached:
+        response = pinned_response(audio_cache, cached, media_type=media_type, filename=f"{key[:16]}.{ext}")
+        if response is not None:
+            return response  # else evicted just now: convert it again
+
+    table = await extract(f"stream:{platform.name}", url, lambda u: format_table(u, platform))
+    source = pick_audio_source(table)
+    transcode.acquire_slot(_slots, "conversions", AUDIO_RETRY_AFTER)
+    job = transcode.start(build_command(source, codec, bitrate), _slots)
+    return StreamingResponse(
+        tee_to_cache(job, key, ext),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{safe_filename(table["title"], ext)}"'},
+        background=BackgroundTask(job.close),
+    )
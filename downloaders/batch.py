@@ -0,0 +1,72 @@
+import asyncio
+import json
+import os
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
+from downloaders import deadline, registry
+from downloaders.formats import DEFAULT_QUERY, FormatQuery
+
+router = APIRouter(tags=["Batch"])
+
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+
+class BatchRequest(BaseModel):
+    urls: List[str]
+    concurrency: Optional[int] = None
+
+
+async def resolve_url(url: str, query: FormatQuery = DEFAULT_QUERY) -> dict:
+    """Run a URL through its platform handler; errors come back as {"status", "error"}, never raised"""
+    platform = registry.lookup(url)
+    if platform is None:
+        return {"url": url, "status": 400, "error": "Unsupported URL"}
+
+    try:
+        result = await platform.handler(url=url, query=query)
+    except HTTPException as e:
+        return {"url": url, "status": e.status_code, "error": e.detail}
+    except Exception as e:
+        return {"url": url, "status": 500, "error": str(e)}
+
+    # Some handlers return a ready-made JSONResponse on failure
+    if isinstance(result, Response):
+        return {"url": url, "status": result.status_code, "result": json.loads(result.body)}
+    return {"url": url, "status": 200, "result": result}
+
+
+async def resolve_one(index: int, url: str, limit: asyncio.Semaphore) -> dict:
+    async with limit:
+        # Its own task, so this deadline is only this URL's
+        deadline.set_current(deadline.for_item())
+        return {"index": index, **await resolve_url(url)}
+
+
+async def stream_results(urls: List[str], concurrency: int):
+    limit = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.ensure_future(resolve_one(i, url, limit)) for i, url in enumerate(urls)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            item = await finished
+            yield json.dumps(item, default=str) + "\n"
+    finally:
+        # Client went away: drop whatever has not started yet
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/batch")
+async def batch(request: BatchRequest):
+    """Resolve many URLs at once, streaming one NDJSON line per URL as each finishes"""
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="No URLs given")
+    if len(request.urls) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_URLS} URLs per batch")
+
+    concurrency = max(1, min(request.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY))
+    return StreamingResponse(stream_results(request.urls, concurrency), media_type="application/x-ndjson")
@@ -0,0 +1,209 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from fastapi import APIRouter
+
+from downloaders import metrics
+
+router = APIRouter(tags=["Cache"])
+
+CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "2048"))
+CACHE_TTL = float(os.getenv("EXTRACTION_CACHE_TTL", "600"))
+# Entries expire this many seconds before the signed CDN URLs inside them do
+EXPIRY_MARGIN = float(os.getenv("EXTRACTION_CACHE_MARGIN", "60"))
+# memory (per process) | sqlite (per host) | redis (shared across hosts)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", os.path.join("cache", "extraction.sqlite3"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "0.25"))
+# In-process copy kept in front of a shared backend
+CACHE_LOCAL_SIZE = int(os.getenv("CACHE_LOCAL_SIZE", "256"))
+CACHE_LOCAL_TTL = float(os.getenv("CACHE_LOCAL_TTL", "5"))
+
+# ✅ (extractor, regex) — first group is the canonical media ID
+_ID_PATTERNS = [
+    ("youtube", re.compile(r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/|v/)|youtu\.be/)([\w-]{11})")),
+    ("instagram", re.compile(r"instagram\.com/(?:[\w.]+/)?(?:p|reels?|tv)/([\w-]+)")),
+    ("facebook", re.compile(r"facebook\.com/(?:.*/)?(?:videos|reel|posts)/(?:[\w.]+/)?(\d+|pfbid\w+)")),
+    ("facebook", re.compile(r"facebook\.com/.*[?&](?:v|story_fbid|fbid)=(\w+)")),
+    ("facebook", re.compile(r"(?:fb\.watch|facebook\.com/share/[rv])/([\w-]+)")),
+    ("reddit", re.compile(r"reddit\.com/r/\w+/comments/(\w+)")),
+    ("reddit", re.compile(r"(?:v\.)?redd\.it/(\w+)")),
+    ("vimeo", re.compile(r"vimeo\.com/(?:.*/)?(\d+)")),
+    ("dailymotion", re.compile(r"(?:dailymotion\.com/(?:embed/)?video|dai\.ly)/([a-zA-Z0-9]+)")),
+    ("twitter", re.compile(r"(?:twitter|x)\.com/\w+/status(?:es)?/(\d+)")),
+    ("linkedin", re.compile(r"linkedin\.com/.*?(?:activity[:-]|ugcPost[:-])(\d+)")),
+]
+
+
+def canonical_key(url: str) -> Tuple[str, str]:
+    """(extractor, media ID) for a URL, so tracking params and host aliases share one entry"""
+    for extractor, pattern in _ID_PATTERNS:
+        m = pattern.search(url)
+        if m:
+            return extractor, m.group(1)
+    # Unknown layout: host without www. + path, query and fragment dropped
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host or "generic", parsed.path.rstrip("/") or url
+
+
+def url_expiry(url: str) -> Optional[float]:
+    """Epoch seconds at which a signed CDN URL stops working, if it says so"""
+    if not isinstance(url, str) or "?" not in url:
+        return None
+    try:
+        params = parse_qs(urlparse(url).query)
+    except ValueError:
+        return None
+    try:
+        if "expire" in params:      # googlevideo
+            return float(params["expire"][0])
+        if "oe" in params:          # fbcdn / cdninstagram (hex)
+            return float(int(params["oe"][0], 16))
+        if "Expires" in params:     # CloudFront-style signatures
+            return float(params["Expires"][0])
+        if "exp" in params:         # vimeo / akamai tokens
+            return float(params["exp"][0])
+    except ValueError:
+        pass
+    return None
+
+
+def _earliest_expiry(value) -> Optional[float]:
+    earliest = None
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif isinstance(item, str) and item.startswith("http"):
+            exp = url_expiry(item)
+            if exp is not None and (earliest is None or exp < earliest):
+                earliest = exp
+    return earliest
+
+
+def result_ttl(result, default: float = CACHE_TTL, margin: float = EXPIRY_MARGIN) -> float:
+    """Default TTL, cut short so the entry dies before its earliest signed URL"""
+    earliest = _earliest_expiry(result)
+    if earliest is None:
+        return default
+    return min(default, earliest - time.time() - margin)
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int = CACHE_SIZE):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    # Async interface used from the event loop; in memory there's no I/O to move off it
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value, ttl: float):
+        self.set(key, value, ttl)
+
+    async def adelete(self, key):
+        self.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def make_cache(backend: str = CACHE_BACKEND):
+    """Extraction cache for the configured backend; shared ones get a small local tier"""
+    if backend == "memory":
+        return TTLCache()
+    from downloaders import cache_backends
+    if backend == "sqlite":
+        shared = cache_backends.SQLiteCache(CACHE_SQLITE_PATH, CACHE_SIZE)
+    elif backend == "redis":
+        shared = cache_backends.RedisCache(REDIS_URL, timeout=REDIS_TIMEOUT)
+    else:
+        raise ValueError(f"Unknown CACHE_BACKEND {backend!r} (memory, sqlite or redis)")
+    return cache_backends.TieredCache(TTLCache(CACHE_LOCAL_SIZE), shared, CACHE_LOCAL_TTL)
+
+
+extraction_cache = make_cache()
+
+metrics.register(metrics.Gauge(
+    "downloader_cache_entries", "Entries in the extraction cache", (),
+    lambda: [((), len(extraction_cache))]))
+metrics.register(metrics.CounterFunc(
+    "downloader_cache_evictions_total", "LRU evictions from the extraction cache", (),
+    lambda: [((), extraction_cache.evictions)]))
+
+
+def cache_key(platform: str, url: str) -> Tuple[str, str, str]:
+    """Cache key for a router's response; the router is part of it because response shapes differ"""
+    return (platform, *canonical_key(url))
+
+
+@router.get("/cache/stats")
+def cache_stats():
+    return extraction_cache.stats()
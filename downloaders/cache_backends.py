@@ -0,0 +1,391 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+from urllib.parse import unquote, urlparse
+
+try:
+    import msgpack
+except ImportError:  # optional: compact JSON is the fallback
+    msgpack = None
+
+# Payloads larger than this are zlib-compressed before they hit the backend
+COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+CACHE_IO_WORKERS = int(os.getenv("CACHE_IO_WORKERS", "4"))
+# After a failed connect, Redis calls miss at once for this long instead of reconnecting each time
+REDIS_RETRY_SECONDS = float(os.getenv("REDIS_RETRY_SECONDS", "5"))
+
+# Blocking sqlite / socket calls of the shared backends run here, never on the event loop
+_io_pool = ThreadPoolExecutor(max_workers=CACHE_IO_WORKERS, thread_name_prefix="cache-io")
+
+
+async def run_io(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_io_pool, func, *args)
+
+
+# ✅ Serialization: one tag byte (m = msgpack, j = json; upper case = zlib) + payload
+
+def dumps(value) -> bytes:
+    if msgpack is not None:
+        tag, data = b"m", msgpack.packb(value, use_bin_type=True)
+    else:
+        tag, data = b"j", json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+    if len(data) >= COMPRESS_MIN_BYTES:
+        tag, data = tag.upper(), zlib.compress(data, 1)
+    return tag + data
+
+
+def loads(blob: bytes):
+    tag, data = blob[:1], blob[1:]
+    if tag.isupper():
+        data = zlib.decompress(data)
+    if tag.lower() == b"m":
+        if msgpack is None:
+            raise ValueError("msgpack entry but msgpack is not installed")
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
+
+
+def key_str(key) -> str:
+    if isinstance(key, tuple):
+        return "|".join(str(part) for part in key)
+    return str(key)
+
+
+class _Stats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+
+    def _counts(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "errors": self.errors,
+        }
+
+
+class SQLiteCache(_Stats):
+    """Extraction cache in a local SQLite file, shared by every worker on the host.
+
+    WAL mode lets workers read while another one writes. Expiry is wall-clock
+    so all processes agree on it; over `max_entries` the rows closest to
+    expiring go first.
+    """
+
+    name = "sqlite"
+    PURGE_EVERY = 256  # sets between sweeps of expired rows
+
+    def __init__(self, path: str, max_entries: int):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._sets = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value BLOB NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+
+    def get(self, key):
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT expires_at, value FROM entries WHERE key = ?", (key_str(key),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[0] <= time.time():
+                self.expirations += 1
+                self.misses += 1
+                return None
+            value = loads(row[1])
+        except (sqlite3.Error, ValueError, zlib.error):
+            self.errors += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float):
+        if ttl <= 0:
+            return
+        try:
+            blob = dumps(value)
+            with self._lock:
+                self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                                 (key_str(key), time.time() + ttl, blob))
+                self._sets += 1
+                if self._sets % self.PURGE_EVERY == 0:
+                    self._purge()
+        except (sqlite3.Error, TypeError, ValueError):
+            self.errors += 1
+
+    def _purge(self):
+        cur = self._db.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        self.expirations += max(cur.rowcount, 0)
+        (count,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.max_entries:
+            cur = self._db.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY expires_at LIMIT ?)",
+                (count - self.max_entries,))
+            self.evictions += max(cur.rowcount, 0)
+
+    def delete(self, key):
+        try:
+            with self._lock:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key_str(key),))
+        except sqlite3.Error:
+            self.errors += 1
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+
+    def __len__(self):
+        try:
+            with self._lock:
+                (count,) = self._db.execute(
+                    "SELECT COUNT(*) FROM entries WHERE expires_at > ?", (time.time(),)).fetchone()
+            return count
+        except sqlite3.Error:
+            return 0
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "path": self.path, "entries": len(self),
+                "max_entries": self.max_entries, **self._counts()}
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisCache(_Stats):
+    """Extraction cache in Redis (or anything speaking RESP), shared across hosts.
+
+    A tiny blocking RESP client over one socket; Redis trims by TTL (PX) and
+    its own maxmemory policy. Any connection problem is a cache miss, never
+    a failed request — the socket is dropped, and reconnecting waits
+    `retry_seconds` after a failed connect so a down server costs nothing.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "vdl:", timeout: float = 0.25,
+                 retry_seconds: float = REDIS_RETRY_SECONDS):
+        super().__init__()
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._down_until = 0.0
+
+    # 🔹 RESP plumbing
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock, self._reader = sock, sock.makefile("rb")
+        if self.password:
+            self._roundtrip(["AUTH", self.password])
+        if self.db:
+            self._roundtrip(["SELECT", str(self.db)])
+
+    def _close(self):
+        for closable in (self._reader, self._sock):
+            try:
+                if closable is not None:
+                    closable.close()
+            except OSError:
+                pass
+        self._sock = self._reader = None
+
+    @staticmethod
+    def _encode(args: List) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(out)
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(rest)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"bad RESP reply {line!r}")
+
+    def _roundtrip(self, args: List):
+        self._sock.sendall(self._encode(args))
+        return self._read_reply()
+
+    def command(self, *args) -> Any:
+        with self._lock:
+            if self._sock is None:
+                if time.monotonic() < self._down_until:
+                    raise ConnectionError("redis unavailable, not retrying yet")
+                try:
+                    self._connect()
+                except (OSError, ConnectionError, RedisError):
+                    self._close()
+                    self._down_until = time.monotonic() + self.retry_seconds
+                    raise ConnectionError("redis connect failed")
+            try:
+                return self._roundtrip(list(args))
+            except (OSError, ConnectionError):
+                self._close()
+                raise
+
+    # 🔹 Cache interface
+
+    def get(self, key):
+        try:
+            blob = self.command("GET", self.prefix + key_str(key))
+            value = None if blob is None else loads(blob)
+        except (OSError, ConnectionError, RedisError, ValueError, zlib.error):
+            self.errors += 1
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float):
+        ttl_ms = int(ttl * 1000)
+        if ttl_ms <= 0:
+            return
+        try:
+            self.command("SET", self.prefix + key_str(key), dumps(value), "PX", ttl_ms)
+        except (OSError, ConnectionError, RedisError, TypeError, ValueError):
+            self.errors += 1
+
+    def delete(self, key):
+        try:
+            self.command("DEL", self.prefix + key_str(key))
+        except (OSError, ConnectionError, RedisError):
+            self.errors += 1
+
+    def clear(self):
+        cursor = b"0"
+        while True:
+            cursor, keys = self.command("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", 500)
+            if keys:
+                self.command("DEL", *keys)
+            if cursor in (b"0", "0"):
+                break
+
+    def __len__(self):
+        # DBSIZE counts the whole logical DB; give the cache its own DB number in REDIS_URL
+        try:
+            return self.command("DBSIZE")
+        except (OSError, ConnectionError, RedisError):
+            return 0
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "server": f"{self.host}:{self.port}/{self.db}",
+                "entries": len(self), **self._counts()}
+
+
+class TieredCache:
+    """Small in-process cache in front of a shared backend.
+
+    Hot keys skip the round trip; the local TTL is kept short so a
+    delete on another worker is picked up quickly.
+    """
+
+    def __init__(self, local, shared, local_ttl: float):
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+
+    @property
+    def evictions(self):
+        return self.shared.evictions
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        value = self.shared.get(key)
+        if value is not None:
+            self.local.set(key, value, self.local_ttl)
+        return value
+
+    def set(self, key, value, ttl: float):
+        self.local.set(key, value, min(ttl, self.local_ttl))
+        self.shared.set(key, value, ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    # From the event loop: the local tier answers inline, the shared backend on the cache I/O pool
+
+    async def aget(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        value = await run_io(self.shared.get, key)
+        if value is not None:
+            self.local.set(key, value, self.local_ttl)
+        return value
+
+    async def aset(self, key, value, ttl: float):
+        self.local.set(key, value, min(ttl, self.local_ttl))
+        await run_io(self.shared.set, key, value, ttl)
+
+    async def adelete(self, key):
+        self.local.delete(key)
+        await run_io(self.shared.delete, key)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def __len__(self):
+        return len(self.shared)
+
+    def stats(self) -> dict:
+        return {**self.shared.stats(), "local": self.local.stats()}
@@ -0,0 +1,249 @@
+import glob
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException
+
+from downloaders import deadline, metrics
+from downloaders.lazy import lazy_import
+
+router = APIRouter(tags=["Cookies"])
+yt_dlp = lazy_import("yt_dlp")
+
+COOKIES_FILE = os.getenv("COOKIES_FILE", "cookies.txt")
+# One Netscape cookies file per account: cookies/<account>.txt
+COOKIES_DIR = os.getenv("COOKIES_DIR", "cookies")
+ACCOUNT_PER_MINUTE = float(os.getenv("COOKIE_ACCOUNT_PER_MINUTE", "30"))
+ACCOUNT_BURST = float(os.getenv("COOKIE_ACCOUNT_BURST", "5"))
+# How long an account sits out after hitting a login wall
+COOLDOWN_SECONDS = float(os.getenv("COOKIE_COOLDOWN", "900"))
+# How often files and the directory are checked for changes
+RELOAD_INTERVAL = float(os.getenv("COOKIE_RELOAD_INTERVAL", "5"))
+# How long a request queues for an account's budget before it gets a 503
+ACCOUNT_WAIT = float(os.getenv("COOKIE_ACCOUNT_WAIT", "3"))
+
+LOGIN_WALL_MARKERS = ("login required", "log in", "checkpoint_required")
+
+
+def is_login_wall(error) -> bool:
+    # Instagram words it "rate-limit reached or login required", which classify_error calls rate_limited.
+    # "Sign in… use --cookies" isn't a marker: yt-dlp appends it to private / removed media as well
+    if metrics.classify_error(error) in ("private", "unavailable"):
+        return False
+    message = str(error).lower()
+    return any(marker in message for marker in LOGIN_WALL_MARKERS)
+
+
+class Account:
+    """One cookies file, parsed once and shared by every YoutubeDL leased for it.
+
+    The jar object never changes identity: a reload swaps its contents in
+    place, so warm instances pick up new cookies without being rebuilt.
+    """
+
+    def __init__(self, name: str, path: str, per_minute: float = ACCOUNT_PER_MINUTE, burst: float = ACCOUNT_BURST):
+        self.name = name
+        self.path = path
+        self.jar = yt_dlp.cookies.YoutubeDLCookieJar(path)
+        self.mtime = 0.0
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.tokens = burst
+        self.refilled_at = time.monotonic()
+        self.cooldown_until = 0.0
+        self.leases = 0
+        self.login_walls = 0
+        self.reloads = 0
+        self._save_lock = threading.Lock()
+
+    def load(self):
+        fresh = yt_dlp.cookies.YoutubeDLCookieJar(self.path)
+        fresh.load()
+        with self.jar._cookies_lock:
+            self.jar._cookies = fresh._cookies
+        self.mtime = os.path.getmtime(self.path)
+        self.reloads += 1
+
+    def reload_if_changed(self) -> bool:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime == self.mtime:
+            return False
+        try:
+            self.load()
+        except Exception as e:
+            # Half-written or malformed file: keep serving the cookies we have
+            metrics.record_error("cookies", e)
+            self.mtime = mtime
+            return False
+        return True
+
+    def save(self):
+        """Write the jar back atomically (temp file + rename), one writer at a time"""
+        with self._save_lock:
+            fd, tmp = tempfile.mkstemp(prefix=".tmp", dir=os.path.dirname(self.path) or ".")
+            os.close(fd)
+            try:
+                with self.jar._cookies_lock:
+                    self.jar.save(tmp)
+                os.replace(tmp, self.path)
+            except Exception:
+                os.unlink(tmp)
+                raise
+            self.mtime = os.path.getmtime(self.path)
+
+    def available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def take(self, now: float) -> bool:
+        """Spend one request from the account's budget (token bucket)"""
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def wait(self, now: float) -> float:
+        """Seconds until the account can take a request again"""
+        tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        refill = 0.0 if tokens >= 1 else (1 - tokens) / self.rate if self.rate > 0 else float("inf")
+        return max(self.cooldown_until - now, refill)
+
+    def cool_down(self):
+        self.login_walls += 1
+        self.cooldown_until = time.monotonic() + COOLDOWN_SECONDS
+
+    def stats(self, now: float) -> dict:
+        return {
+            "name": self.name,
+            "cookies": len(self.jar),
+            "leases": self.leases,
+            "login_walls": self.login_walls,
+            "reloads": self.reloads,
+            "tokens": round(min(self.burst, self.tokens + (now - self.refilled_at) * self.rate), 2),
+            "cooldown_remaining": max(0.0, round(self.cooldown_until - now, 1)),
+        }
+
+
+class CookieManager:
+    """Round-robin over per-account cookie files, skipping accounts that are
+    out of budget or cooling down after a login wall.
+
+    When every account is out of budget the request queues for up to
+    ACCOUNT_WAIT, then gets a 503 with Retry-After. Requests only run without
+    cookies when no cookie files are configured at all.
+    """
+
+    def __init__(self, cookies_file: str = COOKIES_FILE, cookies_dir: str = COOKIES_DIR):
+        self.cookies_file = cookies_file
+        self.cookies_dir = cookies_dir
+        self._accounts: Dict[str, Account] = {}
+        self._order: List[str] = []
+        self._next = 0
+        self._lock = threading.Lock()
+        self._checked_at = float("-inf")
+        self.anonymous = 0
+        self.queued = 0
+        self.exhausted = 0
+
+    def _paths(self) -> Dict[str, str]:
+        paths = {}
+        if os.path.isfile(self.cookies_file):
+            paths[os.path.splitext(os.path.basename(self.cookies_file))[0]] = self.cookies_file
+        for path in sorted(glob.glob(os.path.join(self.cookies_dir, "*.txt"))):
+            paths[os.path.splitext(os.path.basename(path))[0]] = path
+        return paths
+
+    def refresh(self, force: bool = False):
+        """Pick up added / removed / edited cookie files (at most once per RELOAD_INTERVAL)"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < RELOAD_INTERVAL:
+            return
+        self._checked_at = now
+        paths = self._paths()
+        for name in list(self._accounts):
+            if name not in paths:
+                del self._accounts[name]
+        for name, path in paths.items():
+            account = self._accounts.get(name)
+            if account is None or account.path != path:
+                account = self._accounts[name] = Account(name, path)
+            account.reload_if_changed()
+        self._order = list(self._accounts)
+
+    def _take(self, now: float) -> Optional[Account]:
+        for i in range(len(self._order)):
+            account = self._accounts[self._order[(self._next + i) % len(self._order)]]
+            if account.available(now) and account.take(now):
+                self._next = (self._next + i + 1) % len(self._order)
+                account.leases += 1
+                return account
+        return None
+
+    def acquire(self) -> Optional[Account]:
+        """An account with budget left; None only when no cookies are configured.
+
+        Blocks (it runs on the extraction pool) while every account is out of
+        budget, for at most ACCOUNT_WAIT or what's left of the deadline.
+        """
+        give_up = time.monotonic() + deadline.remaining(ACCOUNT_WAIT)
+        queued = False
+        while True:
+            with self._lock:
+                self.refresh()
+                if not self._order:
+                    self.anonymous += 1
+                    return None
+                now = time.monotonic()
+                account = self._take(now)
+                if account is not None:
+                    return account
+                wait = min(self._accounts[name].wait(now) for name in self._order)
+                if not queued:
+                    self.queued += 1
+                    queued = True
+                if now + wait > give_up:
+                    self.exhausted += 1
+                    raise HTTPException(
+                        status_code=503,
+                        detail="All cookie accounts are out of budget, try again later",
+                        headers={"Retry-After": str(max(1, int(min(wait, COOLDOWN_SECONDS) + 0.999)))},
+                    )
+            time.sleep(wait)
+
+    def save_all(self):
+        with self._lock:
+            accounts = list(self._accounts.values())
+        for account in accounts:
+            try:
+                account.save()
+            except Exception as e:
+                metrics.record_error("cookies", e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "accounts": [account.stats(now) for account in self._accounts.values()],
+                "anonymous": self.anonymous,
+                "queued": self.queued,
+                "exhausted": self.exhausted,
+            }
+
+
+manager = CookieManager()
+
+metrics.register(metrics.Gauge(
+    "downloader_cookie_accounts_cooling", "Accounts sitting out after a login wall", (),
+    lambda: [((), sum(1 for a in list(manager._accounts.values()) if not a.available(time.monotonic())))]))
+
+
+@router.get("/cookies/stats")
+def cookies_stats():
+    return manager.stats()
@@ -1,24 +1,27 @@
-from fastapi import APIRouter, Query, HTTPException
-import yt_dlp
+from functools import partial
+from fastapi import APIRouter, Depends, Query, HTTPException
+from downloaders.lazy import lazy_import
+from downloaders import ydl_pool, metrics
+from downloaders.extraction import extract
+from downloaders.sizes import format_bytes, resolve_sizes
+from downloaders.formats import DEFAULT_QUERY, FormatQuery, collect, format_query, playable
+from downloaders import registry
+
+yt_dlp = lazy_import("yt_dlp")  # imported on first use or by the warm-up task
 
 router = APIRouter()
 
-@router.get("/download")
-async def download_dailymotion(
-    url: str = Query(..., description="Dailymotion URL (e.g., https://www.dailymotion.com/video/x8xxxxx)")
-):
-    try:
-        # 1. STRICT Dailymotion URL validation
-        if not ("dailymotion.com/video/" in url or "dai.ly/" in url):
-            raise HTTPException(status_code=400, detail="URL must be from Dailymotion (e.g., https://www.dailymotion.com/video/x8xxxxx)")
+EXTRACTORS = ["dailymotion"]
 
+def extract_dailymotion_info(url, query=DEFAULT_QUERY):
+    try:
         # 2. Configure yt-dlp to ONLY accept Dailymotion
         ydl_opts = {
             "quiet": True,
             "format": "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
             "merge_output_format": "mp4",
             "force_generic_extractor": False,  # Important!
-            "allowed_extractors": ["dailymotion"],  # Only allow Dailymotion
+            "allowed_extractors": EXTRACTORS,  # Only allow Dailymotion
             "http_headers": {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
                 "Referer": "https://www.dailymotion.com",
@@ -26,18 +29,59 @@ async def download_dailymotion(
         }
 
         # 3. Extract info with strict Dailymotion check
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        with ydl_pool.lease(ydl_opts) as ydl:
+            with metrics.stage("extract_info"):
+                info = ydl.extract_info(url, download=False)
             
-            # Additional check to confirm it's Dailymotion
-            if "dailymotion.com" not in info.get("webpage_url", "") and "dai.ly" not in info.get("webpage_url", ""):
-                raise HTTPException(status_code=400, detail="This is not a valid Dailymotion video")
+        extracted = collect(info)
+        del info
+
+        # Additional check to confirm it's Dailymotion
+        if "dailymotion.com" not in extracted.webpage_url and "dai.ly" not in extracted.webpage_url:
+            raise HTTPException(status_code=400, detail="This is not a valid Dailymotion video")
+
+        # 4. Playable formats (Dailymotion serves muxed HLS, so keep video+audio ones)
+        selected = [(f.label(), f) for f in playable(extracted.formats, query)]
+        selected.sort(key=lambda x: x[1].height, reverse=True)
+
+        formats = []
+        sizes = resolve_sizes([f for _, f in selected], extracted.duration)
+        for (quality, f), size in zip(selected, sizes):
+            formats.append({
+                "quality": quality,
+                "file_size": format_bytes(size.bytes),
+                "size_source": size.source,
+                "download_url": f.url
+            })
 
-        # ... [rest of your code: format filtering, etc.] ...
+        if not formats:
+            raise HTTPException(status_code=404, detail="No playable formats found")
 
+        return {
+            "title": extracted.title or "Dailymotion Video",
+            "thumbnail": extracted.thumbnail,
+            "duration": extracted.duration,
+            "formats": formats
+        }
+
+    except HTTPException:
+        raise
     except yt_dlp.utils.DownloadError as e:
         if "Unsupported URL" in str(e):
             raise HTTPException(status_code=400, detail="This URL is not supported (must be Dailymotion)")
         raise HTTPException(status_code=500, detail=f"Download error: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+# Served under /download/dailymotion: plain /download belongs to the YouTube router
+@router.get("/download/dailymotion")
+async def download_dailymotion(
+    url: str = Query(..., description="Dailymotion URL (e.g., https://www.dailymotion.com/video/x8xxxxx)"),
+    query: FormatQuery = Depends(format_query),
+):
+    # 1. STRICT Dailymotion URL validation
+    registry.validate(url, "dailymotion", "URL must be from Dailymotion (e.g., https://www.dailymotion.com/video/x8xxxxx)")
+
+    return await extract("dailymotion", url, partial(extract_dailymotion_info, query=query), query.variant())
+
+registry.register("dailymotion", ("dailymotion.com", "dai.ly"), EXTRACTORS, download_dailymotion)
@@ -0,0 +1,119 @@
+import contextvars
+import os
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+
+from downloaders import metrics
+
+# Overall budget for one request's extraction, size probes and HTML fallback
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "30"))
+# Clients may ask for less (never more): "X-Request-Deadline: 8" (seconds)
+DEADLINE_HEADER = b"x-request-deadline"
+# Shortest timeout handed to a blocking call; below this it isn't worth starting
+MIN_TIMEOUT = float(os.getenv("DEADLINE_MIN_TIMEOUT", "0.5"))
+
+deadline_exceeded = metrics.register(metrics.Counter(
+    "downloader_deadline_exceeded_total", "Requests cut off by their deadline", ("platform", "stage")))
+
+
+class Deadline:
+    """Absolute expiry for one request (or one attempt of it); cancelling makes it expire now"""
+
+    def __init__(self, expires_at: float, budget: float = REQUEST_DEADLINE):
+        self.expires_at = expires_at
+        self.budget = budget  # how long it was given in the first place
+        self.cancelled = False
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds, seconds)
+
+    def child(self) -> "Deadline":
+        """Same expiry, separately cancellable (one per hedged attempt)"""
+        return Deadline(self.expires_at, self.budget)
+
+    def remaining(self) -> float:
+        if self.cancelled:
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def cancel(self):
+        self.cancelled = True
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("deadline", default=None)
+
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+
+def set_current(deadline: Optional[Deadline]):
+    return _current.set(deadline)
+
+
+def reset(token):
+    _current.reset(token)
+
+
+def for_item() -> Deadline:
+    """A fresh deadline with the request's budget, for one item of a streamed response.
+
+    Streams (batch, NDJSON playlists) outlive a single request budget; each
+    item gets the full budget from when it starts instead.
+    """
+    deadline = _current.get()
+    return Deadline.after(deadline.budget if deadline is not None else REQUEST_DEADLINE)
+
+
+def remaining(default: float) -> float:
+    """`default`, or less if the current request has less time left"""
+    deadline = _current.get()
+    return default if deadline is None else min(default, deadline.remaining())
+
+
+def expired() -> bool:
+    deadline = _current.get()
+    return deadline is not None and deadline.remaining() < MIN_TIMEOUT
+
+
+def timeout(default: float) -> float:
+    """Timeout for one blocking call: what's left of the deadline, capped at `default`"""
+    return max(MIN_TIMEOUT, remaining(default))
+
+
+def exceeded(stage: str) -> HTTPException:
+    deadline_exceeded.inc(metrics.platform_var.get(), stage)
+    return HTTPException(status_code=504, detail=f"Deadline exceeded during {stage}")
+
+
+def _requested(scope) -> float:
+    for name, value in scope.get("headers", ()):
+        if name.lower() == DEADLINE_HEADER:
+            try:
+                seconds = float(value)
+            except ValueError:
+                break
+            if seconds > 0:
+                return min(seconds, REQUEST_DEADLINE)
+            break
+    return REQUEST_DEADLINE
+
+
+class DeadlineMiddleware:
+    """Starts every HTTP request's deadline; blocking work reads it through the
+    context, which the extraction pool copies into its worker threads."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = _current.set(Deadline.after(_requested(scope)))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
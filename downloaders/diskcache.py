@@ -0,0 +1,173 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi.responses import FileResponse
+
+# Temp files older than this are left over from a crash; younger ones may be another worker's write
+STALE_TEMP_SECONDS = 3600
+
+
+def content_key(*parts) -> str:
+    return hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+
+
+class DiskCache:
+    """Content-addressed files under `root`, evicted least-recently-used once over `max_bytes`.
+
+    Files are written to a temp name and renamed into place, so readers
+    never see a partial file. Last use is tracked through the file mtime,
+    which keeps LRU order across restarts.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Tuple[int, float]]] = None  # path → (size, last use)
+        self._pins: Dict[str, int] = {}  # path → readers still sending it
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        os.makedirs(self.root, exist_ok=True)
+        now = time.time()
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue  # removed by another worker meanwhile
+                if name.startswith(".tmp"):
+                    if now - st.st_mtime > STALE_TEMP_SECONDS:
+                        self.discard(path)
+                    continue
+                self._index[path] = (st.st_size, st.st_mtime)
+                self._total += st.st_size
+
+    def path_for(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.{ext}")
+
+    def get(self, key: str, ext: str) -> Optional[str]:
+        path = self.path_for(key, ext)
+        with self._lock:
+            self._load_index()
+            entry = self._index.get(path)
+            if entry is None or not os.path.exists(path):
+                self._index.pop(path, None)
+                self.misses += 1
+                return None
+            now = time.time()
+            self._index[path] = (entry[0], now)
+            self.hits += 1
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        return path
+
+    def open_temp(self, key: str):
+        """(file object, temp path) to write a new entry into; finish with commit() or discard()"""
+        directory = os.path.dirname(self.path_for(key, "x"))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp", dir=directory)
+        return os.fdopen(fd, "wb"), tmp
+
+    def commit(self, key: str, ext: str, tmp: str) -> str:
+        path = self.path_for(key, ext)
+        # The temp file may have been opened under another key (content-addressed commits)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp, path)
+        size = os.path.getsize(path)
+        with self._lock:
+            self._load_index()
+            old = self._index.get(path)
+            if old:
+                self._total -= old[0]
+            self._index[path] = (size, time.time())
+            self._total += size
+            self._evict()
+        return path
+
+    def pin(self, path: str) -> bool:
+        """Keep `path` from being evicted until unpin(); False when it's no longer cached"""
+        with self._lock:
+            self._load_index()
+            if path not in self._index:
+                return False
+            self._pins[path] = self._pins.get(path, 0) + 1
+            return True
+
+    def unpin(self, path: str):
+        with self._lock:
+            count = self._pins.pop(path, 0) - 1
+            if count > 0:
+                self._pins[path] = count
+
+    @staticmethod
+    def discard(tmp: str):
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        for path, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            if path in self._pins:
+                continue  # being sent right now; goes on a later pass
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            del self._index[path]
+            self._total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load_index()
+            return {
+                "files": len(self._index),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class PinnedFileResponse(FileResponse):
+    """FileResponse for a pinned cache file: eviction skips it until it's been sent (or the client left).
+
+    FileResponse uses the server's zero-copy send path (pathsend / sendfile) where there is one.
+    """
+
+    def __init__(self, cache: DiskCache, path: str, **kwargs):
+        super().__init__(path, **kwargs)
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.cache.unpin(self.path)
+
+
+def pinned_response(cache: DiskCache, path: str, **kwargs) -> Optional[PinnedFileResponse]:
+    """Response sending a cached file, or None when it was evicted since it was looked up"""
+    if not cache.pin(path):
+        return None
+    return PinnedFileResponse(cache, path, **kwargs)
@@ -0,0 +1,174 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import APIRouter, HTTPException
+
+from downloaders import metrics
+
+router = APIRouter(tags=["Executor"])
+
+
+class PoolStats:
+    """Running totals for one pool (queue wait and run time in seconds)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.run_time_total = 0.0
+        self.run_time_max = 0.0
+
+    def record(self, waited: float, ran: float, ok: bool):
+        with self._lock:
+            self.completed += 1
+            if not ok:
+                self.failed += 1
+            self.queue_wait_total += waited
+            self.queue_wait_max = max(self.queue_wait_max, waited)
+            self.run_time_total += ran
+            self.run_time_max = max(self.run_time_max, ran)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "queue_wait_avg": round(self.queue_wait_total / done, 4),
+                "queue_wait_max": round(self.queue_wait_max, 4),
+                "run_time_avg": round(self.run_time_total / done, 4),
+                "run_time_max": round(self.run_time_max, 4),
+            }
+
+
+class ExtractionExecutor:
+    """Bounded thread pool for blocking yt-dlp / requests work.
+
+    At most `workers` jobs run at once and at most `queue_depth` more may
+    wait for a free worker; anything beyond that is rejected with a 503.
+    """
+
+    def __init__(self, name: str, workers: int, queue_depth: int, retry_after: int = 5):
+        self.name = name
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+        self.stats = PoolStats()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-pool")
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._pending = 0
+        self._running = 0
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        return self._pending - self._running
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def _reject(self):
+        with self.stats._lock:
+            self.stats.rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail=f"Server busy ({self.name} queue full), try again later",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    def _call(self, ctx, enqueued_at, func, args, kwargs):
+        started = time.perf_counter()
+        with self._lock:
+            self._running += 1
+        ok = False
+        try:
+            result = ctx.run(func, *args, **kwargs)
+            ok = True
+            return result
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+            self._slots.release()
+            self.stats.record(started - enqueued_at, finished - started, ok)
+
+    async def run(self, func, *args, **kwargs):
+        """Run `func` on the pool and await its result without blocking the event loop"""
+        if not self._slots.acquire(blocking=False):
+            self._reject()
+        with self._lock:
+            self._pending += 1
+        with self.stats._lock:
+            self.stats.submitted += 1
+        ctx = contextvars.copy_context()
+        try:
+            future = self._pool.submit(self._call, ctx, time.perf_counter(), func, args, kwargs)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release_if_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _release_if_cancelled(self, future):
+        # A job cancelled before it started never reaches _call
+        if future.cancelled():
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "running": self.running,
+            "queued": self.queued,
+            **self.stats.snapshot(),
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ✅ Shared pools used by every router in downloaders/
+extraction_pool = ExtractionExecutor(
+    "extraction",
+    workers=int(os.getenv("EXTRACTION_WORKERS", "8")),
+    queue_depth=int(os.getenv("EXTRACTION_QUEUE_DEPTH", "64")),
+    retry_after=int(os.getenv("EXTRACTION_RETRY_AFTER", "5")),
+)
+
+POOLS = {extraction_pool.name: extraction_pool}
+
+metrics.register(metrics.Gauge(
+    "downloader_executor_queue_depth", "Jobs waiting for a worker", ("pool",),
+    lambda: [((name,), pool.queued) for name, pool in POOLS.items()]))
+metrics.register(metrics.Gauge(
+    "downloader_executor_running", "Jobs currently running", ("pool",),
+    lambda: [((name,), pool.running) for name, pool in POOLS.items()]))
+metrics.register(metrics.CounterFunc(
+    "downloader_executor_rejected_total", "Jobs rejected because the queue was full", ("pool",),
+    lambda: [((name,), pool.stats.rejected) for name, pool in POOLS.items()]))
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Shortcut for running blocking extraction work on the shared pool"""
+    return await extraction_pool.run(func, *args, **kwargs)
+
+
+@router.get("/executor/stats")
+def executor_stats():
+    return {name: pool.snapshot() for name, pool in POOLS.items()}
@@ -0,0 +1,126 @@
+import asyncio
+import contextvars
+import os
+from typing import Callable, List
+
+from fastapi import HTTPException
+
+from downloaders import deadline, hedging, metrics, negative, ratelimit
+from downloaders.cache import TTLCache, cache_key, extraction_cache, result_ttl
+from downloaders.singleflight import extraction_flight
+
+# Last good result per key, kept past its TTL to answer while an upstream is throttling us
+STALE_TTL = float(os.getenv("STALE_CACHE_TTL", "3600"))
+stale_cache = TTLCache(int(os.getenv("STALE_CACHE_SIZE", "1024")))
+
+
+# ✅ Observers (prewarm registers here): on_request(key, url, func) per request,
+# on_store(key, ttl) whenever a fresh result is cached
+on_request: List[Callable] = []
+on_store: List[Callable] = []
+
+# Whether the caller's last extract() was answered straight from the extraction cache
+served_from_cache = contextvars.ContextVar("served_from_cache", default=False)
+
+
+def is_cacheable(result) -> bool:
+    return isinstance(result, dict) and "error" not in result
+
+
+async def _store(key, result):
+    if is_cacheable(result):
+        negative.forget(key)
+        ttl = result_ttl(result)
+        await extraction_cache.aset(key, result, ttl)
+        stale_cache.set(key, result, STALE_TTL)
+        for hook in on_store:
+            hook(key, ttl)
+
+
+def _shared_deadline():
+    """The shared extraction's own deadline: never shorter than the default, whichever request started it"""
+    leader = deadline.current()
+    if leader is None:
+        return None  # pre-warming and other background work
+    return deadline.Deadline.after(max(deadline.REQUEST_DEADLINE, leader.remaining()))
+
+
+async def _run_and_store(key, url: str, func):
+    # The single-flight task: a short X-Request-Deadline on the first request must not cut it short for the rest
+    deadline.set_current(_shared_deadline())
+    guard = ratelimit.guard_for(url)
+    if guard is not None:
+        wait = guard.admit()
+        if wait is not None:
+            stale = stale_cache.get(key)
+            if stale is not None:
+                metrics.cache_requests.inc(key[0], "stale")
+                return stale
+            raise ratelimit.unavailable(guard, wait)
+    return await _run(key, url, func)
+
+
+async def _run(key, url: str, func):
+    refusals = ratelimit.watch_refusals()
+    try:
+        result = await hedging.run(key[0], func, url)
+    except HTTPException as e:
+        if _conclusive(refusals):
+            negative.record_exception(key, e)
+        raise
+    # Finished on the deadline's edge or past a refused call: probes / fallbacks were skipped, so keep neither
+    if _conclusive(refusals):
+        negative.record_result(key, result)
+        await _store(key, result)
+    return result
+
+
+def _conclusive(refusals: ratelimit.Refusals) -> bool:
+    """Whether the attempt got the upstream's real answer: in time, and without a guard skipping a call"""
+    return not deadline.expired() and not refusals.count
+
+
+async def _refresh(key, url: str, func):
+    return await _run(key, url, func)
+
+
+async def refresh(key, url: str, func):
+    """Re-run an extraction and replace its cache entry (background pre-warming).
+
+    Goes through single-flight, so a live miss at the same moment shares it;
+    the caller is responsible for the rate budget.
+    """
+    return await extraction_flight.do(key, lambda: _refresh(key, url, func))
+
+
+async def extract(platform: str, url: str, func, variant: str = ""):
+    """Serve `func(url)` from the extraction cache, running it on the shared pool on a miss.
+
+    Concurrent misses for the same media share a single extraction. `variant`
+    separates responses for the same media that differ by query (format filters).
+    """
+    key = cache_key(platform, url)
+    if variant:
+        key = (*key, variant)
+    for hook in on_request:
+        hook(key, url, func)
+    cached = await extraction_cache.aget(key)
+    served_from_cache.set(cached is not None)
+    if cached is not None:
+        metrics.cache_requests.inc(platform, "hit")
+        return cached
+    # Known-bad media (private, removed, image-only…) answer at once, with the status they first got
+    failed = negative.replay(key)
+    if failed is not None:
+        return failed
+    metrics.cache_requests.inc(platform, "miss")
+
+    flight = extraction_flight.do(key, lambda: _run_and_store(key, url, func))
+    waiting = deadline.current()
+    if waiting is None:
+        return await flight
+    # A request joining someone else's extraction still answers within its own deadline
+    try:
+        return await asyncio.wait_for(flight, waiting.remaining())
+    except asyncio.TimeoutError:
+        raise deadline.exceeded("extraction")
@@ -1,44 +1,23 @@
-from fastapi import APIRouter, HTTPException
-import yt_dlp
-import requests
-from bs4 import BeautifulSoup
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException
+from downloaders import ydl_pool, metrics
+from downloaders.extraction import extract
+from downloaders import registry
+from downloaders.sizes import format_bytes, resolve_sizes, probe_size
+from downloaders.meta import og_image
+from downloaders.audio import audio_link, estimated_size
+from downloaders.formats import DEFAULT_QUERY, FormatQuery, best_audio, collect, format_query, playable
 
 router = APIRouter(prefix="/facebook", tags=["Facebook"])
 
-# ✅ Convert bytes to readable format
-def format_bytes(size):
-    if not size:
-        return "N/A"
-    size_kb = size / 1024
-    return f"{round(size_kb / 1024, 2)} MB" if size_kb >= 1024 else f"{round(size_kb, 2)} KB"
-
-# ✅ Get file size from URL
-def get_file_size_from_url(url):
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        r = requests.head(url, allow_redirects=True, timeout=10, headers=headers)
-        if "Content-Length" in r.headers:
-            return format_bytes(int(r.headers["Content-Length"]))
-    except:
-        pass
-    return "N/A"
+EXTRACTORS = ["facebook", "facebook:reel", "facebookredirecturl", "facebookpluginsvideo"]
 
 # ✅ If yt-dlp fails, fallback to image-only
 def extract_image_from_html(fb_url):
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        r = requests.get(fb_url, headers=headers, timeout=10)
-        if r.status_code == 200:
-            soup = BeautifulSoup(r.text, 'html.parser')
-            og_img = soup.find("meta", property="og:image")
-            if og_img and og_img.get("content"):
-                return og_img["content"]
-    except:
-        pass
-    return None
+    return og_image(fb_url)
 
 # ✅ Main extractor
-def extract_facebook_info(url):
+def extract_facebook_info(url, query=DEFAULT_QUERY):
     ydl_opts = {
         'quiet': True,
         'no_warnings': True,
@@ -46,13 +25,17 @@ def extract_facebook_info(url):
         'forcejson': True,
         'format': 'bestvideo*+bestaudio/best',  # ✅ all formats including high quality
         'cookiefile': 'cookies.txt',            # ✅ needed for 1080p+ formats
+        'allowed_extractors': EXTRACTORS,
     }
 
     info = None
     error_message = ""
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        with ydl_pool.lease(ydl_opts) as ydl:
+            with metrics.stage("extract_info"):
+                info = ydl.extract_info(url, download=False)
+    except HTTPException:
+        raise  # every cookie account is out of budget (503)
     except Exception as e:
         error_message = str(e)
 
@@ -62,49 +45,52 @@ def extract_facebook_info(url):
     has_video = False
 
     if info:
-        title = info.get("title", title)
-        thumbnail = info.get("thumbnail")
-
-        for f in info.get("formats", []):
-            if f.get("acodec") != "none" and (f.get("vcodec") != "none" or f.get("ext") in ("m3u8", "mpd")):
-                has_video = True
-                height = f.get("height")
-                width = f.get("width")
-                format_note = f.get("format_note")
-                if height and width:
-                    quality = f"{height}p ({width}x{height})"
-                elif format_note:
-                    quality = format_note
-                else:
-                    quality = f.get("format_id", "Unknown")
-
-                url_f = f.get("url")
-                size = format_bytes(f.get("filesize")) if f.get("filesize") else get_file_size_from_url(url_f)
-
-                formats.append({
-                    "quality": quality,
-                    "file_size": size,
-                    "download_url": url_f
-                })
-
-        # ✅ MP3 Audio format (if audio-only present)
-        for f in info.get("formats", []):
-            if f.get("vcodec") == "none" and f.get("acodec") != "none":
-                url_f = f.get("url")
-                size = format_bytes(f.get("filesize")) if f.get("filesize") else get_file_size_from_url(url_f)
-                formats.append({
-                    "quality": "MP3 Audio",
-                    "file_size": size,
-                    "download_url": url_f
-                })
-                break
+        extracted = collect(info)
+        del info
+        title = extracted.title or title
+        thumbnail = extracted.thumbnail
+
+        # ✅ Video formats (with audio)
+        selected = []
+        for f in playable(extracted.formats, query):
+            has_video = True
+            if f.height and f.width:
+                quality = f"{f.height}p ({f.width}x{f.height})"
+            else:
+                quality = f.note or f.format_id or "Unknown"
+            selected.append((quality, f))
+
+        # ✅ Audio-only stream as-is (if present)
+        audio = best_audio(extracted.formats, query)
+        if audio:
+            selected.append((f"Audio ({audio.ext})", audio))
+
+        # ✅ Probe missing sizes concurrently
+        sizes = resolve_sizes([f for _, f in selected], extracted.duration)
+        for (quality, f), size in zip(selected, sizes):
+            formats.append({
+                "quality": quality,
+                "file_size": format_bytes(size.bytes),
+                "size_source": size.source,
+                "download_url": f.url
+            })
+
+        # ✅ Real MP3, converted server-side
+        if selected and query.audio:
+            size = estimated_size(extracted.duration)
+            formats.append({
+                "quality": "MP3 Audio",
+                "file_size": format_bytes(size.bytes),
+                "size_source": size.source,
+                "download_url": audio_link(url)
+            })
 
         # ✅ Sort formats by quality (height)
         def extract_height(quality_str):
             if "p" in quality_str:
                 try:
                     return int(quality_str.split("p")[0])
-                except:
+                except ValueError:
                     return 0
             return 0
 
@@ -120,15 +106,17 @@ def extract_facebook_info(url):
             image_url = extract_image_from_html(url)
 
         if image_url:
-            size = get_file_size_from_url(image_url)
+            size = probe_size(image_url)
             formats.append({
                 "quality": "Image",
-                "file_size": size,
+                "file_size": format_bytes(size.bytes),
+                "size_source": size.source,
                 "download_url": image_url
             })
             thumbnail = image_url
         else:
-            return {"error": "Image not found. It may be private or unsupported."}
+            # yt-dlp's own reason when it failed: "Image not found" would hide a timeout or a rate limit
+            return {"error": error_message or "Image not found. It may be private or unsupported."}
 
     return {
         "title": title,
@@ -138,13 +126,14 @@ def extract_facebook_info(url):
 
 # ✅ FastAPI endpoint
 @router.get("/download")
-def download_facebook(url: str):
-    if "facebook.com" not in url:
-        raise HTTPException(status_code=400, detail="Invalid Facebook URL")
+async def download_facebook(url: str, query: FormatQuery = Depends(format_query)):
+    registry.validate(url, "facebook", "Invalid Facebook URL")
 
-    result = extract_facebook_info(url)
+    result = await extract("facebook", url, partial(extract_facebook_info, query=query), query.variant())
 
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
 
-    return result
\ No newline at end of file
+    return result
+
+registry.register("facebook", ("facebook.com", "fb.watch", "fb.com"), EXTRACTORS, download_facebook, cookies=True)
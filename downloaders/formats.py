@@ -0,0 +1,192 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional
+
+from fastapi import Query
+
+MANIFEST_EXTS = ("m3u8", "mpd")
+
+
+@dataclass(slots=True)
+class FormatRecord:
+    """The handful of yt-dlp format fields the routers actually return or rank by"""
+
+    url: str
+    format_id: str = ""
+    ext: str = ""
+    protocol: str = ""
+    vcodec: Optional[str] = None
+    acodec: Optional[str] = None
+    height: int = 0
+    width: int = 0
+    fps: Optional[float] = None
+    abr: float = 0.0
+    tbr: float = 0.0
+    note: Optional[str] = None
+    filesize: Optional[int] = None
+    filesize_approx: Optional[int] = None
+    http_headers: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_ytdlp(cls, f: Dict) -> "FormatRecord":
+        return cls(
+            url=f["url"],
+            format_id=str(f.get("format_id") or ""),
+            ext=f.get("ext") or "",
+            protocol=f.get("protocol") or "",
+            vcodec=f.get("vcodec"),
+            acodec=f.get("acodec"),
+            height=f.get("height") or 0,
+            width=f.get("width") or 0,
+            fps=f.get("fps"),
+            abr=f.get("abr") or 0.0,
+            tbr=f.get("tbr") or 0.0,
+            note=f.get("format_note"),
+            filesize=f.get("filesize"),
+            filesize_approx=f.get("filesize_approx"),
+            http_headers=f.get("http_headers") or {},
+        )
+
+    # yt-dlp uses "none" for a missing stream; None means "unknown", which counts as present
+    @property
+    def has_video(self) -> bool:
+        return self.vcodec != "none"
+
+    @property
+    def has_audio(self) -> bool:
+        return self.acodec != "none"
+
+    @property
+    def is_direct(self) -> bool:
+        return self.protocol in ("http", "https")
+
+    @property
+    def muxed(self) -> bool:
+        return self.has_video and self.has_audio
+
+    @property
+    def audio_only(self) -> bool:
+        return self.has_audio and not self.has_video
+
+    @property
+    def video_only(self) -> bool:
+        return self.has_video and not self.has_audio
+
+    def label(self) -> str:
+        return f"{self.height}p" if self.height else self.format_id
+
+
+@dataclass(slots=True)
+class Extracted:
+    """What's left of a yt-dlp info dict once formats are picked; the info itself is dropped"""
+
+    title: Optional[str]
+    thumbnail: Optional[str]
+    duration: Optional[float]
+    webpage_url: str
+    image_url: Optional[str]
+    formats: List[FormatRecord]
+
+
+def collect(info: Dict) -> Extracted:
+    """One pass over info["formats"]: keep formats that have a URL, as slim records"""
+    thumbnails = info.get("thumbnails") or []
+    return Extracted(
+        title=info.get("title"),
+        thumbnail=info.get("thumbnail"),
+        duration=info.get("duration"),
+        webpage_url=info.get("webpage_url") or "",
+        image_url=info.get("display_url") or (thumbnails[-1].get("url") if thumbnails else None),
+        formats=[FormatRecord.from_ytdlp(f) for f in info.get("formats") or () if f.get("url")],
+    )
+
+
+class FormatQuery(NamedTuple):
+    """Client-side narrowing of the format list (`?max_height=720&prefer=mp4&audio=0`)"""
+
+    max_height: Optional[int] = None
+    prefer: Optional[str] = None  # container (mp4, webm) or codec prefix (avc1, vp9, av01)
+    audio: bool = True
+
+    def variant(self) -> str:
+        """Cache key suffix; empty for the default query so existing entries keep their keys"""
+        if self == DEFAULT_QUERY:
+            return ""
+        return f"h{self.max_height or ''}:p{self.prefer or ''}:a{int(self.audio)}"
+
+    def allows(self, f: FormatRecord) -> bool:
+        return not self.max_height or not f.height or f.height <= self.max_height
+
+    def preferred(self, f: FormatRecord) -> bool:
+        if not self.prefer:
+            return False
+        return f.ext == self.prefer or (f.vcodec or "").startswith(self.prefer)
+
+
+DEFAULT_QUERY = FormatQuery()
+
+
+def format_query(
+    max_height: Optional[int] = Query(None, ge=1, description="Drop formats taller than this"),
+    prefer: Optional[str] = Query(None, description="Preferred container or codec, e.g. mp4 / webm / avc1"),
+    audio: bool = Query(True, description="Include audio-only entries"),
+) -> FormatQuery:
+    return FormatQuery(max_height, prefer.lower() if prefer else None, audio)
+
+
+def _rank(f: FormatRecord, query: FormatQuery):
+    # Same height: preferred container/codec, then a directly downloadable file, then bitrate
+    return (query.preferred(f), f.is_direct, f.tbr, f.fps or 0)
+
+
+def playable(formats: List[FormatRecord], query: FormatQuery = DEFAULT_QUERY,
+             manifests: bool = True) -> List[FormatRecord]:
+    """Every video+audio format the query allows, in yt-dlp's order.
+
+    .m3u8 / .mpd manifests count even when yt-dlp doesn't know their codecs,
+    since several sites only list those; `manifests=False` keeps plain
+    http(s) files only. With `prefer`, heights that have a preferred format
+    drop their other formats.
+    """
+    picked = []
+    for f in formats:
+        if not f.has_audio or not (f.has_video or f.ext in MANIFEST_EXTS):
+            continue
+        if (not manifests and not f.is_direct) or not query.allows(f):
+            continue
+        picked.append(f)
+    if query.prefer:
+        preferred_heights = {f.height for f in picked if query.preferred(f)}
+        picked = [f for f in picked if query.preferred(f) or f.height not in preferred_heights]
+    return picked
+
+
+def videos(formats: List[FormatRecord], query: FormatQuery = DEFAULT_QUERY,
+           manifests: bool = True) -> List[FormatRecord]:
+    """playable() narrowed to the best format per height, tallest first; formats without a height are all kept"""
+    best: Dict[int, FormatRecord] = {}
+    unsized: List[FormatRecord] = []
+    for f in playable(formats, query, manifests):
+        if not f.height:
+            unsized.append(f)
+        elif f.height not in best or _rank(f, query) > _rank(best[f.height], query):
+            best[f.height] = f
+    return [best[h] for h in sorted(best, reverse=True)] + unsized
+
+
+def best_video(formats: List[FormatRecord], query: FormatQuery = DEFAULT_QUERY,
+               manifests: bool = True) -> Optional[FormatRecord]:
+    picked = videos(formats, query, manifests)
+    return picked[0] if picked else None
+
+
+def video_only(formats: List[FormatRecord], query: FormatQuery = DEFAULT_QUERY) -> List[FormatRecord]:
+    """Separate (DASH) video streams within the query's height limit"""
+    return [f for f in formats if f.video_only and f.height and query.allows(f)]
+
+
+def best_audio(formats: List[FormatRecord], query: FormatQuery = DEFAULT_QUERY) -> Optional[FormatRecord]:
+    """Highest-bitrate audio-only format (preferred container first); None when audio=0"""
+    if not query.audio:
+        return None
+    audios = [f for f in formats if f.audio_only]
+    return max(audios, key=lambda f: (query.preferred(f), f.abr)) if audios else None
@@ -0,0 +1,157 @@
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from fastapi import APIRouter
+
+from downloaders import deadline, metrics, ratelimit
+from downloaders.executor import extraction_pool, run_blocking
+
+router = APIRouter(tags=["Executor"])
+
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "1") == "1"
+# A second attempt starts once the first has run longer than this percentile of recent extractions
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))
+# Until a platform has this many samples its percentile means little: no hedging
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "1"))
+# yt-dlp extractor_args for the hedged attempt: a different YouTube client often
+# dodges whatever is slow for the default ones. The cookie rotation gives it the next account.
+HEDGE_EXTRACTOR_ARGS = json.loads(os.getenv(
+    "HEDGE_EXTRACTOR_ARGS", '{"youtube": {"player_client": ["web_safari", "tv"]}}'))
+
+PRIMARY, HEDGE = "primary", "hedge"
+
+hedges = metrics.register(metrics.Counter(
+    "downloader_hedges_total", "Hedged extraction attempts: fired, won (hedge answered first) or skipped",
+    ("platform", "result")))
+
+# Which attempt the current thread is running; ydl_pool reads it to pick the alternate profile
+attempt_var: contextvars.ContextVar = contextvars.ContextVar("hedge_attempt", default=PRIMARY)
+
+
+def alternate_opts(opts: dict) -> dict:
+    """yt-dlp options for a hedged attempt"""
+    if attempt_var.get() != HEDGE or not HEDGE_EXTRACTOR_ARGS:
+        return opts
+    merged = {ie: dict(args) for ie, args in (opts.get("extractor_args") or {}).items()}
+    for ie, args in HEDGE_EXTRACTOR_ARGS.items():
+        merged.setdefault(ie, {}).update(args)
+    return {**opts, "extractor_args": merged}
+
+
+class LatencyTracker:
+    """Recent extraction durations per platform, for the hedge delay"""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, platform: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(platform)
+            if samples is None:
+                samples = self._samples[platform] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, platform: str, q: float = HEDGE_PERCENTILE) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(platform, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def hedge_delay(self, platform: str) -> Optional[float]:
+        value = self.percentile(platform)
+        return None if value is None else max(HEDGE_MIN_DELAY, value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            platforms = list(self._samples)
+        return {name: {"samples": len(self._samples[name]),
+                       "hedge_after": self.hedge_delay(name)} for name in platforms}
+
+
+latency = LatencyTracker()
+
+
+def _attempt(platform: str, attempt_deadline: Optional[deadline.Deadline], attempt: str, func, url: str):
+    # Runs on a pool thread in its own copy of the context, so these don't leak between attempts
+    deadline.set_current(attempt_deadline)
+    attempt_var.set(attempt)
+    start = time.perf_counter()
+    result = func(url)
+    # Only finished, successful attempts: a failure or a cancelled loser says nothing about extraction time
+    cancelled = attempt_deadline is not None and attempt_deadline.cancelled
+    if not cancelled and not (isinstance(result, dict) and "error" in result):
+        latency.observe(platform, time.perf_counter() - start)
+    return result
+
+
+def _can_hedge(url: str) -> bool:
+    """Only with a worker to spare and a token in the upstream's budget: hedging must not add queueing"""
+    if extraction_pool.queued > 0 or extraction_pool.running >= extraction_pool.workers:
+        return False
+    guard = ratelimit.guard_for(url)
+    return guard is None or guard.admit() is None
+
+
+async def run(platform: str, func, url: str):
+    """`func(url)` on the extraction pool within the request's deadline, hedged when it runs long.
+
+    Past the platform's latency percentile a second attempt starts with the
+    alternate profile; the first to finish (result or error) is returned. The
+    loser's deadline is cancelled, so its size probes and HTML fallback bail
+    out early; the yt-dlp call it may be in can't be interrupted and simply
+    finishes in the background. Requests without a deadline (pre-warming)
+    are never hedged.
+    """
+    parent = deadline.current()
+    if parent is None:
+        return await run_blocking(_attempt, platform, None, PRIMARY, func, url)
+
+    attempts: Dict[asyncio.Future, deadline.Deadline] = {}
+
+    def start(attempt: str) -> asyncio.Future:
+        child = parent.child()
+        task = asyncio.ensure_future(run_blocking(_attempt, platform, child, attempt, func, url))
+        attempts[task] = child
+        return task
+
+    primary = start(PRIMARY)
+    hedge = None
+    try:
+        delay = latency.hedge_delay(platform) if HEDGE_ENABLED else None
+        if delay is not None and delay < parent.remaining():
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if not done:
+                if _can_hedge(url):
+                    hedge = start(HEDGE)
+                    hedges.inc(platform, "fired")
+                else:
+                    hedges.inc(platform, "skipped")
+
+        done, _ = await asyncio.wait(attempts, timeout=parent.remaining(), return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            raise deadline.exceeded("extraction")
+        winner = primary if primary in done else done.pop()
+        if winner is hedge:
+            hedges.inc(platform, "won")
+        return winner.result()
+    finally:
+        for task, child in attempts.items():
+            if not task.done():
+                child.cancel()
+                task.cancel()
+
+
+@router.get("/hedging/stats")
+def hedging_stats():
+    return {"enabled": HEDGE_ENABLED, "percentile": HEDGE_PERCENTILE, "platforms": latency.stats()}
@@ -1,37 +1,31 @@
-from fastapi import APIRouter, HTTPException
-import yt_dlp
-import requests
-import os
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException
+from downloaders.lazy import lazy_import
+from downloaders import ydl_pool, metrics
 import logging
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse
+from downloaders.extraction import extract
+from downloaders import registry
+from downloaders.sizes import format_bytes, resolve_sizes, probe_size
+from downloaders.meta import og_image
+from downloaders.formats import DEFAULT_QUERY, FormatQuery, best_audio, best_video, collect, format_query
+
+yt_dlp = lazy_import("yt_dlp")  # imported on first use or by the warm-up task
 
 router = APIRouter(
     prefix="/instagram",
     tags=["Instagram Downloader"]
 )
 
+EXTRACTORS = ["instagram", "instagramios"]
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# 🔹 Size formatting helper
-def format_bytes(size):
-    if not size:
-        return "N/A"
-    size_kb = size / 1024
-    return f"{round(size_kb / 1024, 2)} MB" if size_kb >= 1024 else f"{round(size_kb, 2)} KB"
-
-# 🔹 File size via HEAD request
-def get_file_size_from_url(url):
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        r = requests.head(url, allow_redirects=True, timeout=10, headers=headers)
-        if "Content-Length" in r.headers:
-            return format_bytes(int(r.headers["Content-Length"]))
-    except:
-        pass
-    return "Unknown"
+# 🔹 Size label (Instagram responses say "Unknown" when no size is known)
+def size_label(size):
+    return format_bytes(size.bytes) if size.bytes else "Unknown"
 
 # 🔹 Format from URL path
 def get_file_format(url):
@@ -44,71 +38,81 @@ def get_file_format(url):
         pass
     return "unknown"
 
-# 🔹 BeautifulSoup to extract full image (uncropped)
+# 🔹 og:image from the page <head> (full, uncropped image)
 def extract_full_image_url(insta_url):
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        r = requests.get(insta_url, headers=headers, timeout=10)
-        if r.status_code == 200:
-            soup = BeautifulSoup(r.text, 'html.parser')
-            og_img = soup.find("meta", property="og:image")
-            if og_img and og_img.get("content"):
-                return og_img["content"]
-    except Exception as e:
-        logger.warning(f"Image extraction failed: {e}")
-    return None
-
-# 🔹 Main Endpoint
-@router.get("/download")
-async def download_instagram(url: str):
-    if not url.startswith(('https://www.instagram.com/', 'http://www.instagram.com/')):
-        raise HTTPException(status_code=400, detail="Invalid Instagram URL")
+    image_url = og_image(insta_url)
+    if not image_url:
+        logger.warning(f"Image extraction failed: no og:image on {insta_url}")
+    return image_url
+
+# 🔹 Image post response
+def image_post_response(title, image_url):
+    size = probe_size(image_url)
+    return {
+        "type": "image",
+        "title": title,
+        "thumbnail": image_url,
+        "formats": [
+            {
+                "quality": "Original Image",
+                "file_size": size_label(size),
+                "size_source": size.source,
+                "download_url": image_url,
+                "format": get_file_format(image_url),
+                "type": "image"
+            }
+        ]
+    }
 
+# 🔹 Main extractor (blocking, runs on the extraction pool)
+def extract_instagram_info(url, query=DEFAULT_QUERY):
     ydl_opts = {
         'quiet': True,
         'no_warnings': True,
-        'cookiefile': 'cookies.txt' if os.path.exists('cookies.txt') else None,
+        'cookiefile': 'cookies.txt',
         'forcejson': True,
         'skip_download': True,
+        'allowed_extractors': EXTRACTORS,
     }
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        with ydl_pool.lease(ydl_opts) as ydl:
+            with metrics.stage("extract_info"):
+                info = ydl.extract_info(url, download=False)
+
+        extracted = collect(info)
+        del info
 
         # ✅ Handle Video Post
-        if info.get("formats"):
+        if extracted.formats:
             results = {
                 'type': 'video',
-                'title': info.get('title', 'Instagram Video'),
-                'thumbnail': info.get('thumbnail'),
+                'title': extracted.title or 'Instagram Video',
+                'thumbnail': extracted.thumbnail,
                 'formats': []
             }
 
+            picks = []
+
             # Best video+audio
-            video_with_audio = [f for f in info['formats'] if f.get('vcodec') != 'none' and f.get('acodec') != 'none']
-            if video_with_audio:
-                best = max(video_with_audio, key=lambda x: x.get("height", 0))
-                url_v = best.get("url")
-                results['formats'].append({
-                    "quality": f"{best.get('height', '')}p (with audio)",
-                    "url": url_v,
-                    "size": get_file_size_from_url(url_v),
-                    "format": get_file_format(url_v),
-                    "type": "video+audio"
-                })
+            best = best_video(extracted.formats, query)
+            if best:
+                picks.append((f"{best.height or ''}p (with audio)", best, "video+audio"))
 
             # Audio only
-            audio_only = [f for f in info['formats'] if f.get('vcodec') == 'none' and f.get('acodec') != 'none']
-            if audio_only:
-                best_audio = max(audio_only, key=lambda x: x.get("abr", 0))
-                url_a = best_audio.get("url")
+            best_audio_f = best_audio(extracted.formats, query)
+            if best_audio_f:
+                picks.append((f"Audio ({best_audio_f.abr}kbps)", best_audio_f, "audio"))
+
+            sizes = resolve_sizes([f for _, f, _ in picks], extracted.duration)
+            for (quality, f, kind), size in zip(picks, sizes):
                 results['formats'].append({
-                    "quality": f"Audio ({best_audio.get('abr', 0)}kbps)",
-                    "url": url_a,
-                    "size": get_file_size_from_url(url_a),
-                    "format": get_file_format(url_a),
-                    "type": "audio"
+                    "quality": quality,
+                    "url": f.url,
+                    "size": size_label(size),
+                    "size_source": size.source,
+                    "format": get_file_format(f.url),
+                    "type": kind
                 })
 
             return results
@@ -116,20 +120,7 @@ async def download_instagram(url: str):
         # ✅ Handle Image Post (fallback if no formats)
         image_url = extract_full_image_url(url)
         if image_url:
-            return {
-                "type": "image",
-                "title": info.get("title", "Instagram Image"),
-                "thumbnail": image_url,
-                "formats": [
-                    {
-                        "quality": "Original Image",
-                        "file_size": get_file_size_from_url(image_url),
-                        "download_url": image_url,
-                        "format": get_file_format(image_url),
-                        "type": "image"
-                    }
-                ]
-            }
+            return image_post_response(extracted.title or "Instagram Image", image_url)
 
         raise HTTPException(status_code=404, detail="Image not found (maybe private or unsupported).")
 
@@ -137,22 +128,21 @@ async def download_instagram(url: str):
         logger.warning(f"yt-dlp failed: {e}")
         image_url = extract_full_image_url(url)
         if image_url:
-            return {
-                "type": "image",
-                "title": "Instagram Image",
-                "thumbnail": image_url,
-                "formats": [
-                    {
-                        "quality": "Original Image",
-                        "file_size": get_file_size_from_url(image_url),
-                        "download_url": image_url,
-                        "format": get_file_format(image_url),
-                        "type": "image"
-                    }
-                ]
-            }
-        raise HTTPException(status_code=500, detail="Image not found (maybe private or unsupported).")
+            return image_post_response("Instagram Image", image_url)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    except HTTPException:
+        raise
 
     except Exception as e:
         logger.exception("Server error:")
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# 🔹 Main Endpoint
+@router.get("/download")
+async def download_instagram(url: str, query: FormatQuery = Depends(format_query)):
+    registry.validate(url, "instagram", "Invalid Instagram URL")
+
+    return await extract("instagram", url, partial(extract_instagram_info, query=query), query.variant())
+
+registry.register("instagram", ("instagram.com", "instagr.am"), EXTRACTORS, download_instagram, cookies=True)
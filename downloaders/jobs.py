@@ -0,0 +1,340 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from downloaders import audio, batch, deadline, metrics, registry
+from downloaders.audio import DEFAULT_BITRATE
+from downloaders.cache import canonical_key
+from downloaders.formats import FormatQuery
+
+router = APIRouter(tags=["Jobs"])
+logger = logging.getLogger(__name__)
+
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "4"))
+# Jobs waiting for a worker; beyond this POST /jobs answers 503
+JOBS_QUEUE_MAX = int(os.getenv("JOBS_QUEUE_MAX", "256"))
+# Finished jobs (and their results) are kept this long, at most JOBS_MAX of them
+JOBS_RESULT_TTL = float(os.getenv("JOBS_RESULT_TTL", "3600"))
+JOBS_MAX = int(os.getenv("JOBS_MAX", "10000"))
+JOBS_TIMEOUT = float(os.getenv("JOBS_TIMEOUT", "900"))
+JOBS_RETRY_AFTER = int(os.getenv("JOBS_RETRY_AFTER", "10"))
+# Seconds between SSE keep-alive comments, so proxies don't close an idle stream
+JOBS_KEEPALIVE = float(os.getenv("JOBS_KEEPALIVE", "15"))
+
+# Lower runs first: people waiting on a page go ahead of bulk imports
+PRIORITIES = {"interactive": 0, "batch": 1}
+KINDS = ("resolve", "audio")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobRequest(BaseModel):
+    url: str
+    kind: str = "resolve"  # resolve: the /resolve response; audio: an MP3/Opus file in the audio cache
+    priority: str = "interactive"
+    max_height: Optional[int] = None
+    prefer: Optional[str] = None
+    audio: bool = True
+    codec: str = "mp3"
+    bitrate: int = DEFAULT_BITRATE
+
+    def query(self) -> FormatQuery:
+        return FormatQuery(self.max_height, self.prefer.lower() if self.prefer else None, self.audio)
+
+    def dedupe_key(self):
+        if self.kind == "audio":
+            return (self.kind, *canonical_key(self.url), self.codec, self.bitrate)
+        return (self.kind, *canonical_key(self.url), self.query().variant())
+
+
+class Job:
+    """One submitted job; every change wakes whoever is streaming its events"""
+
+    def __init__(self, job_id: str, request: JobRequest):
+        self.id = job_id
+        self.request = request
+        self.status = QUEUED
+        self.stage = QUEUED
+        self.progress: Dict = {}
+        self.result = None
+        self.error: Optional[Dict] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def update(self, stage: str = None, **progress):
+        if stage is not None:
+            self.stage = stage
+        self.progress.update(progress)
+        self.version += 1
+        # Wake current waiters; later ones wait on a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_change(self, version: int, timeout: float) -> bool:
+        """True once the job has moved past `version`, False on timeout"""
+        if self.version != version:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def view(self) -> dict:
+        view = {
+            "id": self.id,
+            "kind": self.request.kind,
+            "url": self.request.url,
+            "priority": self.request.priority,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == DONE:
+            view["result"] = self.result
+        elif self.status == FAILED:
+            view["error"] = self.error
+        return view
+
+
+class JobRunner:
+    """Fixed set of asyncio workers draining one priority queue.
+
+    Workers only orchestrate: the blocking extraction still runs on the
+    shared extraction pool (and conversions on ffmpeg slots), so jobs and
+    live requests share the same limits. Queued or running jobs for the
+    same media are deduplicated, so a client that retries gets the job it
+    already has.
+    """
+
+    def __init__(self, workers: int = JOBS_WORKERS, queue_max: int = JOBS_QUEUE_MAX):
+        self.workers = workers
+        self.queue_max = queue_max
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict = {}  # dedupe key → queued / running job
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._seq = itertools.count()
+        self._tasks = []
+        self._purged_at = 0.0
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _purge(self):
+        """Drop finished jobs past their TTL, and the oldest finished ones while over JOBS_MAX"""
+        now = time.time()
+        excess = len(self._jobs) - JOBS_MAX
+        if excess <= 0 and now - self._purged_at < 1:
+            return
+        self._purged_at = now
+        for job in list(self._jobs.values()):
+            if job.finished and (excess > 0 or now - job.finished_at > JOBS_RESULT_TTL):
+                del self._jobs[job.id]
+                excess -= 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._purge()
+        return self._jobs.get(job_id)
+
+    def submit(self, request: JobRequest) -> Job:
+        if self._queue is None:
+            self.start()
+        self._purge()
+        key = request.dedupe_key()
+        existing = self._active.get(key)
+        if existing is not None:
+            self.deduplicated += 1
+            return existing
+        if self._queue.qsize() >= self.queue_max:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Job queue full, try again later",
+                                headers={"Retry-After": str(JOBS_RETRY_AFTER)})
+
+        job = Job(secrets.token_urlsafe(12), request)
+        self._jobs[job.id] = job
+        self._active[key] = job
+        self._queue.put_nowait((PRIORITIES[request.priority], next(self._seq), job))
+        self.submitted += 1
+        return job
+
+    async def _execute(self, job: Job):
+        request = job.request
+        if request.kind == "audio":
+            loop = asyncio.get_running_loop()
+            path = await audio.convert_to_cache(
+                request.url, request.codec, request.bitrate,
+                on_progress=lambda written: loop.call_soon_threadsafe(
+                    lambda: job.update("converting", bytes=written)))
+            return {
+                "url": audio.audio_link(request.url, request.codec, request.bitrate),
+                "bytes": os.path.getsize(path),
+            }
+        job.update("extracting")
+        outcome = await batch.resolve_url(request.url, request.query())
+        if "error" in outcome or outcome["status"] != 200:
+            raise HTTPException(status_code=outcome["status"],
+                                detail=outcome.get("error") or outcome.get("result"))
+        return outcome["result"]
+
+    async def _run(self, job: Job):
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.update(RUNNING)
+        # Jobs have no client waiting on a socket: their deadline is the job timeout
+        deadline.set_current(deadline.Deadline.after(JOBS_TIMEOUT))
+        try:
+            job.result = await asyncio.wait_for(self._execute(job), JOBS_TIMEOUT)
+            job.status = DONE
+            self.completed += 1
+        except asyncio.TimeoutError:
+            job.status = FAILED
+            job.error = {"status": 504, "detail": f"Job took longer than {JOBS_TIMEOUT:.0f}s"}
+            self.failed += 1
+        except HTTPException as e:
+            job.status = FAILED
+            job.error = {"status": e.status_code, "detail": e.detail}
+            self.failed += 1
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed")
+            job.status = FAILED
+            job.error = {"status": 500, "detail": str(e)}
+            self.failed += 1
+        finally:
+            job.finished_at = time.time()
+            self._active.pop(job.request.dedupe_key(), None)
+            job.update(job.status)
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def start(self):
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        if not self._tasks:
+            self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def stats(self) -> dict:
+        by_status: Dict[str, int] = {}
+        for job in self._jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_max": self.queue_max,
+            "jobs": by_status,
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+runner = JobRunner()
+
+metrics.register(metrics.Gauge(
+    "downloader_jobs_queued", "Jobs waiting for a job worker", (),
+    lambda: [((), runner._queue.qsize() if runner._queue is not None else 0)]))
+metrics.register(metrics.CounterFunc(
+    "downloader_jobs_failed_total", "Jobs that finished with an error", (),
+    lambda: [((), runner.failed)]))
+
+
+def _lookup(job_id: str) -> Job:
+    job = runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def job_events(job: Job, request: Request):
+    """One `progress` event per change (changes in between are collapsed), then `done`"""
+    version = -1
+    while True:
+        if version != job.version:
+            version = job.version
+            if job.finished:
+                yield _sse("done", job.view())
+                return
+            yield _sse("progress", {"status": job.status, "stage": job.stage, "progress": job.progress})
+        if await request.is_disconnected():
+            return
+        if not await job.wait_change(version, JOBS_KEEPALIVE):
+            yield ": keepalive\n\n"
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    """Queue an extraction / conversion and return its ID right away; poll it or stream its events"""
+    if request.kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(KINDS)}")
+    if request.priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of {', '.join(PRIORITIES)}")
+    if request.kind == "audio":
+        audio.check_request(request.url, request.codec, request.bitrate)
+    elif registry.lookup(request.url) is None:
+        raise HTTPException(status_code=400, detail="Unsupported URL")
+
+    job = runner.submit(request)
+    return JSONResponse(
+        status_code=202,
+        content={**job.view(), "status_url": f"/jobs/{job.id}", "events_url": f"/jobs/{job.id}/events"},
+        headers={"Location": f"/jobs/{job.id}"},
+    )
+
+
+# Every route here is async: the runner's dicts are only touched from the event loop, never the threadpool
+@router.get("/jobs/stats")
+async def jobs_stats():
+    return runner.stats()
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    return _lookup(job_id).view()
+
+
+@router.get("/jobs/{job_id}/events")
+async def get_job_events(job_id: str, request: Request):
+    """Server-sent events: `progress` on every status / stage change, `done` with the final view"""
+    job = _lookup(job_id)
+    return StreamingResponse(job_events(job, request), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,23 @@
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a heavy module: the real import happens on first attribute access.
+
+    Goes through importlib every time, so concurrent first uses from worker
+    threads are serialized by the import lock like any normal import.
+    """
+
+    def __getattr__(self, name):
+        return getattr(importlib.import_module(self.__name__), name)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """`yt_dlp = lazy_import("yt_dlp")` instead of `import yt_dlp` at the top of a router"""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def is_loaded(name: str) -> bool:
+    return name in sys.modules
@@ -1,11 +1,23 @@
-from fastapi import APIRouter, Query
+from functools import partial
+from fastapi import APIRouter, Depends, Query, HTTPException
 from downloaders.utils import extract_video_info
+from downloaders.extraction import extract
+from downloaders import registry
+from downloaders.formats import FormatQuery, format_query
 
 router = APIRouter()
 
+EXTRACTORS = ["linkedin"]
+
 @router.get("/download/linkedin")
-def download_linkedin(url: str = Query(...)):
+async def download_linkedin(url: str = Query(...), query: FormatQuery = Depends(format_query)):
+    registry.validate(url, "linkedin", "Invalid LinkedIn URL")
     try:
-        return extract_video_info(url)
+        return await extract("linkedin", url, partial(extract_video_info, allowed_extractors=EXTRACTORS, query=query),
+                             query.variant())
+    except HTTPException:
+        raise
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+registry.register("linkedin", ("linkedin.com", "lnkd.in"), EXTRACTORS, download_linkedin, cookies=True)
@@ -0,0 +1,125 @@
+import os
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from downloaders import metrics, registry, transcode
+from downloaders.extraction import extract
+from downloaders.formats import DEFAULT_QUERY, FormatQuery, FormatRecord, video_only
+from downloaders.lazy import lazy_import
+from downloaders.stream import format_table, safe_filename
+from downloaders.transcode import FFmpegProcess
+
+router = APIRouter(tags=["Stream"])
+ffmpeg = lazy_import("ffmpeg")
+
+MERGE_MAX_PROCESSES = int(os.getenv("MERGE_MAX_PROCESSES", "4"))
+MERGE_RETRY_AFTER = int(os.getenv("MERGE_RETRY_AFTER", "10"))
+
+_slots = threading.BoundedSemaphore(MERGE_MAX_PROCESSES)
+
+
+def _video_rank(f: FormatRecord, query: FormatQuery):
+    # Same height: the client's preference, then mp4 (H.264), which remuxes into MP4 everywhere
+    return (query.preferred(f), f.ext == "mp4", f.tbr)
+
+
+def _audio_rank(f: FormatRecord):
+    return (f.ext == "m4a", f.abr)
+
+
+def best_audio_only(formats: List[FormatRecord]) -> Optional[FormatRecord]:
+    audios = [f for f in formats if f.audio_only and f.acodec is not None]
+    return max(audios, key=_audio_rank) if audios else None
+
+
+def merge_link(url: str, video_format: str, audio_format: str) -> str:
+    return "/merge?" + urlencode({"url": url, "video_format": video_format, "audio_format": audio_format})
+
+
+def merge_candidates(url: str, formats: List[FormatRecord], query: FormatQuery = DEFAULT_QUERY) -> List[Dict]:
+    """One merge link per DASH height that has no progressive (video+audio) format"""
+    audio = best_audio_only(formats)
+    if not audio:
+        return []
+    # Heights only offered as HLS still get a merge link: the manifest isn't a downloadable file
+    progressive = {f.height for f in formats
+                   if f.muxed and f.is_direct and f.vcodec is not None and f.acodec is not None}
+    best_by_height: Dict[int, FormatRecord] = {}
+    for f in video_only(formats, query):
+        if f.height in progressive or f.vcodec is None:
+            continue
+        if f.height not in best_by_height or _video_rank(f, query) > _video_rank(best_by_height[f.height], query):
+            best_by_height[f.height] = f
+    return [
+        {
+            "quality": f"{height}p",
+            "format": "mp4",
+            "fps": f.fps,
+            "url": merge_link(url, f.format_id, audio.format_id),
+        }
+        for height, f in sorted(best_by_height.items(), reverse=True)
+    ]
+
+
+def build_command(video: Dict, audio: Dict) -> List[str]:
+    """ffmpeg remux: -c copy into fragmented MP4 so it can be written to a pipe"""
+    v = ffmpeg.input(video["url"], **transcode.input_args(video))
+    a = ffmpeg.input(audio["url"], **transcode.input_args(audio))
+    out = ffmpeg.output(
+        v.video, a.audio, "pipe:1",
+        c="copy", f="mp4", movflags="frag_keyframe+empty_moov+default_base_moof",
+    )
+    return out.global_args("-loglevel", "error").compile()
+
+
+def start_merge(video: Dict, audio: Dict) -> FFmpegProcess:
+    transcode.acquire_slot(_slots, "merges", MERGE_RETRY_AFTER)
+    return transcode.start(build_command(video, audio), _slots)
+
+
+def select_pair(table: Dict, video_format: Optional[str], audio_format: Optional[str],
+                max_height: Optional[int]):
+    formats = table["formats"]
+    if video_format:
+        video = formats.get(video_format)
+    else:
+        videos = [f for f in formats.values() if f["has_video"] and not f["has_audio"]
+                  and (not max_height or f["height"] <= max_height)]
+        video = max(videos, key=lambda f: (f["height"], f["ext"] == "mp4")) if videos else None
+    if audio_format:
+        audio = formats.get(audio_format)
+    else:
+        audios = [f for f in formats.values() if f["has_audio"] and not f["has_video"]]
+        audio = max(audios, key=lambda f: (f["ext"] == "m4a", f["abr"])) if audios else None
+    if not video or not audio:
+        raise HTTPException(status_code=404, detail="No separate video + audio streams to merge")
+    return video, audio
+
+
+@router.get("/merge")
+async def merge(
+    url: str = Query(...),
+    video_format: Optional[str] = Query(None),
+    audio_format: Optional[str] = Query(None),
+    max_height: Optional[int] = Query(None),
+):
+    """Best DASH video + best audio remuxed (no re-encode) and streamed as fragmented MP4"""
+    platform = registry.lookup(url)
+    if platform is None:
+        raise HTTPException(status_code=400, detail="Unsupported URL")
+    metrics.set_platform(platform.name)
+
+    table = await extract(f"stream:{platform.name}", url, lambda u: format_table(u, platform))
+    video, audio = select_pair(table, video_format, audio_format, max_height)
+    job = start_merge(video, audio)
+    return StreamingResponse(
+        job.iter_stdout(),
+        media_type="video/mp4",
+        headers={"Content-Disposition": f'attachment; filename="{safe_filename(table["title"], "mp4")}"'},
+        background=BackgroundTask(job.close),
+    )
@@ -0,0 +1,95 @@
+import codecs
+import os
+from html.parser import HTMLParser
+from typing import Dict, Optional
+
+from downloaders import deadline, metrics, ratelimit
+from downloaders.session import get_session, requests
+
+# Stop reading a page after this many bytes even if </head> never showed up
+META_MAX_BYTES = int(os.getenv("META_MAX_BYTES", str(256 * 1024)))
+META_TIMEOUT = float(os.getenv("META_TIMEOUT", "10"))
+CHUNK_SIZE = 16 * 1024
+
+WANTED = ("og:image", "og:title", "og:video", "og:video:url", "og:video:secure_url", "og:description",
+          "og:video:duration", "video:duration", "duration")
+
+
+class _HeadMetaParser(HTMLParser):
+    """Incremental tokenizer that collects og: meta tags and flags the end of <head>"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta: Dict[str, str] = {}
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            attrs = dict(attrs)
+            key = attrs.get("property") or attrs.get("name") or attrs.get("itemprop")
+            content = attrs.get("content")
+            if key in WANTED and content and key not in self.meta:
+                self.meta[key] = content
+                if len(self.meta) == len(WANTED):
+                    self.done = True
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self.done = True
+
+
+def _charset(response) -> str:
+    content_type = response.headers.get("Content-Type", "")
+    if "charset=" in content_type:
+        charset = content_type.split("charset=")[-1].split(";")[0].strip().strip('"')
+        try:
+            codecs.lookup(charset)
+            return charset
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def fetch_meta(url: str, max_bytes: int = META_MAX_BYTES, timeout: float = META_TIMEOUT,
+               admit: bool = True) -> Dict[str, str]:
+    """og: meta tags from a page, reading only up to </head> (or `max_bytes`).
+
+    `admit=False` when the caller already spent this request's rate-limit token.
+    """
+    parser = _HeadMetaParser()
+    if deadline.expired():
+        return {}  # a fallback isn't worth a request that's already out of time
+    timeout = deadline.timeout(timeout)
+    guard = ratelimit.guard_for(url)
+    if guard is not None and (guard.admit() is not None if admit else guard.is_open()):
+        ratelimit.refused()
+        return {}  # throttled / circuit open: don't sit out the timeout
+    with metrics.stage("html_fallback"):
+        try:
+            with get_session().get(url, stream=True, timeout=timeout) as r:
+                if r.status_code != 200:
+                    metrics.record_error("html_fallback", f"HTTP {r.status_code}")
+                    if guard is not None:
+                        guard.record(f"HTTP {r.status_code}")
+                    return {}
+                decoder = codecs.getincrementaldecoder(_charset(r))(errors="replace")
+                read = 0
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    read += len(chunk)
+                    parser.feed(decoder.decode(chunk))
+                    if parser.done or read >= max_bytes or deadline.expired():
+                        break
+        except requests.RequestException as e:
+            metrics.record_error("html_fallback", e)
+            if guard is not None:
+                guard.record(e)
+            return parser.meta
+    if guard is not None:
+        guard.record()
+    return parser.meta
+
+
+def og_image(url: str) -> Optional[str]:
+    return fetch_meta(url).get("og:image")
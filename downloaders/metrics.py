@@ -0,0 +1,199 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+router = APIRouter(tags=["Metrics"])
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# ✅ Platform router handling the current request; set by registry.validate,
+# carried into the extraction pool because the executor copies the context
+platform_var: contextvars.ContextVar[str] = contextvars.ContextVar("platform", default="none")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in self._values.items():
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels → [per-bucket counts (last one is +Inf), sum, count]
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(entry[0]), entry[1], entry[2]) for labels, entry in self._values.items()]
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                le_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose samples are read from a callback at scrape time"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str], collect: Callable):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, value in self.collect():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class CounterFunc(Gauge):
+    """Counter whose running total is read from a callback at scrape time (name should end in _total)"""
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} counter"
+        return lines
+
+
+REGISTRY: List = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+stage_seconds = register(Histogram(
+    "downloader_stage_seconds", "Time spent per request stage", ("platform", "stage")))
+upstream_errors = register(Counter(
+    "downloader_upstream_errors_total", "Upstream failures by class", ("platform", "stage", "error_class")))
+cache_requests = register(Counter(
+    "downloader_cache_requests_total", "Extraction cache lookups", ("platform", "result")))
+
+
+def classify_error(error) -> str:
+    """Coarse error class for labels (keeps label cardinality bounded)"""
+    message = str(error).lower()
+    if "429" in message or "rate-limit" in message or "rate limit" in message or "too many requests" in message:
+        return "rate_limited"
+    # Per-media answers first: yt-dlp adds "sign in… use --cookies" to private and removed videos too
+    if "private" in message:
+        return "private"
+    if "unavailable" in message or "removed" in message or "404" in message or "not found" in message:
+        return "unavailable"
+    if "login" in message or "sign in" in message or "cookies" in message:
+        return "login_required"
+    if "unsupported url" in message or "no suitable extractor" in message:
+        return "unsupported"
+    if "timed out" in message or "timeout" in message:
+        return "timeout"
+    if "there is no video" in message:
+        return "no_video"
+    return type(error).__name__ if isinstance(error, BaseException) else "http_error"
+
+
+def record_error(stage: str, error):
+    upstream_errors.inc(platform_var.get(), stage, classify_error(error))
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as one stage of the current platform's request; failures count as upstream errors"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        if name != "validation":
+            record_error(name, e)
+        raise
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, platform_var.get(), name)
+
+
+def set_platform(name: str):
+    platform_var.set(name)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class TimedJSONResponse(JSONResponse):
+    """Default response class: orjson when installed, timed as the "serialize" stage"""
+
+    def render(self, content) -> bytes:
+        start = time.perf_counter()
+        if orjson is not None:
+            body = orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        else:
+            body = super().render(content)
+        stage_seconds.observe(time.perf_counter() - start, platform_var.get(), "serialize")
+        return body
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,111 @@
+import os
+from typing import Dict, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException
+
+from downloaders import metrics
+from downloaders.cache import TTLCache
+
+router = APIRouter(tags=["Cache"])
+
+NEGATIVE_CACHE_SIZE = int(os.getenv("NEGATIVE_CACHE_SIZE", "4096"))
+
+# ✅ Failure classes worth remembering, and for how long. Private posts can be
+# made public and "no formats" can be a bad day upstream, so those are short;
+# removed media doesn't come back.
+NEGATIVE_TTLS: Dict[str, float] = {
+    "private": float(os.getenv("NEGATIVE_TTL_PRIVATE", "600")),
+    "unavailable": float(os.getenv("NEGATIVE_TTL_UNAVAILABLE", "3600")),
+    "removed": float(os.getenv("NEGATIVE_TTL_REMOVED", "86400")),
+    "not_found": float(os.getenv("NEGATIVE_TTL_NOT_FOUND", "1800")),
+    "no_video": float(os.getenv("NEGATIVE_TTL_NO_VIDEO", "3600")),
+    "no_formats": float(os.getenv("NEGATIVE_TTL_NO_FORMATS", "300")),
+}
+
+# Message fragment → class, first match wins ("Image not found. It may be private…" is not_found)
+_RULES: Tuple[Tuple[str, str], ...] = (
+    ("image not found", "not_found"),
+    ("video not found", "not_found"),
+    ("there is no video in this post", "no_video"),
+    ("has been removed", "removed"),
+    ("account associated with this video has been terminated", "removed"),
+    ("private video", "private"),
+    ("this video is private", "private"),
+    ("video unavailable", "unavailable"),
+    ("no playable formats found", "no_formats"),
+)
+
+# Never cached whatever the message says: throttling, overload and timeouts are ours or transient
+_TRANSIENT_STATUSES = (408, 429, 502, 503, 504)
+# Same for messages that carry one of these, whatever status the router gave them
+_TRANSIENT_FRAGMENTS = ("timed out", "timeout", "429", "rate-limit", "rate limit", "too many requests",
+                        "login required", "checkpoint_required")
+
+negative_cache = TTLCache(NEGATIVE_CACHE_SIZE)
+stored: Dict[str, int] = {}
+replayed: Dict[str, int] = {}
+
+negative_requests = metrics.register(metrics.Counter(
+    "downloader_negative_cache_hits_total", "Failures answered from the negative cache", ("platform", "error_class")))
+
+
+def classify(status: Optional[int], message) -> Optional[str]:
+    """Failure class for an error, or None when it may succeed on the next try"""
+    if status in _TRANSIENT_STATUSES or not isinstance(message, str):
+        return None
+    message = message.lower()
+    if any(fragment in message for fragment in _TRANSIENT_FRAGMENTS):
+        return None
+    for fragment, kind in _RULES:
+        if fragment in message:
+            return kind
+    return None
+
+
+def remember(key, kind: str, outcome):
+    """`outcome` is what gets replayed: an HTTPException to re-raise, or a router's {"error"} dict to return"""
+    if isinstance(outcome, HTTPException):
+        outcome = HTTPException(status_code=outcome.status_code, detail=outcome.detail, headers=outcome.headers)
+    negative_cache.set(key, (kind, outcome), NEGATIVE_TTLS[kind])
+    stored[kind] = stored.get(kind, 0) + 1
+
+
+def record_exception(key, e: HTTPException):
+    kind = classify(e.status_code, e.detail)
+    if kind is not None:
+        remember(key, kind, e)
+
+
+def record_result(key, result):
+    if isinstance(result, dict) and "error" in result:
+        kind = classify(None, result["error"])
+        if kind is not None:
+            remember(key, kind, result)
+
+
+def replay(key):
+    """The remembered outcome for `key` (raised or returned, as it was first), or None"""
+    entry = negative_cache.get(key)
+    if entry is None:
+        return None
+    kind, outcome = entry
+    replayed[kind] = replayed.get(kind, 0) + 1
+    negative_requests.inc(key[0], kind)
+    metrics.cache_requests.inc(key[0], "negative")
+    if isinstance(outcome, HTTPException):
+        raise HTTPException(status_code=outcome.status_code, detail=outcome.detail, headers=outcome.headers)
+    return outcome
+
+
+def forget(key):
+    negative_cache.delete(key)
+
+
+metrics.register(metrics.Gauge(
+    "downloader_negative_cache_entries", "Remembered failures in the negative cache", (),
+    lambda: [((), len(negative_cache))]))
+
+
+@router.get("/cache/negative/stats")
+def negative_cache_stats():
+    return {**negative_cache.stats(), "stored": stored, "replayed": replayed, "ttls": NEGATIVE_TTLS}
@@ -0,0 +1,277 @@
+import asyncio
+import base64
+import itertools
+import json
+import os
+import re
+from typing import Dict, Iterator, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from downloaders import batch, deadline, metrics, ratelimit, registry, ydl_pool
+from downloaders.executor import run_blocking
+from downloaders.extraction import extract
+from downloaders.formats import FormatQuery, format_query
+from downloaders.lazy import lazy_import
+
+router = APIRouter(tags=["Playlist"])
+yt_dlp = lazy_import("yt_dlp")
+
+PLAYLIST_PAGE_SIZE = int(os.getenv("PLAYLIST_PAGE_SIZE", "50"))
+PLAYLIST_PAGE_MAX = int(os.getenv("PLAYLIST_PAGE_MAX", "200"))
+# NDJSON mode walks one enumeration instead of paging, so it may go further per request
+PLAYLIST_STREAM_MAX = int(os.getenv("PLAYLIST_STREAM_MAX", "5000"))
+# NDJSON pulls entries this many at a time, each chunk on the extraction pool with its own YoutubeDL lease
+PLAYLIST_STREAM_CHUNK = int(os.getenv("PLAYLIST_STREAM_CHUNK", "100"))
+PLAYLIST_RESOLVE_CONCURRENCY = int(os.getenv("PLAYLIST_RESOLVE_CONCURRENCY", "4"))
+
+# ✅ Extractors allowed to enumerate, per platform (the /download routers only want single videos)
+PLAYLIST_EXTRACTORS = {
+    "youtube": ["youtube", "youtube:tab", "youtube:playlist"],
+    "vimeo": ["vimeo", "vimeo:album", "vimeo:channel", "vimeo:group", "vimeo:user", "vimeo:likes", "vimeo:ondemand"],
+    "dailymotion": ["dailymotion", "dailymotion:playlist", "dailymotion:user"],
+    "reddit": ["reddit"],  # multi-video posts
+}
+
+# URLs that only ever list other media
+_PLAYLIST_PATTERNS = [
+    re.compile(r"youtube\.com/(?:playlist\?|@[^/?#]+|channel/|c/|user/)"),
+    re.compile(r"vimeo\.com/(?:showcase|album|channels|groups)/"),
+    re.compile(r"dailymotion\.com/playlist/"),
+]
+MAX_URL_HOPS = 3  # channel → its videos tab, and similar redirects
+
+
+def is_playlist_url(url: str) -> bool:
+    return any(pattern.search(url) for pattern in _PLAYLIST_PATTERNS)
+
+
+def playlist_link(url: str) -> str:
+    return "/playlist?" + urlencode({"url": url})
+
+
+def not_a_video(url: str) -> HTTPException:
+    """What the single-video routers answer for a playlist / channel URL"""
+    return HTTPException(status_code=400, detail=f"Playlist or channel URL: list it with {playlist_link(url)}")
+
+
+# 🔹 Cursors: opaque to clients, an entry offset underneath
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"o": offset}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        offset = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["o"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(offset, int) or offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+
+def page_variant(url: str, offset: int, limit: int) -> str:
+    # canonical_key drops the query, and ?list= is what tells YouTube playlists apart
+    list_id = parse_qs(urlparse(url).query).get("list", [""])[0]
+    return f"list={list_id}:o{offset}:n{limit}"
+
+
+# 🔹 Flat enumeration (blocking)
+
+def slim_entry(index: int, entry: Dict) -> Dict:
+    """Just enough to show a row and resolve it later"""
+    url = entry.get("webpage_url") or entry.get("url")
+    thumbnails = entry.get("thumbnails") or []
+    return {
+        "index": index,
+        "id": entry.get("id"),
+        "title": entry.get("title"),
+        "url": url,
+        "duration": entry.get("duration"),
+        "thumbnail": entry.get("thumbnail") or (thumbnails[-1].get("url") if thumbnails else None),
+        "resolve_url": "/resolve?" + urlencode({"url": url}) if url else None,
+    }
+
+
+def _slice(entries, start: int, stop: int):
+    # Paged lists fetch only the pages covering [start, stop); generators stop being pulled at `stop`
+    if hasattr(entries, "getslice"):
+        return iter(entries.getslice(start, stop))
+    return itertools.islice(entries, start, stop)
+
+
+def enumerate_playlist(url: str, platform: str, start: int, stop: int) -> Iterator[Dict]:
+    """Yields a header dict, then slim entries start..stop-1, while holding one YoutubeDL lease.
+
+    `process=False` leaves yt-dlp's entries lazy (a generator or paged list),
+    so only the upstream pages covering the slice are fetched and no entry is
+    resolved to formats. A URL that turns out to be a single video comes back
+    as a one-entry list.
+    """
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'skip_download': True,
+        'allowed_extractors': PLAYLIST_EXTRACTORS[platform],
+    }
+    with ydl_pool.lease(ydl_opts) as ydl:
+        try:
+            with metrics.stage("extract_flat"):
+                info = ydl.extract_info(url, download=False, process=False)
+                for _ in range(MAX_URL_HOPS):
+                    if info.get("_type") not in ("url", "url_transparent"):
+                        break
+                    info = ydl.extract_info(info["url"], download=False, process=False)
+        except yt_dlp.utils.DownloadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        entries = info.get("entries")
+        yield {
+            "id": info.get("id"),
+            "title": info.get("title"),
+            "uploader": info.get("uploader") or info.get("channel"),
+            "webpage_url": info.get("webpage_url") or url,
+            "playlist_count": info.get("playlist_count") if entries is not None else 1,
+        }
+        if entries is None:
+            if start == 0:
+                yield slim_entry(0, info)
+            return
+        with metrics.stage("extract_flat"):
+            for index, entry in enumerate(_slice(entries, start, stop), start):
+                if entry:
+                    yield slim_entry(index, entry)
+
+
+def fetch_page(url: str, platform: str, offset: int, limit: int) -> Dict:
+    """One JSON page (or NDJSON chunk); asks for one extra entry to know whether there is a next page"""
+    items = enumerate_playlist(url, platform, offset, offset + limit + 1)
+    header = next(items)
+    entries = list(items)
+    more = len(entries) > limit
+    return {
+        **header,
+        "offset": offset,
+        "entries": entries[:limit],
+        "next_cursor": encode_cursor(offset + limit) if more else None,
+    }
+
+
+# 🔹 Lazy resolution of entries to formats
+
+async def resolve_entry(entry: Dict, query: FormatQuery, limit: asyncio.Semaphore,
+                        streamed: bool = False) -> Dict:
+    if not entry.get("url"):
+        return {**entry, "resolved": {"status": 400, "error": "Entry has no URL"}}
+    async with limit:
+        if streamed:
+            # Runs as its own task, so this deadline is only this entry's
+            deadline.set_current(deadline.for_item())
+        outcome = await batch.resolve_url(entry["url"], query)
+    outcome.pop("url", None)
+    return {**entry, "resolved": outcome}
+
+
+PAGE_KEYS = ("offset", "entries", "next_cursor")
+
+
+def page_header(page: Dict) -> Dict:
+    return {k: v for k, v in page.items() if k not in PAGE_KEYS}
+
+
+async def fetch_chunk(url: str, platform: str, offset: int, limit: int) -> Dict:
+    """One chunk of an NDJSON enumeration; like a JSON page it costs one rate-limit token"""
+    guard = ratelimit.guard_for(url)
+    if guard is not None:
+        wait = guard.admit()
+        if wait is not None:
+            raise ratelimit.unavailable(guard, wait)
+    return await run_blocking(fetch_page, url, platform, offset, limit)
+
+
+async def stream_entries(url: str, platform: str, first: Dict, offset: int, limit: int,
+                         resolve: bool, query: FormatQuery):
+    """NDJSON: header line, one line per entry as it's enumerated (or resolved), then an end line.
+
+    Entries are pulled a chunk at a time, and no YoutubeDL is held while the
+    client reads. A chunk that fails ends the stream with the error and a
+    cursor to resume from.
+    """
+    yield json.dumps({"type": "playlist", **page_header(first)}) + "\n"
+    semaphore = asyncio.Semaphore(PLAYLIST_RESOLVE_CONCURRENCY)
+    pending = set()
+    end = offset + limit
+    page, position = first, offset
+    error = None
+    try:
+        while True:
+            for entry in page["entries"]:
+                if not resolve:
+                    yield json.dumps({"type": "entry", **entry}) + "\n"
+                    continue
+                pending.add(asyncio.ensure_future(resolve_entry(entry, query, semaphore, streamed=True)))
+                # Don't run far ahead of the resolvers
+                if len(pending) >= PLAYLIST_RESOLVE_CONCURRENCY * 2:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield json.dumps({"type": "entry", **task.result()}, default=str) + "\n"
+            position += len(page["entries"])
+            if page["next_cursor"] is None or position >= end:
+                break
+            try:
+                page = await fetch_chunk(url, platform, position, min(PLAYLIST_STREAM_CHUNK, end - position))
+            except HTTPException as e:
+                error = {"status": e.status_code, "error": e.detail}
+                break
+        for finished in asyncio.as_completed(pending):
+            yield json.dumps({"type": "entry", **await finished}, default=str) + "\n"
+        pending = set()
+        more = error is not None or (page["next_cursor"] is not None and position >= end)
+        yield json.dumps({"type": "end", "next_cursor": encode_cursor(position) if more else None,
+                          **(error or {})}) + "\n"
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+@router.get("/playlist")
+async def playlist(
+    url: str = Query(..., description="Playlist, channel or multi-video post URL"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(PLAYLIST_PAGE_SIZE, ge=1, le=PLAYLIST_STREAM_MAX, description="Entries per page"),
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$",
+                        description="json page, or NDJSON lines as entries arrive"),
+    resolve: bool = Query(False, description="Also resolve every entry to its formats"),
+    query: FormatQuery = Depends(format_query),
+):
+    """Enumerate a playlist / channel with flat extraction, a page at a time.
+
+    Entries come with a `resolve_url`; `resolve=1` resolves them in-line
+    with bounded parallelism instead.
+    """
+    platform = registry.lookup(url)
+    if platform is None or platform.name not in PLAYLIST_EXTRACTORS:
+        raise HTTPException(status_code=400, detail=f"Playlists are supported for {', '.join(PLAYLIST_EXTRACTORS)}")
+    metrics.set_platform(platform.name)
+    offset = decode_cursor(cursor)
+
+    if output == "json":
+        limit = min(limit, PLAYLIST_PAGE_MAX)
+        page = await extract(f"playlist:{platform.name}", url,
+                             lambda u: fetch_page(u, platform.name, offset, limit), page_variant(url, offset, limit))
+        if resolve:
+            semaphore = asyncio.Semaphore(PLAYLIST_RESOLVE_CONCURRENCY)
+            entries = await asyncio.gather(*(resolve_entry(e, query, semaphore) for e in page["entries"]))
+            page = {**page, "entries": entries}
+        return page
+
+    # NDJSON: walked as far as `limit` in uncached chunks. The first is fetched here,
+    # so its errors surface as a status code rather than a broken stream
+    first = await fetch_chunk(url, platform.name, offset, min(PLAYLIST_STREAM_CHUNK, limit))
+    return StreamingResponse(stream_entries(url, platform.name, first, offset, limit, resolve, query),
+                             media_type="application/x-ndjson")
@@ -0,0 +1,147 @@
+import re
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query
+
+from downloaders import extraction, metrics, registry, ydl_pool
+from downloaders.cache import cache_key, extraction_cache
+from downloaders.extraction import extract
+from downloaders.lazy import lazy_import
+from downloaders.meta import fetch_meta
+
+router = APIRouter(tags=["Preview"])
+yt_dlp = lazy_import("yt_dlp")
+
+PREVIEW_FIELDS = ("title", "thumbnail", "duration", "description", "uploader")
+DEFAULT_FIELDS = ("title", "thumbnail", "duration")
+
+# field → og / meta tags that can answer it, best first
+OG_SOURCES = {
+    "title": ("og:title",),
+    "thumbnail": ("og:image",),
+    "description": ("og:description",),
+    "duration": ("og:video:duration", "video:duration", "duration"),
+}
+
+preview_seconds = metrics.register(metrics.Histogram(
+    "downloader_preview_seconds", "Preview latency by how it was answered", ("platform", "source")))
+
+_ISO_DURATION = re.compile(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?$")
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    if not fields:
+        return DEFAULT_FIELDS
+    wanted = tuple(sorted({f.strip() for f in fields.split(",") if f.strip()}))
+    unknown = [f for f in wanted if f not in PREVIEW_FIELDS]
+    if unknown or not wanted:
+        raise HTTPException(status_code=400, detail=f"fields must be a subset of {', '.join(PREVIEW_FIELDS)}")
+    return wanted
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from "183" or an ISO 8601 duration ("PT3M3S", which YouTube uses)"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    m = _ISO_DURATION.match(value.strip())
+    if not m or not any(m.groups()):
+        return None
+    days, hours, minutes, seconds = (float(g) if g else 0.0 for g in m.groups())
+    return days * 86400 + hours * 3600 + minutes * 60 + seconds
+
+
+def from_meta(meta: Dict[str, str], fields) -> Dict:
+    found = {}
+    for field in fields:
+        for tag in OG_SOURCES.get(field, ()):
+            if meta.get(tag):
+                found[field] = parse_duration(meta[tag]) if field == "duration" else meta[tag]
+                break
+    return found
+
+
+def from_info(info: Dict, fields) -> Dict:
+    thumbnails = info.get("thumbnails") or []
+    values = {
+        "title": info.get("title"),
+        # process=False skips yt-dlp's thumbnail sorting, so pick the last (largest) one ourselves
+        "thumbnail": info.get("thumbnail") or (thumbnails[-1].get("url") if thumbnails else None),
+        "duration": info.get("duration"),
+        "description": info.get("description"),
+        "uploader": info.get("uploader") or info.get("channel"),
+    }
+    return {field: values[field] for field in fields}
+
+
+async def from_full_result(platform: str, url: str, fields) -> Optional[Dict]:
+    """A cached /download response already has the answer when its top level carries every field"""
+    cached = await extraction_cache.aget(cache_key(platform, url))
+    if isinstance(cached, dict) and all(cached.get(field) is not None for field in fields):
+        return {field: cached[field] for field in fields}
+    return None
+
+
+def build_preview(url: str, platform: registry.Platform, fields) -> Dict:
+    """og: tags first (one partial page read); yt-dlp without format processing only for what's missing"""
+    meta = from_meta(fetch_meta(url, admit=False), fields)  # extract() already admitted this preview
+    if all(meta.get(field) is not None for field in fields):
+        return {**meta, "source": "og"}
+
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'skip_download': True,
+        'allowed_extractors': list(platform.extractors),
+    }
+    if platform.cookies:
+        ydl_opts['cookiefile'] = 'cookies.txt'  # same as the platform's own router
+    try:
+        with ydl_pool.lease(ydl_opts) as ydl:
+            with metrics.stage("extract_info"):
+                # process=False: no format sorting / selection, no per-format work
+                info = ydl.extract_info(url, download=False, process=False)
+                if info.get("_type") in ("url", "url_transparent"):
+                    info = ydl.extract_info(info["url"], download=False, process=False)
+    except yt_dlp.utils.DownloadError as e:
+        if meta:
+            return {**{field: None for field in fields}, **meta, "source": "og"}
+        raise HTTPException(status_code=400, detail=str(e))
+    found = from_info(info, fields)
+    del info
+    # og values win where both have one: they're what link unfurlers show anyway
+    return {**found, **{k: v for k, v in meta.items() if v is not None}, "source": "ytdlp"}
+
+
+async def preview(url: str, fields: Optional[str] = None) -> Dict:
+    wanted = parse_fields(fields)
+    platform = registry.lookup(url)
+    if platform is None:
+        raise HTTPException(status_code=400, detail="Unsupported URL")
+    metrics.set_platform(platform.name)
+
+    start = time.perf_counter()
+    with metrics.stage("preview"):
+        result = await from_full_result(platform.name, url, wanted)
+        if result is not None:
+            result["source"] = "cache"
+        else:
+            result = await extract(f"preview:{platform.name}", url,
+                                   lambda u: build_preview(u, platform, wanted), ",".join(wanted))
+            if extraction.served_from_cache.get():
+                result = {**result, "source": "cache"}
+    preview_seconds.observe(time.perf_counter() - start, platform.name, result.get("source", "unknown"))
+    return result
+
+
+@router.get("/preview")
+async def preview_endpoint(
+    url: str = Query(..., description="Any supported video / post URL"),
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of {', '.join(PREVIEW_FIELDS)}"),
+):
+    """Link-preview metadata only: no format resolution, signing or size probes"""
+    return await preview(url, fields)
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Set, Tuple
+
+from fastapi import APIRouter
+
+from downloaders import extraction, metrics, ratelimit, registry
+from downloaders.cache import canonical_key
+from downloaders.executor import extraction_pool
+from downloaders.formats import DEFAULT_QUERY
+
+router = APIRouter(tags=["Cache"])
+logger = logging.getLogger(__name__)
+
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "1") == "1"
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "15"))
+# Refresh this long before the cached entry (and its signed URLs) would expire
+PREWARM_LEAD = float(os.getenv("PREWARM_LEAD", "120"))
+# Decayed request count at which a media ID counts as hot
+PREWARM_MIN_SCORE = float(os.getenv("PREWARM_MIN_SCORE", "3"))
+PREWARM_HALF_LIFE = float(os.getenv("PREWARM_HALF_LIFE", "900"))
+PREWARM_TRACK_MAX = int(os.getenv("PREWARM_TRACK_MAX", "5000"))
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "2"))
+# Share of each upstream's token bucket background work may use; the rest is kept for live traffic
+PREWARM_BUDGET_SHARE = float(os.getenv("PREWARM_BUDGET_SHARE", "0.2"))
+# Comma-separated URLs and/or a file with one URL per line, warmed at startup and kept warm
+PREWARM_URLS = os.getenv("PREWARM_URLS", "")
+PREWARM_FILE = os.getenv("PREWARM_FILE", "")
+
+
+class Demand:
+    __slots__ = ("url", "func", "score", "seen_at", "expires_at")
+
+    def __init__(self, url: str, func: Callable):
+        self.url = url
+        self.func = func
+        self.score = 0.0
+        self.seen_at = time.monotonic()
+        self.expires_at = 0.0
+
+
+class DemandTracker:
+    """Exponentially decayed request counts per cache key, plus when each cached entry expires.
+
+    Bounded LRU: keys nobody asked for in a while fall off first.
+    """
+
+    def __init__(self, max_keys: int = PREWARM_TRACK_MAX, half_life: float = PREWARM_HALF_LIFE):
+        self.max_keys = max_keys
+        self.half_life = half_life
+        self._items: "OrderedDict[Tuple, Demand]" = OrderedDict()
+        self._pinned: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def _decayed(self, item: Demand, now: float) -> float:
+        return item.score * 0.5 ** ((now - item.seen_at) / self.half_life)
+
+    def touch(self, key, url: str, func: Callable):
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                item = self._items[key] = Demand(url, func)
+                while len(self._items) > self.max_keys:
+                    self._items.popitem(last=False)
+            item.score = self._decayed(item, now) + 1
+            item.seen_at = now
+            item.func = func
+            self._items.move_to_end(key)
+
+    def stored(self, key, ttl: float):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                item.expires_at = time.monotonic() + ttl
+
+    def pin(self, url: str):
+        with self._lock:
+            self._pinned.add(canonical_key(url))
+
+    def is_pinned(self, key) -> bool:
+        return tuple(key[1:3]) in self._pinned
+
+    def due(self, lead: float = PREWARM_LEAD, min_score: float = PREWARM_MIN_SCORE) -> List[Tuple[float, Tuple, Demand]]:
+        """Hot (or pinned) keys whose cached entry expires within `lead`, hottest first"""
+        now = time.monotonic()
+        picked = []
+        with self._lock:
+            for key, item in self._items.items():
+                score = self._decayed(item, now)
+                if score < min_score and not self.is_pinned(key):
+                    continue
+                # expires_at == 0: never cached, or the last refresh failed; a live request re-arms it
+                if item.expires_at and item.expires_at - now <= lead:
+                    picked.append((score, key, item))
+        picked.sort(key=lambda entry: entry[0], reverse=True)
+        return picked
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Prewarmer:
+    """Lifespan background task that refreshes hot entries before their URLs expire"""
+
+    def __init__(self, tracker: DemandTracker):
+        self.tracker = tracker
+        self._inflight: Set[Tuple] = set()
+        self._limit = asyncio.Semaphore(PREWARM_CONCURRENCY)
+        self._task: Optional[asyncio.Task] = None
+        self.refreshed = 0
+        self.failed = 0
+        self.deferred = 0  # skipped for lack of budget / busy pool, retried next round
+
+    def _has_budget(self, url: str, spend: bool = True) -> bool:
+        """Pool idle and the upstream bucket above the live-traffic reserve (spending a token if `spend`)"""
+        if extraction_pool.queued:
+            return False  # live requests are already waiting for a worker
+        guard = ratelimit.guard_for(url)
+        if guard is None:
+            return True
+        reserve = (1 - PREWARM_BUDGET_SHARE) * guard.burst
+        if not spend:
+            return guard.has_headroom(reserve)
+        return guard.admit(reserve=reserve) is None
+
+    async def _refresh(self, key, item: Demand):
+        try:
+            async with self._limit:
+                result = await extraction.refresh(key, item.url, item.func)
+            if not extraction.is_cacheable(result):
+                raise RuntimeError(result.get("error") if isinstance(result, dict) else "uncacheable result")
+            self.refreshed += 1
+        except Exception as e:
+            item.expires_at = 0.0
+            self.failed += 1
+            metrics.record_error("prewarm", e)
+        finally:
+            self._inflight.discard(key)
+
+    def run_once(self) -> int:
+        """Start refreshes for whatever is due and affordable; returns how many started"""
+        started = 0
+        for _, key, item in self.tracker.due():
+            if key in self._inflight:
+                continue
+            if len(self._inflight) >= PREWARM_CONCURRENCY or not self._has_budget(item.url):
+                self.deferred += 1
+                continue
+            self._inflight.add(key)
+            asyncio.ensure_future(self._refresh(key, item))
+            started += 1
+        return started
+
+    async def warm_startup_urls(self, urls: List[str]):
+        """Resolve configured URLs through their platform handlers, within the same budget"""
+        for url in urls:
+            platform = registry.lookup(url)
+            if platform is None:
+                logger.warning(f"Prewarm: unsupported URL {url}")
+                continue
+            self.tracker.pin(url)
+            # The handler's own extract() spends the token
+            while not self._has_budget(url, spend=False):
+                await asyncio.sleep(PREWARM_INTERVAL)
+            try:
+                await platform.handler(url=url, query=DEFAULT_QUERY)
+                self.refreshed += 1
+            except Exception as e:
+                self.failed += 1
+                metrics.record_error("prewarm", e)
+
+    async def _loop(self, urls: List[str]):
+        await self.warm_startup_urls(urls)
+        while True:
+            await asyncio.sleep(PREWARM_INTERVAL)
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Prewarm round failed")
+
+    def start(self, urls: List[str]) -> asyncio.Task:
+        self._task = asyncio.ensure_future(self._loop(urls))
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "enabled": PREWARM_ENABLED,
+            "tracked": len(self.tracker),
+            "due": len(self.tracker.due()),
+            "inflight": len(self._inflight),
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "deferred": self.deferred,
+        }
+
+
+def startup_urls() -> List[str]:
+    urls = [u.strip() for u in PREWARM_URLS.split(",") if u.strip()]
+    if PREWARM_FILE and os.path.isfile(PREWARM_FILE):
+        with open(PREWARM_FILE) as f:
+            urls += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return urls
+
+
+tracker = DemandTracker()
+prewarmer = Prewarmer(tracker)
+extraction.on_request.append(tracker.touch)
+extraction.on_store.append(tracker.stored)
+
+metrics.register(metrics.CounterFunc(
+    "downloader_prewarm_refreshed_total", "Entries refreshed in the background before expiry", (),
+    lambda: [((), prewarmer.refreshed)]))
+
+
+@router.get("/prewarm/stats")
+def prewarm_stats():
+    return prewarmer.stats()
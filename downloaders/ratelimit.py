@@ -0,0 +1,225 @@
+import contextvars
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from fastapi import APIRouter, HTTPException
+
+from downloaders import metrics
+from downloaders.registry import host_of
+
+router = APIRouter(tags=["Upstreams"])
+
+# ✅ Upstream host family → hosts (subdomains included)
+FAMILIES = {
+    "instagram": ("instagram.com", "instagr.am"),
+    "facebook": ("facebook.com", "fb.watch", "fb.com"),
+    "fbcdn": ("fbcdn.net", "cdninstagram.com"),
+    "youtube": ("youtube.com", "youtu.be", "youtube-nocookie.com"),
+    "googlevideo": ("googlevideo.com",),
+    "reddit": ("reddit.com", "redd.it"),
+    "v.redd.it": ("v.redd.it",),
+    "vimeo": ("vimeo.com", "vimeocdn.com"),
+}
+# Requests per minute; the page hosts that ban scrapers get the tighter budgets
+DEFAULT_PER_MINUTE = {"instagram": 30, "facebook": 60, "reddit": 60, "youtube": 120, "vimeo": 120}
+FALLBACK_PER_MINUTE = float(os.getenv("UPSTREAM_PER_MINUTE", "600"))
+BURST_SECONDS = float(os.getenv("UPSTREAM_BURST_SECONDS", "10"))  # bucket holds this much of the rate
+FAILURE_THRESHOLD = int(os.getenv("UPSTREAM_FAILURE_THRESHOLD", "5"))
+OPEN_SECONDS = float(os.getenv("UPSTREAM_OPEN_SECONDS", "60"))
+# The adaptive rate never drops below this fraction of the configured one
+MIN_RATE_FRACTION = float(os.getenv("UPSTREAM_MIN_RATE_FRACTION", "0.1"))
+# Each success gives back this fraction of the configured rate
+RECOVERY_STEP = float(os.getenv("UPSTREAM_RECOVERY_STEP", "0.05"))
+
+# Error classes that mean "the upstream is pushing back", not "this one URL is bad"
+THROTTLE_CLASSES = {"rate_limited"}
+FAILURE_CLASSES = THROTTLE_CLASSES | {"timeout", "ConnectionError", "ConnectTimeout", "ReadTimeout"}
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def _parse_limits(value: str) -> Dict[str, float]:
+    """UPSTREAM_LIMITS="instagram=20,fbcdn=300" → {"instagram": 20.0, "fbcdn": 300.0}"""
+    limits = {}
+    for item in value.split(","):
+        name, _, per_minute = item.partition("=")
+        if name.strip() and per_minute.strip():
+            limits[name.strip()] = float(per_minute)
+    return limits
+
+
+class UpstreamGuard:
+    """Token bucket plus circuit breaker for one upstream family.
+
+    Throttle errors halve the refill rate and successes win it back a step
+    at a time (AIMD). Enough consecutive failures open the circuit; after
+    OPEN_SECONDS one probe request is let through to decide whether it closes.
+    """
+
+    def __init__(self, family: str, per_minute: float):
+        self.family = family
+        self.base_rate = per_minute / 60.0
+        self.rate = self.base_rate
+        self.burst = max(1.0, self.base_rate * BURST_SECONDS)
+        self.tokens = self.burst
+        self.refilled_at = time.monotonic()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = None
+        self.rejected = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self.probe_started = None
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def admit(self, reserve: float = 0.0) -> Optional[float]:
+        """None if a request may go upstream now, else seconds until it's worth retrying.
+
+        Background callers pass `reserve`: they only get a token while more than
+        that many are left for live traffic, and never act as the half-open probe.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if reserve and self.state != CLOSED:
+                return max(0.0, self.opened_at + OPEN_SECONDS - now) or OPEN_SECONDS
+            if self.state == OPEN:
+                if now - self.opened_at < OPEN_SECONDS:
+                    self.rejected += 1
+                    return self.opened_at + OPEN_SECONDS - now
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self.probe_started is not None and now - self.probe_started < OPEN_SECONDS:
+                    self.rejected += 1
+                    return OPEN_SECONDS - (now - self.probe_started)
+                self.probe_started = now
+                return None
+            self._refill(now)
+            if self.tokens - reserve < 1:
+                if not reserve:
+                    self.rejected += 1
+                return (1 + reserve - self.tokens) / self.rate
+            self.tokens -= 1
+            return None
+
+    def has_headroom(self, reserve: float) -> bool:
+        """Whether more than `reserve` tokens are left, without spending one"""
+        with self._lock:
+            if self.state != CLOSED:
+                return False
+            self._refill(time.monotonic())
+            return self.tokens - reserve >= 1
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < OPEN_SECONDS
+
+    def record(self, error=None):
+        """Feed back the outcome of an upstream call (error=None for success)"""
+        kind = metrics.classify_error(error) if error is not None else None
+        with self._lock:
+            now = time.monotonic()
+            if kind not in FAILURE_CLASSES:
+                self.failures = 0
+                if self.state == HALF_OPEN:
+                    self.state = CLOSED
+                self.rate = min(self.base_rate, self.rate + self.base_rate * RECOVERY_STEP)
+                return
+            self.failures += 1
+            if kind in THROTTLE_CLASSES:
+                self.throttled += 1
+                self._refill(now)
+                self.rate = max(self.base_rate * MIN_RATE_FRACTION, self.rate / 2)
+            if self.state == HALF_OPEN or self.failures >= FAILURE_THRESHOLD:
+                self._open(now)
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "state": self.state,
+                "rate_per_minute": round(self.rate * 60, 2),
+                "base_per_minute": round(self.base_rate * 60, 2),
+                "tokens": round(min(self.burst, self.tokens + (now - self.refilled_at) * self.rate), 2),
+                "consecutive_failures": self.failures,
+                "open_remaining": round(max(0.0, self.opened_at + OPEN_SECONDS - now), 1)
+                if self.state == OPEN else 0.0,
+                "rejected": self.rejected,
+                "throttled": self.throttled,
+            }
+
+
+class Refusals:
+    """Upstream calls one extraction skipped because a guard said no; shared with its pool threads"""
+
+    def __init__(self):
+        self.count = 0
+
+
+_refusals: contextvars.ContextVar = contextvars.ContextVar("guard_refusals", default=None)
+
+
+def watch_refusals() -> Refusals:
+    """Start counting refusals for the current extraction (and the attempts it hands to the pool)"""
+    refusals = Refusals()
+    _refusals.set(refusals)
+    return refusals
+
+
+def refused():
+    """Note that a call was skipped: whatever the extraction returns now isn't the upstream's real answer"""
+    refusals = _refusals.get()
+    if refusals is not None:
+        refusals.count += 1
+
+
+_limits = {**DEFAULT_PER_MINUTE, **_parse_limits(os.getenv("UPSTREAM_LIMITS", ""))}
+guards: Dict[str, UpstreamGuard] = {
+    family: UpstreamGuard(family, _limits.get(family, FALLBACK_PER_MINUTE)) for family in FAMILIES
+}
+_by_host = {host: guards[family] for family, hosts in FAMILIES.items() for host in hosts}
+
+
+def guard_for(url: str) -> Optional[UpstreamGuard]:
+    """Guard for a URL's host family (most specific host wins: v.redd.it before redd.it)"""
+    host = host_of(url)
+    while host:
+        guard = _by_host.get(host)
+        if guard is not None:
+            return guard
+        _, _, host = host.partition(".")
+    return None
+
+
+def unavailable(guard: UpstreamGuard, wait: float) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Upstream {guard.family} is throttling us, try again later",
+        headers={"Retry-After": str(max(1, int(wait + 0.999)))},
+    )
+
+
+metrics.register(metrics.Gauge(
+    "downloader_upstream_circuit_state", "Circuit state per upstream family (0 closed, 1 half-open, 2 open)",
+    ("family",), lambda: [((g.family,), _STATE_VALUE[g.state]) for g in guards.values()]))
+metrics.register(metrics.Gauge(
+    "downloader_upstream_rate_per_minute", "Current adaptive request budget per upstream family",
+    ("family",), lambda: [((g.family,), round(g.rate * 60, 2)) for g in guards.values()]))
+metrics.register(metrics.CounterFunc(
+    "downloader_upstream_rejected_total", "Requests refused locally by the rate limiter / open circuit",
+    ("family",), lambda: [((g.family,), g.rejected) for g in guards.values()]))
+
+
+@router.get("/upstreams/stats")
+def upstream_stats():
+    return {family: guard.stats() for family, guard in guards.items()}
@@ -1,37 +1,56 @@
-from fastapi import APIRouter, Query
-import yt_dlp
-import math
+from functools import partial
+from fastapi import APIRouter, Depends, Query
+from downloaders import ydl_pool, metrics
+from downloaders.extraction import extract
+from downloaders import registry
+from downloaders.merge import merge_candidates
+from downloaders.formats import DEFAULT_QUERY, FormatQuery, collect, format_query, playable
 
 router = APIRouter()
 
-@router.get("/download/reddit")
-def download_reddit(url: str = Query(...)):
+EXTRACTORS = ["reddit"]
+
+def extract_reddit_info(url, query=DEFAULT_QUERY):
     try:
         ydl_opts = {
             "quiet": True,
             "skip_download": True,
             "force_generic_extractor": False,
+            "allowed_extractors": EXTRACTORS,
         }
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        with ydl_pool.lease(ydl_opts) as ydl:
+            with metrics.stage("extract_info"):
+                info = ydl.extract_info(url, download=False)
+
+        extracted = collect(info)
+        del info
 
         formats = []
-        for f in info.get("formats", []):
-            # Only include formats that have BOTH video and audio
-            if f.get("vcodec", "none") != "none" and f.get("acodec", "none") != "none":
-                filesize = f.get("filesize") or f.get("filesize_approx") or 0
-                size_mb = round(int(filesize) / 1048576, 2) if filesize else 0.0
-                formats.append({
-                    "quality": f.get("format_note") or f.get("height", "Unknown"),
-                    "file_size": f"{size_mb} MB",
-                    "download_url": f.get("url")
-                })
+        # Only formats that have BOTH video and audio (an unknown codec counts as missing here)
+        for f in playable(extracted.formats, query):
+            if not f.muxed or f.vcodec is None or f.acodec is None:
+                continue
+            filesize = f.filesize or f.filesize_approx or 0
+            size_mb = round(int(filesize) / 1048576, 2) if filesize else 0.0
+            formats.append({
+                "quality": f.note or f.height or "Unknown",
+                "file_size": f"{size_mb} MB",
+                "download_url": f.url
+            })
+
+        # DASH-only qualities (most v.redd.it videos): merged server-side
+        for m in merge_candidates(url, extracted.formats, query):
+            formats.append({
+                "quality": f"{m['quality']} (merged)",
+                "file_size": "-",
+                "download_url": m["url"]
+            })
 
         if not formats:
             return {
-                "title": info.get("title"),
-                "thumbnail": info.get("thumbnail"),
+                "title": extracted.title,
+                "thumbnail": extracted.thumbnail,
                 "formats": [{
                     "quality": "Unavailable",
                     "file_size": "-",
@@ -40,8 +59,8 @@ def download_reddit(url: str = Query(...)):
             }
 
         return {
-            "title": info.get("title"),
-            "thumbnail": info.get("thumbnail"),
+            "title": extracted.title,
+            "thumbnail": extracted.thumbnail,
             "formats": formats
         }
 
@@ -55,4 +74,11 @@ def download_reddit(url: str = Query(...)):
                 "download_url": "No valid direct download link found"
             }],
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+@router.get("/download/reddit")
+async def download_reddit(url: str = Query(...), query: FormatQuery = Depends(format_query)):
+    registry.validate(url, "reddit", "Invalid Reddit URL")
+    return await extract("reddit", url, partial(extract_reddit_info, query=query), query.variant())
+
+registry.register("reddit", ("reddit.com", "redd.it"), EXTRACTORS, download_reddit)
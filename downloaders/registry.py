@@ -0,0 +1,87 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from downloaders import metrics
+from downloaders.formats import FormatQuery, format_query
+
+router = APIRouter(tags=["Resolve"])
+
+
+class Platform(NamedTuple):
+    name: str
+    hosts: Tuple[str, ...]
+    extractors: Tuple[str, ...]
+    handler: Callable
+    cookies: bool = False  # the router passes cookies.txt to yt-dlp; shared routes (/stream…) do the same
+
+
+# ✅ Host (without subdomains) → platform, filled in by each router module
+_platforms: Dict[str, Platform] = {}
+_by_host: Dict[str, Platform] = {}
+
+
+def register(name: str, hosts, extractors, handler: Callable, cookies: bool = False) -> Platform:
+    """Register a platform router; `extractors` are yt-dlp IE name regexes.
+
+    `handler(url=..., query=FormatQuery)` is the router's endpoint coroutine.
+    """
+    platform = Platform(name, tuple(hosts), tuple(extractors), handler, cookies)
+    _platforms[name] = platform
+    for host in platform.hosts:
+        _by_host[host.lower()] = platform
+    return platform
+
+
+def host_of(url: str) -> str:
+    try:
+        return (urlparse(url.strip()).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+def lookup(url: str) -> Optional[Platform]:
+    """Platform for a URL by exact host or any parent domain (m.youtube.com → youtube.com)"""
+    host = host_of(url)
+    while host:
+        platform = _by_host.get(host)
+        if platform is not None:
+            return platform
+        _, _, host = host.partition(".")
+    return None
+
+
+def matches(url: str, name: str) -> bool:
+    platform = lookup(url)
+    return platform is not None and platform.name == name
+
+
+def validate(url: str, name: str, detail: str):
+    metrics.set_platform(name)
+    with metrics.stage("validation"):
+        if not matches(url, name):
+            raise HTTPException(status_code=400, detail=detail)
+
+
+def allowed_extractors(name: str) -> List[str]:
+    """Value for yt-dlp's `allowed_extractors`, so it skips probing every other extractor"""
+    return list(_platforms[name].extractors)
+
+
+def platforms() -> Dict[str, Platform]:
+    return dict(_platforms)
+
+
+@router.get("/resolve")
+async def resolve(url: str = Query(..., description="Any supported video / post URL"),
+                  fields: Optional[str] = Query(None, description="Preview mode: only these fields (see /preview)"),
+                  query: FormatQuery = Depends(format_query)):
+    """Single entry point: dispatch to the platform router that owns the URL's host"""
+    if fields:
+        from downloaders.preview import preview  # preview imports this module
+        return await preview(url, fields)
+    platform = lookup(url)
+    if platform is None:
+        raise HTTPException(status_code=400, detail="Unsupported URL")
+    return await platform.handler(url=url, query=query)
@@ -0,0 +1,32 @@
+import os
+import threading
+
+from downloaders.lazy import lazy_import
+
+requests = lazy_import("requests")
+
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """One keep-alive session shared by size probes and page fetches,
+    so connections to the same CDN / site get reused across requests.
+
+    Built on first use (or by the warm-up task): importing requests is not free.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.headers.update(HEADERS)
+                adapter = requests.adapters.HTTPAdapter(pool_connections=32, pool_maxsize=POOL_MAXSIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
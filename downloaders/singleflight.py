@@ -0,0 +1,60 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+from fastapi import APIRouter
+
+from downloaders import metrics
+
+router = APIRouter(tags=["Cache"])
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one shared task.
+
+    The shared task is shielded, so a waiter that disconnects or gets
+    cancelled only stops waiting; the work keeps going for everyone else.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _forget(self, key, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        total = self.leaders + self.coalesced
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+        }
+
+
+extraction_flight = SingleFlight()
+
+metrics.register(metrics.CounterFunc(
+    "downloader_coalesced_requests_total", "Requests that joined an in-flight extraction", (),
+    lambda: [((), extraction_flight.coalesced)]))
+
+
+@router.get("/singleflight/stats")
+def singleflight_stats():
+    return extraction_flight.stats()
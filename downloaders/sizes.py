@@ -0,0 +1,109 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, NamedTuple, Optional
+
+from downloaders import deadline as request_deadline, metrics, ratelimit
+from downloaders.formats import FormatRecord
+from downloaders.session import get_session, requests
+
+PROBE_WORKERS = int(os.getenv("SIZE_PROBE_WORKERS", "16"))
+PROBE_TIMEOUT = float(os.getenv("SIZE_PROBE_TIMEOUT", "10"))
+PROBE_DEADLINE = float(os.getenv("SIZE_PROBE_DEADLINE", "4"))
+
+_probe_pool = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix="size-probe")
+
+
+class SizeResult(NamedTuple):
+    """Size in bytes (or None) and how it was obtained"""
+    bytes: Optional[int]
+    source: str  # filesize | content-length | filesize_approx | bitrate_estimate | unknown
+
+
+UNKNOWN = SizeResult(None, "unknown")
+
+
+def format_bytes(size):
+    if not size:
+        return "N/A"
+    size_kb = size / 1024
+    return f"{round(size_kb / 1024, 2)} MB" if size_kb >= 1024 else f"{round(size_kb, 2)} KB"
+
+
+def estimate_size(f: FormatRecord, duration: Optional[float] = None) -> SizeResult:
+    """yt-dlp's own approximation, or tbr × duration"""
+    if f.filesize_approx:
+        return SizeResult(int(f.filesize_approx), "filesize_approx")
+    if f.tbr and duration:
+        return SizeResult(int(f.tbr * 1000 / 8 * duration), "bitrate_estimate")
+    return UNKNOWN
+
+
+def probe_content_length(url: str, timeout: float = PROBE_TIMEOUT) -> Optional[int]:
+    # Probes are optional: they skip an open circuit but don't spend rate budget
+    guard = ratelimit.guard_for(url)
+    if guard is not None and guard.is_open():
+        return None
+    try:
+        r = get_session().head(url, allow_redirects=True, timeout=timeout)
+        if guard is not None:
+            guard.record(f"HTTP {r.status_code}" if r.status_code == 429 else None)
+        if "Content-Length" in r.headers:
+            return int(r.headers["Content-Length"])
+    except requests.RequestException as e:
+        if guard is not None:
+            guard.record(e)
+    except ValueError:
+        pass
+    return None
+
+
+def resolve_sizes(formats: List[FormatRecord], duration: Optional[float] = None,
+                  deadline: float = PROBE_DEADLINE) -> List[SizeResult]:
+    """Size for every format, probing the ones without `filesize` concurrently.
+
+    Probes share one overall deadline (cut short by the request's own);
+    whatever has not answered by then falls back to `estimate_size`.
+    """
+    deadline = request_deadline.remaining(deadline)
+    with metrics.stage("size_probe"):
+        return _resolve_sizes(formats, duration, deadline)
+
+
+def _resolve_sizes(formats: List[FormatRecord], duration: Optional[float], deadline: float) -> List[SizeResult]:
+    results: List[Optional[SizeResult]] = [None] * len(formats)
+    futures = {}
+    started = time.monotonic()
+    timeout = min(PROBE_TIMEOUT, deadline)
+
+    for i, f in enumerate(formats):
+        if f.filesize:
+            results[i] = SizeResult(int(f.filesize), "filesize")
+            continue
+        url = f.url
+        if not url or deadline < request_deadline.MIN_TIMEOUT:
+            continue
+        # Same URL listed twice (e.g. image used as thumbnail) → probe once
+        if url not in futures:
+            futures[url] = _probe_pool.submit(probe_content_length, url, timeout)
+
+    if futures:
+        wait(futures.values(), timeout=max(0.0, deadline - (time.monotonic() - started)))
+
+    for i, f in enumerate(formats):
+        if results[i] is not None:
+            continue
+        future = futures.get(f.url)
+        size = None
+        if future is not None:
+            if future.done():
+                size = future.result()
+            else:
+                future.cancel()
+        results[i] = SizeResult(size, "content-length") if size else estimate_size(f, duration)
+    return results
+
+
+def probe_size(url: str, deadline: float = PROBE_DEADLINE) -> SizeResult:
+    """Single-URL shortcut (image posts, fallbacks)"""
+    return resolve_sizes([FormatRecord(url)], deadline=deadline)[0]
@@ -0,0 +1,169 @@
+import logging
+import os
+import re
+from typing import Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from downloaders import metrics, registry, ydl_pool
+from downloaders.cache import cache_key, extraction_cache
+from downloaders.extraction import extract
+from downloaders.formats import collect
+from downloaders.lazy import lazy_import
+from downloaders.session import HEADERS, POOL_MAXSIZE
+
+router = APIRouter(tags=["Stream"])
+httpx = lazy_import("httpx")
+# One INFO line per proxied request otherwise (youtube.py sets the root level to INFO)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", str(64 * 1024)))
+CONNECT_TIMEOUT = float(os.getenv("STREAM_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("STREAM_READ_TIMEOUT", "30"))
+
+# Request headers forwarded upstream, response headers forwarded back
+FORWARD_REQUEST_HEADERS = ("range", "if-range")
+FORWARD_RESPONSE_HEADERS = ("content-type", "content-length", "content-range", "accept-ranges",
+                            "etag", "last-modified")
+
+
+# Error class (metrics.classify_error) → status; anything else upstream is a 502
+UPSTREAM_STATUSES = {"timeout": 504, "private": 403, "unavailable": 404, "no_video": 404, "unsupported": 400}
+
+
+def upstream_error(e) -> HTTPException:
+    return HTTPException(status_code=UPSTREAM_STATUSES.get(metrics.classify_error(e), 502), detail=str(e))
+
+
+def format_table(url: str, platform: registry.Platform) -> Dict:
+    """Slim {format_id: url/headers/ext} table for a media URL (blocking)"""
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'skip_download': True,
+        'allowed_extractors': list(platform.extractors),
+    }
+    if platform.cookies:
+        ydl_opts['cookiefile'] = 'cookies.txt'  # same as the platform's own router
+    with ydl_pool.lease(ydl_opts) as ydl:
+        try:
+            with metrics.stage("extract_info"):
+                info = ydl.extract_info(url, download=False)
+        except Exception as e:
+            raise upstream_error(e)
+
+    extracted = collect(info if info.get("formats") else {**info, "formats": [info]})
+    del info
+    formats = {}
+    for f in extracted.formats:
+        if not f.is_direct:
+            continue  # HLS / DASH manifests can't be range-proxied as one file
+        formats[f.format_id] = {
+            "url": f.url,
+            "http_headers": f.http_headers,
+            "ext": f.ext or "mp4",
+            "height": f.height,
+            "abr": f.abr,
+            "has_video": f.has_video,
+            "has_audio": f.has_audio,
+            "muxed": f.muxed,
+        }
+    return {"title": extracted.title or "video", "formats": formats}
+
+
+def pick_format(table: Dict, format_id: Optional[str]) -> Dict:
+    formats = table["formats"]
+    if format_id:
+        if format_id not in formats:
+            raise HTTPException(status_code=404, detail=f"Format {format_id} not available for streaming")
+        return formats[format_id]
+    muxed = [f for f in formats.values() if f["muxed"]]
+    if not muxed:
+        raise HTTPException(status_code=404, detail="No progressive format available for streaming")
+    return max(muxed, key=lambda f: f["height"])
+
+
+def safe_filename(title: str, ext: str) -> str:
+    name = re.sub(r'[^\w\- .]', '_', title, flags=re.ASCII).strip()[:80] or "video"
+    return f"{name}.{ext}"
+
+
+_client = None
+
+
+def get_client():
+    """Async keep-alive client for proxied bodies: chunks are awaited on the event loop, no thread per stream"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_keepalive_connections=POOL_MAXSIZE),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def open_upstream(fmt: Dict, forwarded: Dict[str, str]):
+    # identity: bytes must reach the client exactly as Range/Content-Length describe them
+    headers = {**fmt["http_headers"], **forwarded, "Accept-Encoding": "identity"}
+    client = get_client()
+    return await client.send(client.build_request("GET", fmt["url"], headers=headers), stream=True)
+
+
+async def iter_body(r):
+    try:
+        async for chunk in r.aiter_raw(CHUNK_SIZE):
+            yield chunk
+    finally:
+        await r.aclose()
+
+
+@router.get("/stream")
+async def stream(request: Request, url: str = Query(...), format_id: Optional[str] = Query(None)):
+    """Proxy one format of a media URL, passing Range / If-Range through for seeking and resume"""
+    platform = registry.lookup(url)
+    if platform is None:
+        raise HTTPException(status_code=400, detail="Unsupported URL")
+    metrics.set_platform(platform.name)
+
+    def load(u):
+        return format_table(u, platform)
+
+    forwarded = {k: v for k, v in request.headers.items() if k in FORWARD_REQUEST_HEADERS}
+    table = await extract(f"stream:{platform.name}", url, load)
+    fmt = pick_format(table, format_id)
+
+    try:
+        r = await open_upstream(fmt, forwarded)
+        if r.status_code in (403, 410):
+            # Signed URL expired early: refresh the format table once
+            await r.aclose()
+            await extraction_cache.adelete(cache_key(f"stream:{platform.name}", url))
+            table = await extract(f"stream:{platform.name}", url, load)
+            fmt = pick_format(table, format_id)
+            r = await open_upstream(fmt, forwarded)
+    except httpx.TimeoutException as e:
+        metrics.record_error("stream", e)
+        raise HTTPException(status_code=504, detail="Upstream timed out")
+    except httpx.HTTPError as e:
+        metrics.record_error("stream", e)
+        raise HTTPException(status_code=502, detail="Upstream connection failed")
+
+    if r.status_code >= 400 and r.status_code != 416:
+        await r.aclose()
+        metrics.record_error("stream", f"HTTP {r.status_code}")
+        raise HTTPException(status_code=502, detail=f"Upstream returned {r.status_code}")
+
+    headers = {k.lower(): v for k, v in r.headers.items() if k.lower() in FORWARD_RESPONSE_HEADERS}
+    headers.setdefault("accept-ranges", "bytes")
+    headers["content-disposition"] = f'attachment; filename="{safe_filename(table["title"], fmt["ext"])}"'
+    return StreamingResponse(iter_body(r), status_code=r.status_code, headers=headers)
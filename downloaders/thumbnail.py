@@ -0,0 +1,283 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urljoin
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from downloaders import deadline, metrics, ratelimit
+from downloaders.diskcache import DiskCache, content_key, pinned_response
+from downloaders.lazy import lazy_import
+from downloaders.registry import host_of
+from downloaders.session import get_session, requests
+from downloaders.singleflight import SingleFlight
+
+router = APIRouter(tags=["Thumbnail"])
+ffmpeg = lazy_import("ffmpeg")
+
+THUMB_CACHE_DIR = os.getenv("THUMB_CACHE_DIR", os.path.join("cache", "thumbnails"))
+THUMB_CACHE_MAX_BYTES = int(os.getenv("THUMB_CACHE_MAX_MB", "512")) * 1024 * 1024
+# After this long a cached original is revalidated upstream (ETag / Last-Modified) before serving
+THUMB_REVALIDATE_AFTER = float(os.getenv("THUMB_REVALIDATE_AFTER", "3600"))
+THUMB_TIMEOUT = float(os.getenv("THUMB_TIMEOUT", "10"))
+THUMB_MAX_BYTES = int(os.getenv("THUMB_MAX_BYTES", str(10 * 1024 * 1024)))
+THUMB_CLIENT_MAX_AGE = int(os.getenv("THUMB_CLIENT_MAX_AGE", "86400"))
+THUMB_MAX_RESIZES = int(os.getenv("THUMB_MAX_RESIZES", "2"))
+THUMB_RESIZE_TIMEOUT = float(os.getenv("THUMB_RESIZE_TIMEOUT", "10"))
+# Redirects are followed by hand, each hop checked against THUMB_HOSTS
+THUMB_MAX_REDIRECTS = int(os.getenv("THUMB_MAX_REDIRECTS", "3"))
+# Requested widths snap up to one of these, so each image has at most this many variants
+WIDTHS = (120, 240, 360, 480, 720)
+
+# ✅ Image CDNs the proxy will fetch from (it must not become an open proxy)
+THUMB_HOSTS = ("ytimg.com", "ggpht.com", "googleusercontent.com", "fbcdn.net", "cdninstagram.com",
+               "twimg.com", "vimeocdn.com", "dmcdn.net", "dailymotion.com", "redditmedia.com",
+               "redd.it", "licdn.com", *filter(None, os.getenv("THUMB_EXTRA_HOSTS", "").split(",")))
+
+# content type → extension of the stored original
+IMAGE_TYPES = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp", "image/gif": "gif",
+               "image/avif": "avif"}
+MEDIA_TYPES = {ext: media_type for media_type, ext in IMAGE_TYPES.items()}
+
+thumb_cache = DiskCache(THUMB_CACHE_DIR, THUMB_CACHE_MAX_BYTES)
+thumb_flight = SingleFlight()
+_resize_slots = threading.BoundedSemaphore(THUMB_MAX_RESIZES)
+
+thumb_requests = metrics.register(metrics.Counter(
+    "downloader_thumbnail_requests_total", "Thumbnail proxy requests by outcome", ("result",)))
+metrics.register(metrics.Gauge(
+    "downloader_thumbnail_cache_bytes", "Bytes of thumbnails (originals and variants) on disk", (),
+    lambda: [((), thumb_cache.stats()["bytes"])]))
+
+
+def allowed(url: str) -> bool:
+    host = host_of(url)
+    return url.startswith(("http://", "https://")) and any(
+        host == allowed_host or host.endswith("." + allowed_host) for allowed_host in THUMB_HOSTS)
+
+
+def bucket(width: Optional[int]) -> Optional[int]:
+    """Smallest bucket at least `width` wide; None (the original) above the largest"""
+    if not width:
+        return None
+    return next((w for w in WIDTHS if w >= width), None)
+
+
+# 🔹 Originals: one sidecar per source URL, bodies stored by content hash
+
+def _load_meta(url_key: str) -> Optional[Dict]:
+    path = thumb_cache.get(url_key, "json")
+    if path is None:
+        return None
+    try:
+        with open(path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Touches the body's LRU entry too; it may have been evicted on its own
+    if thumb_cache.get(meta["sha"], meta["ext"]) is None:
+        return None
+    return meta
+
+
+def _save_meta(url_key: str, meta: Dict):
+    out, tmp = thumb_cache.open_temp(url_key)
+    with out:
+        out.write(json.dumps(meta).encode())
+    thumb_cache.commit(url_key, "json", tmp)
+
+
+def open_image(url: str, headers: Dict, timeout: float):
+    """Streaming GET that never follows a redirect off the allowed image hosts"""
+    for _ in range(THUMB_MAX_REDIRECTS + 1):
+        r = get_session().get(url, headers=headers, stream=True, timeout=timeout, allow_redirects=False)
+        if not r.is_redirect:
+            return r
+        location = urljoin(url, r.headers["Location"])
+        r.close()
+        if not allowed(location):
+            raise requests.exceptions.InvalidURL(f"Redirect to a host that isn't allowed: {host_of(location)}")
+        url = location
+    raise requests.TooManyRedirects(f"More than {THUMB_MAX_REDIRECTS} redirects")
+
+
+def fetch(url: str, url_key: str, cached: Optional[Dict]) -> Dict:
+    """Download (or revalidate) one original (blocking). Returns its sidecar"""
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    guard = ratelimit.guard_for(url)
+    if guard is not None and guard.is_open():
+        if cached:
+            return cached
+        raise HTTPException(status_code=503, detail="Image host is unavailable, try again later")
+
+    with metrics.stage("thumbnail_fetch"):
+        try:
+            with open_image(url, headers, deadline.timeout(THUMB_TIMEOUT)) as r:
+                if guard is not None:
+                    guard.record(f"HTTP {r.status_code}" if r.status_code == 429 else None)
+                if r.status_code == 304 and cached:
+                    thumb_requests.inc("revalidated")
+                    meta = {**cached, "checked_at": time.time()}
+                    _save_meta(url_key, meta)
+                    return meta
+                if r.status_code != 200 and cached:
+                    # Gone or failing upstream: keep serving our copy, ask again after the next period
+                    metrics.record_error("thumbnail_fetch", f"HTTP {r.status_code}")
+                    meta = {**cached, "checked_at": time.time()}
+                    _save_meta(url_key, meta)
+                    return meta
+                if r.status_code != 200:
+                    raise HTTPException(status_code=502, detail=f"Image host answered HTTP {r.status_code}")
+                content_type = r.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                ext = IMAGE_TYPES.get(content_type)
+                if ext is None:
+                    raise HTTPException(status_code=502, detail=f"Not an image ({content_type or 'no type'})")
+
+                digest = hashlib.sha256()
+                out, tmp = thumb_cache.open_temp(url_key)
+                read = 0
+                try:
+                    with out:
+                        for chunk in r.iter_content(64 * 1024):
+                            read += len(chunk)
+                            if read > THUMB_MAX_BYTES:
+                                raise HTTPException(status_code=502, detail="Image too large")
+                            digest.update(chunk)
+                            out.write(chunk)
+                except BaseException:
+                    thumb_cache.discard(tmp)
+                    raise
+                sha = digest.hexdigest()
+                thumb_cache.commit(sha, ext, tmp)
+                meta = {
+                    "sha": sha,
+                    "ext": ext,
+                    "etag": r.headers.get("ETag"),
+                    "last_modified": r.headers.get("Last-Modified"),
+                    "checked_at": time.time(),
+                }
+        except requests.RequestException as e:
+            metrics.record_error("thumbnail_fetch", e)
+            if guard is not None:
+                guard.record(e)
+            if cached:
+                return cached  # stale beats broken
+            raise HTTPException(status_code=502, detail="Could not fetch image")
+    _save_meta(url_key, meta)
+    thumb_requests.inc("fetched")
+    return meta
+
+
+async def original(url: str) -> Dict:
+    """Sidecar for `url`, fetching or revalidating it first when needed"""
+    url_key = content_key("thumbnail", url)
+    meta = await asyncio.to_thread(_load_meta, url_key)  # the first call also indexes the cache directory
+    if meta is not None and time.time() - meta["checked_at"] < THUMB_REVALIDATE_AFTER:
+        thumb_requests.inc("hit")
+        return meta
+    return await thumb_flight.do(url_key, lambda: asyncio.to_thread(fetch, url, url_key, meta))
+
+
+# 🔹 Downscaled variants, keyed by the original's content and the width bucket
+
+def variant_ext(meta: Dict) -> str:
+    return "png" if meta["ext"] == "png" else "jpg"  # keep transparency, otherwise JPEG
+
+
+def resize(meta: Dict, width: int) -> Optional[Tuple[str, str]]:
+    """Render the `width` variant into the cache (blocking); (path, ext), or None to serve the original"""
+    ext = variant_ext(meta)
+    key = content_key(meta["sha"], width)
+    if shutil.which("ffmpeg") is None or not _resize_slots.acquire(blocking=False):
+        thumb_requests.inc("resize_skipped")
+        return None
+
+    out, tmp = thumb_cache.open_temp(key)
+    out.close()
+    try:
+        source = thumb_cache.path_for(meta["sha"], meta["ext"])
+        # min(iw, …): never upscale; -2 keeps the aspect ratio with an even height
+        stream = ffmpeg.input(source).filter("scale", f"min(iw,{width})", -2)
+        cmd = (stream.output(tmp, vframes=1, f="image2", vcodec="png" if ext == "png" else "mjpeg",
+                             **{"q:v": 4})
+               .global_args("-loglevel", "error").overwrite_output().compile())
+        with metrics.stage("thumbnail_resize"):
+            done = subprocess.run(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.DEVNULL, timeout=THUMB_RESIZE_TIMEOUT)
+        if done.returncode != 0 or not os.path.getsize(tmp):
+            thumb_cache.discard(tmp)
+            thumb_requests.inc("resize_failed")
+            return None
+        thumb_requests.inc("resized")
+        return thumb_cache.commit(key, ext, tmp), ext
+    except (OSError, subprocess.TimeoutExpired) as e:
+        metrics.record_error("thumbnail_resize", e)
+        thumb_cache.discard(tmp)
+        return None
+    finally:
+        _resize_slots.release()
+
+
+@router.get("/thumbnail")
+async def thumbnail(
+    request: Request,
+    url: str = Query(..., description="Thumbnail URL from a /download or /preview response"),
+    w: Optional[int] = Query(None, ge=1, le=4096, description=f"Width; snapped up to one of {WIDTHS}"),
+):
+    """Thumbnail served from our disk cache, optionally downscaled.
+
+    Each image is fetched once and revalidated with ETag / If-Modified-Since
+    after THUMB_REVALIDATE_AFTER; clients get a content-based ETag and can
+    revalidate against us the same way.
+    """
+    if not allowed(url):
+        raise HTTPException(status_code=400, detail="Not a supported thumbnail host")
+    metrics.set_platform("thumbnail")
+    width = bucket(w)
+    meta = await original(url)
+
+    path = thumb_cache.path_for(meta["sha"], meta["ext"])
+    ext = meta["ext"]
+    etag = f'"{meta["sha"][:32]}-{width or 0}"'
+    cache_control = f"public, max-age={THUMB_CLIENT_MAX_AGE}"
+    if width:
+        key = content_key(meta["sha"], width)
+        variant = await asyncio.to_thread(thumb_cache.get, key, variant_ext(meta))
+        if variant is not None:
+            resized = variant, variant_ext(meta)
+        else:
+            resized = await thumb_flight.do(key, lambda: asyncio.to_thread(resize, meta, width))
+        if resized is None:
+            # Degraded to the original: don't let clients keep it under the variant's URL
+            etag = f'"{meta["sha"][:32]}-0"'
+            cache_control = "no-cache"
+        else:
+            path, ext = resized
+
+    if etag in request.headers.get("if-none-match", ""):
+        thumb_requests.inc("not_modified")
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    response = pinned_response(thumb_cache, path, media_type=MEDIA_TYPES.get(ext, "application/octet-stream"),
+                               headers={"ETag": etag, "Cache-Control": cache_control})
+    if response is None:
+        # Evicted in the moment since it was looked up: rare enough that a retry is the answer
+        raise HTTPException(status_code=503, detail="Thumbnail was just evicted, try again",
+                            headers={"Retry-After": "1"})
+    return response
+
+
+@router.get("/thumbnail/stats")
+def thumbnail_stats():
+    return {**thumb_cache.stats(), "widths": WIDTHS}
@@ -0,0 +1,67 @@
+import shutil
+import subprocess
+import threading
+from typing import List
+
+from fastapi import HTTPException
+
+CHUNK_SIZE = 64 * 1024
+
+
+def acquire_slot(slots: threading.BoundedSemaphore, what: str, retry_after: int):
+    """Take an ffmpeg slot or answer 503 (also when ffmpeg is missing)"""
+    if shutil.which("ffmpeg") is None:
+        raise HTTPException(status_code=503, detail="ffmpeg is not installed on this server")
+    if not slots.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail=f"Too many {what} in progress, try again later",
+                            headers={"Retry-After": str(retry_after)})
+
+
+class FFmpegProcess:
+    """One running ffmpeg writing to stdout and holding a pool slot; close() is idempotent"""
+
+    def __init__(self, cmd: List[str], slots: threading.BoundedSemaphore):
+        self.slots = slots
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL, bufsize=0)
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def iter_stdout(self):
+        try:
+            while True:
+                chunk = self.proc.stdout.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self.close()
+
+    def succeeded(self) -> bool:
+        return self.proc.wait() == 0
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        self.proc.stdout.close()
+        self.slots.release()
+
+
+def start(cmd: List[str], slots: threading.BoundedSemaphore) -> FFmpegProcess:
+    """Start ffmpeg in a slot that the caller already acquired"""
+    try:
+        return FFmpegProcess(cmd, slots)
+    except Exception:
+        slots.release()
+        raise
+
+
+def input_args(fmt) -> dict:
+    # yt-dlp's per-format headers (UA, Referer, cookies) as ffmpeg's -headers blob
+    headers = "".join(f"{k}: {v}\r\n" for k, v in fmt["http_headers"].items())
+    return {"headers": headers} if headers else {}
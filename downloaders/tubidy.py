@@ -1,11 +1,24 @@
-from fastapi import APIRouter, Query
+from functools import partial
+from fastapi import APIRouter, Depends, Query, HTTPException
 from downloaders.utils import extract_video_info
+from downloaders.extraction import extract
+from downloaders import registry
+from downloaders.formats import FormatQuery, format_query
 
 router = APIRouter()
 
+# yt-dlp has no Tubidy extractor, the generic one handles its pages
+EXTRACTORS = ["generic"]
+
 @router.get("/download/tubidy")
-def download_tubidy(url: str = Query(...)):
+async def download_tubidy(url: str = Query(...), query: FormatQuery = Depends(format_query)):
+    registry.validate(url, "tubidy", "Invalid Tubidy URL")
     try:
-        return extract_video_info(url)
+        return await extract("tubidy", url, partial(extract_video_info, allowed_extractors=EXTRACTORS, query=query),
+                             query.variant())
+    except HTTPException:
+        raise
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+registry.register("tubidy", ("tubidy.com", "tubidy.mobi"), EXTRACTORS, download_tubidy, cookies=True)
@@ -1,14 +1,26 @@
-from fastapi import APIRouter
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import HttpUrl
 from fastapi.responses import JSONResponse
 from .utils import extract_video_info
+from .extraction import extract
+from . import registry
+from .formats import FormatQuery, format_query
 
 router = APIRouter()
 
+EXTRACTORS = ["twitter", "twitter:.*"]
+
 @router.get("/download/twitter")
-def download_twitter(url: HttpUrl):
+async def download_twitter(url: HttpUrl, query: FormatQuery = Depends(format_query)):
+    registry.validate(str(url), "twitter", "Invalid Twitter/X URL")
     try:
-        result = extract_video_info(str(url))
+        result = await extract("twitter", str(url), partial(extract_video_info, allowed_extractors=EXTRACTORS, query=query),
+                               query.variant())
         return result
+    except HTTPException:
+        raise
     except Exception as e:
-        return JSONResponse(content={"error": str(e)}, status_code=500)
\ No newline at end of file
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+registry.register("twitter", ("twitter.com", "x.com", "t.co"), EXTRACTORS, download_twitter, cookies=True)
@@ -1,25 +1,10 @@
-import yt_dlp
-import requests
+from fastapi import HTTPException
+from downloaders import ydl_pool, metrics
+from downloaders.sizes import format_bytes, resolve_sizes, probe_size
+from downloaders.audio import audio_link, estimated_size
+from downloaders.formats import DEFAULT_QUERY, best_audio, collect, playable
 
-def format_bytes(size):
-    if not size:
-        return "N/A"
-    size_kb = size / 1024
-    return f"{round(size_kb / 1024, 2)} MB" if size_kb >= 1024 else f"{round(size_kb, 2)} KB"
-
-def get_file_size_from_url(url):
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0',
-        }
-        r = requests.head(url, allow_redirects=True, timeout=10, headers=headers)
-        if "Content-Length" in r.headers:
-            return format_bytes(int(r.headers["Content-Length"]))
-    except:
-        pass
-    return "N/A"
-
-def extract_video_info(url):
+def extract_video_info(url, allowed_extractors=None, query=DEFAULT_QUERY):
     ydl_opts = {
         'quiet': True,
         'no_warnings': True,
@@ -28,66 +13,75 @@ def extract_video_info(url):
         'merge_output_format': 'mp4',
         'cookiefile': 'cookies.txt',  # ✅ Support for private video access
     }
+    if allowed_extractors:
+        ydl_opts['allowed_extractors'] = allowed_extractors  # ✅ Skip the generic probe
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with ydl_pool.lease(ydl_opts) as ydl:
             try:
-                info = ydl.extract_info(url, download=False)
+                with metrics.stage("extract_info"):
+                    info = ydl.extract_info(url, download=False)
             except Exception as e:
                 if "There is no video in this post" in str(e):
                     info = {"error": "ImageOnly", "raw_url": url}
                 else:
                     return {"error": str(e)}
+    except HTTPException:
+        raise  # every cookie account is out of budget (503)
     except Exception as e:
         return {"error": str(e)}
 
-    title = info.get("title", "Instagram Post")
-    thumbnail = info.get("thumbnail")
+    raw_url = info.get("raw_url") if info.get("error") == "ImageOnly" else None
+    extracted = collect(info)
+    del info  # ✅ only the slim records are kept from here on
+
+    title = extracted.title or "Instagram Post"
+    thumbnail = extracted.thumbnail
     formats = []
 
-    # ✅ VIDEO + AUDIO formats
-    for f in info.get("formats", []):
-        if f.get("acodec") != "none" and (f.get("vcodec") != "none" or f.get("ext") in ("m3u8", "mpd")):
-            height = f.get("height")
-            quality = f"{height}p" if height else f.get("format_id")
-            url_f = f.get("url")
-            size = format_bytes(f.get("filesize")) if f.get("filesize") else get_file_size_from_url(url_f)
-            formats.append({
-                "quality": quality,
-                "file_size": size,
-                "download_url": url_f
-            })
+    # ✅ VIDEO + AUDIO formats and the audio-only stream as-is
+    selected = [(f.label(), f) for f in playable(extracted.formats, query)]
+    audio = best_audio(extracted.formats, query)
+    if audio:
+        selected.append((f"Audio ({audio.ext})", audio))
 
-    # ✅ AUDIO ONLY (MP3 fallback)
-    for f in info.get("formats", []):
-        if f.get("vcodec") == "none" and f.get("acodec") != "none":
-            size = format_bytes(f.get("filesize")) if f.get("filesize") else get_file_size_from_url(f.get("url"))
-            formats.append({
-                "quality": "MP3 Audio",
-                "file_size": size,
-                "download_url": f.get("url")
-            })
-            break
+    # ✅ Sizes for every selected format in one concurrent pass
+    sizes = resolve_sizes([f for _, f in selected], extracted.duration)
+    for (quality, f), size in zip(selected, sizes):
+        formats.append({
+            "quality": quality,
+            "file_size": format_bytes(size.bytes),
+            "size_source": size.source,
+            "download_url": f.url
+        })
+
+    # ✅ Real MP3, converted server-side
+    if query.audio and any(f.has_audio for _, f in selected):
+        size = estimated_size(extracted.duration)
+        formats.append({
+            "quality": "MP3 Audio",
+            "file_size": format_bytes(size.bytes),
+            "size_source": size.source,
+            "download_url": audio_link(url)
+        })
 
     # ✅ FINAL FALLBACK: Try to extract image-only content
     if not formats:
         image_url = None
 
-        if info.get("error") == "ImageOnly":
-            image_url = info.get("raw_url")
+        if raw_url:
+            image_url = raw_url
         elif not thumbnail or thumbnail == "null":
-            image_url = (
-                info.get("display_url") or
-                (info.get("thumbnails", [{}])[-1].get("url") if info.get("thumbnails") else None)
-            )
+            image_url = extracted.image_url
         if not image_url and thumbnail:
             image_url = thumbnail
 
         if image_url:
-            size = get_file_size_from_url(image_url)
+            size = probe_size(image_url)
             formats.append({
                 "quality": "Image",
-                "file_size": size,
+                "file_size": format_bytes(size.bytes),
+                "size_source": size.source,
                 "download_url": image_url
             })
             thumbnail = image_url
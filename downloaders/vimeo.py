@@ -1,52 +1,52 @@
-from fastapi import APIRouter, Query
-import yt_dlp
-import requests
+from functools import partial
+from fastapi import APIRouter, Depends, Query
+from downloaders import ydl_pool, metrics
+from downloaders.extraction import extract
+from downloaders import registry
+from downloaders.playlist import is_playlist_url, not_a_video
+from downloaders.sizes import resolve_sizes
+from downloaders.formats import DEFAULT_QUERY, FormatQuery, collect, format_query, playable
 
 router = APIRouter()
 
-@router.get("/download/vimeo")
-def download_vimeo(url: str = Query(...)):
+EXTRACTORS = ["vimeo", "vimeo:.*"]
+
+def extract_vimeo_info(url, query=DEFAULT_QUERY):
     try:
         ydl_opts = {
             'quiet': True,
             'skip_download': True,
             'forcejson': True,
+            'allowed_extractors': EXTRACTORS,
         }
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-
-            formats = []
-            for f in info.get("formats", []):
-                # ✅ Skip if no URL or only audio
-                if not f.get("url"):
-                    continue
-
-                if f.get("vcodec") != "none" and f.get("acodec") != "none" and f.get("protocol") == "https":
-                    label = f.get("format_note") or f.get("height", "Unknown")
-                    if isinstance(label, int):
-                        label = f"{label}p"
+        with ydl_pool.lease(ydl_opts) as ydl:
+            with metrics.stage("extract_info"):
+                info = ydl.extract_info(url, download=False)
+            extracted = collect(info)
+            del info
 
-                    # 🔍 Try file size
-                    file_size_bytes = f.get("filesize")
-                    if not file_size_bytes:
-                        try:
-                            head = requests.head(f["url"], timeout=10, allow_redirects=True)
-                            file_size_bytes = int(head.headers.get("Content-Length", 0))
-                        except:
-                            file_size_bytes = 0
+            # ✅ Progressive files only (Vimeo's HLS/DASH entries are manifests)
+            selected = [(f.note or (f.label() if f.height else "Unknown"), f)
+                        for f in playable(extracted.formats, query, manifests=False)]
 
-                    file_size = f"{round(file_size_bytes / (1024 * 1024), 2)} MB" if file_size_bytes else "0.0 MB"
+            # 🔍 File sizes (probed concurrently when yt-dlp has none)
+            formats = []
+            sizes = resolve_sizes([f for _, f in selected], extracted.duration)
+            for (label, f), size in zip(selected, sizes):
+                file_size_bytes = size.bytes or 0
+                file_size = f"{round(file_size_bytes / (1024 * 1024), 2)} MB" if file_size_bytes else "0.0 MB"
 
-                    formats.append({
-                        "quality": label,
-                        "file_size": file_size,
-                        "download_url": f["url"]
-                    })
+                formats.append({
+                    "quality": label,
+                    "file_size": file_size,
+                    "size_source": size.source,
+                    "download_url": f.url
+                })
 
             return {
-                "title": info.get("title", "download"),
-                "thumbnail": info.get("thumbnail"),
+                "title": extracted.title or "download",
+                "thumbnail": extracted.thumbnail,
                 "formats": formats if formats else [{
                     "quality": "Unavailable",
                     "file_size": "-",
@@ -64,4 +64,13 @@ def download_vimeo(url: str = Query(...)):
                 "download_url": "Error occurred"
             }],
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+@router.get("/download/vimeo")
+async def download_vimeo(url: str = Query(...), query: FormatQuery = Depends(format_query)):
+    registry.validate(url, "vimeo", "Invalid Vimeo URL")
+    if is_playlist_url(url):
+        raise not_a_video(url)
+    return await extract("vimeo", url, partial(extract_vimeo_info, query=query), query.variant())
+
+registry.register("vimeo", ("vimeo.com",), EXTRACTORS, download_vimeo)
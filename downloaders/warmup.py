@@ -0,0 +1,102 @@
+import asyncio
+import importlib
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from downloaders import metrics, registry
+from downloaders.lazy import lazy_import
+from downloaders.session import get_session
+
+router = APIRouter(tags=["Health"])
+logger = logging.getLogger(__name__)
+
+yt_dlp = lazy_import("yt_dlp")
+
+# Off: nothing is loaded until the first request needs it, and /ready is true right away
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+HEAVY_MODULES = ("yt_dlp", "requests", "httpx", "ffmpeg")
+
+
+def load_extractors() -> int:
+    """Import the real extractor classes behind every registered platform's `allowed_extractors`.
+
+    yt-dlp's lazy extractor table only holds stubs; the first extraction on a
+    site imports its (often large) extractor module. Returns how many were loaded.
+    """
+    loaded = 0
+    for name in registry.platforms():
+        with yt_dlp.YoutubeDL({"quiet": True, "allowed_extractors": registry.allowed_extractors(name)}) as ydl:
+            for ie_key in list(ydl._ies):
+                ydl.get_info_extractor(ie_key)
+                loaded += 1
+    return loaded
+
+
+class Warmup:
+    """Background warm-up of the heavy imports, run once from the lifespan"""
+
+    def __init__(self):
+        self.steps: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.extractors = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return not WARMUP_ENABLED or self.finished_at is not None
+
+    def _step(self, name: str, func):
+        start = time.perf_counter()
+        result = func()
+        self.steps[name] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    def run(self):
+        """Blocking; every step is also what the first request would otherwise pay for"""
+        self.started_at = time.time()
+        try:
+            for module in HEAVY_MODULES:
+                self._step(f"import:{module}", lambda: importlib.import_module(module))
+            self._step("http_session", get_session)
+            self.extractors = self._step("extractors", load_extractors)
+        except Exception as e:
+            # Not fatal: whatever didn't load here loads on first use instead
+            logger.exception("Warm-up failed")
+            self.error = str(e)
+        self.finished_at = time.time()
+
+    def start(self) -> asyncio.Task:
+        self._task = asyncio.ensure_future(asyncio.to_thread(self.run))
+        return self._task
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "enabled": WARMUP_ENABLED,
+            "seconds": round(self.finished_at - self.started_at, 3) if self.finished_at else None,
+            "steps_ms": self.steps,
+            "extractors": self.extractors,
+            "error": self.error,
+        }
+
+
+warmup = Warmup()
+
+metrics.register(metrics.Gauge(
+    "downloader_ready", "1 once the startup warm-up has finished", (),
+    lambda: [((), int(warmup.ready))]))
+
+
+@router.get("/ready")
+def ready():
+    """Readiness probe: 503 until the warm-up is done, so new workers get traffic only once they're fast"""
+    if warmup.ready:
+        return warmup.stats()
+    return JSONResponse(status_code=503, content=warmup.stats(), headers={"Retry-After": "1"})
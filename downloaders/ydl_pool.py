@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter
+
+from downloaders import cookies, hedging, ratelimit
+from downloaders.lazy import lazy_import
+
+router = APIRouter(tags=["Executor"])
+yt_dlp = lazy_import("yt_dlp")
+
+POOL_MAX_IDLE = int(os.getenv("YDL_POOL_MAX_IDLE", "8"))
+# Retire an instance after this many leases so per-extractor caches can't grow forever
+POOL_MAX_USES = int(os.getenv("YDL_POOL_MAX_USES", "500"))
+
+
+def opts_key(opts: dict) -> str:
+    return json.dumps(opts, sort_keys=True, default=repr)
+
+
+def reset(ydl):
+    """Clear the per-run counters extract_info leaves behind"""
+    ydl._download_retcode = 0
+    ydl._num_downloads = 0
+    ydl._num_videos = 0
+    ydl._playlist_level = 0
+    ydl._playlist_urls.clear()
+    ydl._printed_messages.clear()
+
+
+class _PooledMixin:
+    """YoutubeDL bound to one cookie account.
+
+    Every extraction's outcome feeds the upstream's rate limiter, and login
+    walls put the account on cooldown.
+    """
+
+    account: Optional[cookies.Account] = None
+
+    def extract_info(self, url, *args, **kwargs):
+        guard = ratelimit.guard_for(url)
+        try:
+            info = super().extract_info(url, *args, **kwargs)
+        except Exception as e:
+            if self.account is not None and cookies.is_login_wall(e):
+                self.account.cool_down()
+            if guard is not None:
+                guard.record(e)
+            raise
+        if guard is not None:
+            guard.record()
+        return info
+
+
+_pooled_class = None
+_class_lock = threading.Lock()
+
+
+def pooled_class():
+    """PooledYoutubeDL, defined on first use so importing this module doesn't import yt-dlp"""
+    global _pooled_class
+    if _pooled_class is None:
+        with _class_lock:
+            if _pooled_class is None:
+                _pooled_class = type("PooledYoutubeDL", (_PooledMixin, yt_dlp.YoutubeDL), {})
+    return _pooled_class
+
+
+class YDLPool:
+    """Warm YoutubeDL instances for one option set (and cookie account).
+
+    Each instance keeps its extractor registry, cookie jar and HTTP
+    handlers (and so its keep-alive connections) between requests. An
+    instance is only ever leased to one thread at a time.
+    """
+
+    def __init__(self, opts: dict, account: Optional[cookies.Account] = None,
+                 max_idle: int = POOL_MAX_IDLE, max_uses: int = POOL_MAX_USES):
+        self.opts = dict(opts)
+        self.account = account
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self._idle: List = []
+        self._uses: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.retired = 0
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop()
+            self.created += 1
+        ydl = pooled_class()(self.opts)
+        if self.account is not None:
+            # The account's in-memory jar instead of reparsing cookies.txt per instance
+            ydl.cookiejar = self.account.jar
+            ydl.account = self.account
+        self._uses[id(ydl)] = 0
+        return ydl
+
+    def _release(self, ydl):
+        reset(ydl)
+        with self._lock:
+            uses = self._uses.get(id(ydl), 0) + 1
+            if uses < self.max_uses and len(self._idle) < self.max_idle:
+                self._uses[id(ydl)] = uses
+                self._idle.append(ydl)
+                return
+            self._uses.pop(id(ydl), None)
+            self.retired += 1
+        ydl.close()
+
+    @contextmanager
+    def lease(self):
+        ydl = self._acquire()
+        try:
+            yield ydl
+        finally:
+            self._release(ydl)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._uses.clear()
+        for ydl in idle:
+            ydl.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"idle": len(self._idle), "created": self.created, "reused": self.reused, "retired": self.retired}
+
+
+_pools: Dict[str, YDLPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(opts: dict, account: Optional[cookies.Account] = None) -> YDLPool:
+    key = opts_key(opts)
+    if account is not None:
+        key += "|" + account.path
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(key, YDLPool(opts, account))
+    return pool
+
+
+def lease(opts: dict):
+    """`with lease(ydl_opts) as ydl:` — drop-in for `with yt_dlp.YoutubeDL(ydl_opts) as ydl:`
+
+    A `cookiefile` option is served by the cookie manager: the next account
+    in rotation lends its jar, and yt-dlp never reads or writes the file.
+    A hedged attempt gets the alternate profile (see downloaders.hedging).
+    """
+    opts = hedging.alternate_opts(opts)
+    if opts.get("cookiefile") is None:
+        return get_pool(opts).lease()
+    opts = {k: v for k, v in opts.items() if k != "cookiefile"}
+    return get_pool(opts, cookies.manager.acquire()).lease()
+
+
+def close_all():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+def stats() -> List[dict]:
+    return [{"extractors": pool.opts.get("allowed_extractors"),
+             "account": pool.account.name if pool.account else None,
+             **pool.stats()} for pool in list(_pools.values())]
+
+
+@router.get("/ydl/stats")
+def ydl_stats():
+    return stats()
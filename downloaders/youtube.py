@@ -1,11 +1,23 @@
 # routers/youtube_router.py
-from fastapi import APIRouter, HTTPException
-import yt_dlp
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException
+from downloaders.lazy import lazy_import
+from downloaders import ydl_pool, metrics
 import logging
-from typing import List, Dict, Optional
+from typing import Dict
+from downloaders.extraction import extract
+from downloaders import registry
+from downloaders.playlist import is_playlist_url, not_a_video
+from downloaders.merge import merge_candidates
+from downloaders.audio import audio_link, DEFAULT_BITRATE
+from downloaders.formats import DEFAULT_QUERY, FormatQuery, best_audio, collect, format_query, videos
+
+yt_dlp = lazy_import("yt_dlp")  # imported on first use or by the warm-up task
 
 router = APIRouter()
 
+EXTRACTORS = ["youtube", "youtube:tab", "youtube:playlist", "youtube:clip"]
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,95 +30,91 @@ def sanitize_youtube_url(url: str) -> str:
         return url.split('&')[0]
     return url
 
-def get_best_mp3(formats: List[Dict]) -> Optional[Dict]:
-    """Find the highest quality MP3 audio format"""
-    audio_formats = [f for f in formats 
-                    if f.get('acodec') != 'none' 
-                    and f.get('vcodec') == 'none'
-                    and f.get('ext') == 'mp3']
-    return max(audio_formats, key=lambda x: x.get('abr', 0)) if audio_formats else None
-
-def get_all_video_formats(formats: List[Dict]) -> List[Dict]:
-    """Get all unique video formats with audio"""
-    seen = set()
-    unique_formats = []
-    for f in sorted(formats, key=lambda x: x.get('height', 0), reverse=True):
-        if (f.get('vcodec') != 'none' 
-            and f.get('acodec') != 'none'
-            and f.get('height') not in seen):
-            seen.add(f.get('height'))
-            unique_formats.append(f)
-    return unique_formats
+def extract_youtube_info(clean_url: str, query: FormatQuery = DEFAULT_QUERY) -> Dict:
+    """Run yt-dlp and build the response (blocking, runs on the extraction pool)"""
+    # Configure yt-dlp
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': False,
+        'noplaylist': True,  # watch?v=…&list=… is the video; whole lists go through /playlist
+        'allowed_extractors': EXTRACTORS,
+    }
+
+    # Extract video info
+    try:
+        with ydl_pool.lease(ydl_opts) as ydl:
+            with metrics.stage("extract_info"):
+                info = ydl.extract_info(clean_url, download=False)
+            if not info:
+                raise HTTPException(status_code=404, detail="Video not found")
+    except yt_dlp.utils.DownloadError as e:
+        error_msg = str(e)
+        if "Private video" in error_msg:
+            raise HTTPException(status_code=403, detail="Private video - Login required")
+        if "Video unavailable" in error_msg:
+            raise HTTPException(status_code=404, detail="Video unavailable")
+        raise HTTPException(status_code=400, detail=error_msg)
+
+    extracted = collect(info)
+    del info
+
+    # Prepare response
+    response = {
+        "title": extracted.title or 'YouTube Video',
+        "thumbnail": extracted.thumbnail,
+        "duration": extracted.duration,
+        "formats": {
+            "audio": None,
+            "videos": [],
+            "merged": []
+        }
+    }
+
+    # 1. MP3 converted server-side from the best audio-only stream
+    audio = best_audio(extracted.formats, query)
+    if audio:
+        response['formats']['audio'] = {
+            "url": audio_link(clean_url),
+            "format": "mp3",
+            "bitrate": f"{DEFAULT_BITRATE}kbps",
+            "source_url": audio.url,
+            "source_format": audio.ext,
+        }
+
+    # 2. Video+audio formats (progressive files and HLS), one per height
+    for fmt in videos(extracted.formats, query):
+        response['formats']['videos'].append({
+            "url": fmt.url,
+            "quality": f"{fmt.height}p",
+            "format": fmt.ext or 'mp4',
+            "fps": fmt.fps or 30
+        })
+
+    # 3. Higher qualities only exist as separate DASH video + audio: offer server-side merges
+    response['formats']['merged'] = merge_candidates(clean_url, extracted.formats, query)
+
+    if not response['formats']['audio'] and not response['formats']['videos'] and not response['formats']['merged']:
+        raise HTTPException(status_code=404, detail="No playable formats found")
+
+    return response
 
 @router.get("/download")
-async def download_youtube(url: str):
+async def download_youtube(url: str, query: FormatQuery = Depends(format_query)):
     """Get YouTube video with all formats"""
     try:
         # Clean and validate URL
         clean_url = sanitize_youtube_url(url)
-        if not any(x in clean_url for x in ["youtube.com/", "youtu.be/"]):
-            raise HTTPException(status_code=400, detail="Invalid YouTube URL")
-
-        # Configure yt-dlp
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': False,
-        }
+        registry.validate(clean_url, "youtube", "Invalid YouTube URL")
+        if is_playlist_url(clean_url):
+            raise not_a_video(clean_url)
 
-        # Extract video info
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(clean_url, download=False)
-                if not info:
-                    raise HTTPException(status_code=404, detail="Video not found")
-        except yt_dlp.utils.DownloadError as e:
-            error_msg = str(e)
-            if "Private video" in error_msg:
-                raise HTTPException(status_code=403, detail="Private video - Login required")
-            if "Video unavailable" in error_msg:
-                raise HTTPException(status_code=404, detail="Video unavailable")
-            raise HTTPException(status_code=400, detail=error_msg)
-
-        # Prepare response
-        response = {
-            "title": info.get('title', 'YouTube Video'),
-            "thumbnail": info.get('thumbnail'),
-            "duration": info.get('duration'),
-            "formats": {
-                "audio": None,
-                "videos": []
-            }
-        }
-
-        formats = info.get('formats', [])
-        
-        # 1. Get best MP3 audio
-        best_mp3 = get_best_mp3(formats)
-        if best_mp3:
-            response['formats']['audio'] = {
-                "url": best_mp3['url'],
-                "format": "mp3",
-                "bitrate": f"{best_mp3.get('abr', 0)}kbps"
-            }
-
-        # 2. Get all video formats with audio
-        video_formats = get_all_video_formats(formats)
-        for fmt in video_formats:
-            response['formats']['videos'].append({
-                "url": fmt['url'],
-                "quality": f"{fmt.get('height', 0)}p",
-                "format": fmt.get('ext', 'mp4'),
-                "fps": fmt.get('fps', 30)
-            })
-
-        if not response['formats']['audio'] and not response['formats']['videos']:
-            raise HTTPException(status_code=404, detail="No playable formats found")
-
-        return response
+        return await extract("youtube", clean_url, partial(extract_youtube_info, query=query), query.variant())
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Failed to process video")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to process video")
+
+registry.register("youtube", ("youtube.com", "youtu.be", "youtube-nocookie.com"), EXTRACTORS, download_youtube)
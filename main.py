@@ -1,7 +1,31 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from downloaders import instagram, facebook, twitter, vimeo, youtube, dailymotion, tubidy, linkedin, reddit # 👈 Facebook router bhi import karo
+from downloaders import executor, cache, singleflight, batch, registry, ydl_pool, metrics, stream, merge, audio, cookies, ratelimit, prewarm, jobs, warmup, playlist, preview, negative, deadline, hedging, thumbnail
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # ✅ Heavy imports (yt-dlp + extractors, requests, ffmpeg) load in the background; /ready flips when done
+    if warmup.WARMUP_ENABLED:
+        warmup.warmup.start()
+    # ✅ Background refresh of hot entries (and PREWARM_URLS) before their URLs expire
+    if prewarm.PREWARM_ENABLED:
+        prewarm.prewarmer.start(prewarm.startup_urls())
+    # ✅ Workers for POST /jobs (interactive jobs ahead of batch ones)
+    jobs.runner.start()
+    yield
+    await jobs.runner.stop()
+    await prewarm.prewarmer.stop()
+    await stream.close_client()
+    # ✅ Close warm YoutubeDL instances, then write each account's cookies back once
+    ydl_pool.close_all()
+    cookies.manager.save_all()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=metrics.TimedJSONResponse)
+# ✅ Every request gets a deadline that extraction, size probes and HTML fallbacks honour
+app.add_middleware(deadline.DeadlineMiddleware)
 
 # ✅ Include routers
 app.include_router(instagram.router)
@@ -13,6 +37,26 @@ app.include_router(dailymotion.router)
 app.include_router(tubidy.router)
 app.include_router(linkedin.router)
 app.include_router(reddit.router)
+app.include_router(executor.router)
+app.include_router(cache.router)
+app.include_router(singleflight.router)
+app.include_router(batch.router)
+app.include_router(registry.router)
+app.include_router(ydl_pool.router)
+app.include_router(metrics.router)
+app.include_router(stream.router)
+app.include_router(merge.router)
+app.include_router(audio.router)
+app.include_router(cookies.router)
+app.include_router(ratelimit.router)
+app.include_router(prewarm.router)
+app.include_router(jobs.router)
+app.include_router(warmup.router)
+app.include_router(playlist.router)
+app.include_router(preview.router)
+app.include_router(negative.router)
+app.include_router(hedging.router)
+app.include_router(thumbnail.router)
 
 
 @app.get("/")
@@ -0,0 +1,33 @@
+import asyncio
+
+from downloaders import audio, youtube  # noqa: F401 (registers the platform)
+from downloaders.cache import canonical_key
+from downloaders.diskcache import DiskCache, PinnedFileResponse, content_key
+
+
+def test_cached_conversion_is_pinned_while_sent(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), 10_000)
+    monkeypatch.setattr(audio, "audio_cache", cache)
+    url = "https://www.youtube.com/watch?v=audiotest01"
+    key = content_key(*canonical_key(url), "mp3", audio.DEFAULT_BITRATE)
+    out, tmp = cache.open_temp(key)
+    with out:
+        out.write(b"ID3" + b"\0" * 100)
+    path = cache.commit(key, "mp3", tmp)
+    sent = []
+
+    async def receive():
+        await asyncio.Event().wait()  # the client never disconnects
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            sent.append(cache._pins.get(path))  # still pinned while the body goes out
+
+    async def scenario():
+        response = await audio.audio(url=url, codec="mp3", bitrate=audio.DEFAULT_BITRATE)
+        assert isinstance(response, PinnedFileResponse)
+        await response({"type": "http", "method": "GET", "headers": []}, receive, send)
+
+    asyncio.run(scenario())
+    assert sent and all(count == 1 for count in sent)
+    assert path not in cache._pins
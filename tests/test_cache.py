@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+from downloaders.cache import TTLCache, canonical_key
+
+
+def test_ttl_cache_expiry():
+    cache = TTLCache(4)
+    cache.set("a", 1, 0.05)
+    assert cache.get("a") == 1
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    cache.set("b", 2, 0)  # non-positive TTL isn't stored
+    assert cache.get("b") is None
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    assert cache.get("a") == 1  # b is now the oldest
+    cache.set("c", 3, 60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+@pytest.mark.parametrize("url, key", [
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42s", ("youtube", "dQw4w9WgXcQ")),
+    ("https://youtu.be/dQw4w9WgXcQ?si=tracking", ("youtube", "dQw4w9WgXcQ")),
+    ("https://m.youtube.com/shorts/dQw4w9WgXcQ", ("youtube", "dQw4w9WgXcQ")),
+    ("https://www.instagram.com/reel/Cabc123/?igsh=x", ("instagram", "Cabc123")),
+    ("https://www.instagram.com/someone/p/Cabc123/", ("instagram", "Cabc123")),
+    ("https://www.facebook.com/watch/?v=1234567890", ("facebook", "1234567890")),
+    ("https://www.facebook.com/page/videos/1234567890/", ("facebook", "1234567890")),
+    ("https://www.reddit.com/r/videos/comments/abc123/title/", ("reddit", "abc123")),
+    ("https://v.redd.it/abc123", ("reddit", "abc123")),
+    ("https://x.com/user/status/1234567890", ("twitter", "1234567890")),
+    ("https://twitter.com/user/status/1234567890?s=20", ("twitter", "1234567890")),
+    ("https://vimeo.com/channels/staff/76979871", ("vimeo", "76979871")),
+    ("https://dai.ly/x8abc12", ("dailymotion", "x8abc12")),
+])
+def test_canonical_key_known_sites(url, key):
+    assert canonical_key(url) == key
+
+
+def test_canonical_key_unknown_site_drops_query_and_www():
+    assert canonical_key("https://www.Example.com/clips/1/?utm_source=x#t") == ("example.com", "/clips/1")
+    assert canonical_key("https://example.com/clips/1") == ("example.com", "/clips/1")
@@ -0,0 +1,166 @@
+import asyncio
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from downloaders.cache import TTLCache
+from downloaders.cache_backends import RedisCache, TieredCache, dumps, loads
+
+
+class FakeRedis(socketserver.ThreadingTCPServer):
+    """Just enough of a Redis server for RedisCache: GET, SET … PX, DEL, DBSIZE"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeRedisHandler)
+        self.data = {}  # key → (value, expires_at or None)
+        self.commands = []
+
+    @property
+    def url(self):
+        return "redis://127.0.0.1:%d/0" % self.server_address[1]
+
+    def lookup(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and time.monotonic() >= expires_at:
+            self.data.pop(key, None)
+            return None
+        return value
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        assert line.startswith(b"*")
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        server = self.server
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            name = args[0].decode().upper()
+            server.commands.append(name)
+            if name == "GET":
+                value = server.lookup(args[1])
+                reply = b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+            elif name == "SET":
+                expires_at = None
+                if len(args) >= 5 and args[3].upper() == b"PX":
+                    expires_at = time.monotonic() + int(args[4]) / 1000
+                server.data[args[1]] = (args[2], expires_at)
+                reply = b"+OK\r\n"
+            elif name == "DEL":
+                removed = sum(server.data.pop(key, None) is not None for key in args[1:])
+                reply = b":%d\r\n" % removed
+            elif name == "DBSIZE":
+                reply = b":%d\r\n" % len(server.data)
+            else:
+                reply = b"-ERR unknown command\r\n"
+            self.wfile.write(reply)
+
+
+@pytest.fixture
+def redis_server():
+    server = FakeRedis()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_serialization_round_trip():
+    small = {"title": "clip", "formats": [{"height": 720, "url": "https://x/1"}]}
+    large = {"description": "x" * 10_000}
+    for value in (small, large, [1, 2, 3], "text"):
+        assert loads(dumps(value)) == value
+    assert len(dumps(large)) < 10_000  # compressed past the threshold
+
+
+def test_redis_get_set_delete(redis_server):
+    cache = RedisCache(redis_server.url)
+    key = ("youtube", "abc")
+    value = {"title": "clip", "formats": [{"height": 1080}], "unicode": "ünï"}
+
+    assert cache.get(key) is None
+    cache.set(key, value, 60)
+    assert cache.get(key) == value
+    assert len(cache) == 1
+    cache.delete(key)
+    assert cache.get(key) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_redis_ttl(redis_server):
+    cache = RedisCache(redis_server.url)
+    cache.set("short", "value", 0.05)
+    assert cache.get("short") == "value"
+    time.sleep(0.1)
+    assert cache.get("short") is None
+    cache.set("never", "value", 0)  # zero TTL isn't stored at all
+    assert "never" not in {k.decode().split(":", 1)[-1] for k in redis_server.data}
+
+
+def test_redis_down_is_a_miss_and_backs_off():
+    cache = RedisCache(f"redis://127.0.0.1:{free_port()}/0", timeout=0.1, retry_seconds=60)
+    assert cache.get("k") is None
+    cache.set("k", "v", 60)
+    cache.delete("k")
+    assert cache.stats()["errors"] == 3
+    # Only the first call tried to connect; the rest missed without touching the network
+    assert cache._down_until > time.monotonic()
+
+
+def test_redis_reconnects_after_backoff(redis_server):
+    cache = RedisCache(redis_server.url, retry_seconds=0)
+    cache.set("k", "v", 60)
+    cache._close()  # connection dropped between calls
+    assert cache.get("k") == "v"
+
+
+def test_tiered_cache_async_interface(redis_server):
+    cache = TieredCache(TTLCache(16), RedisCache(redis_server.url), local_ttl=5)
+
+    async def scenario():
+        await cache.aset("k", {"a": 1}, 60)
+        cache.local.clear()
+        assert await cache.aget("k") == {"a": 1}  # from Redis
+        gets = redis_server.commands.count("GET")
+        assert await cache.aget("k") == {"a": 1}  # now from the local tier
+        assert redis_server.commands.count("GET") == gets
+        await cache.adelete("k")
+        assert await cache.aget("k") is None
+
+    asyncio.run(scenario())
+
+
+def test_tiered_cache_falls_back_when_redis_is_down():
+    shared = RedisCache(f"redis://127.0.0.1:{free_port()}/0", timeout=0.1)
+    cache = TieredCache(TTLCache(16), shared, local_ttl=5)
+
+    async def scenario():
+        await cache.aset("k", "v", 60)
+        assert await cache.aget("k") == "v"  # the local tier still works
+        assert await cache.aget("missing") is None
+
+    asyncio.run(scenario())
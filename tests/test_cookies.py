@@ -0,0 +1,48 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from downloaders import cookies
+
+COOKIE = "# Netscape HTTP Cookie File\n.example.com\tTRUE\t/\tTRUE\t2147483647\tsessionid\tabc\n"
+
+
+def manager(tmp_path, *names):
+    directory = tmp_path / "cookies"
+    directory.mkdir()
+    for name in names:
+        (directory / f"{name}.txt").write_text(COOKIE)
+    return cookies.CookieManager(str(tmp_path / "none.txt"), str(directory))
+
+
+def test_no_cookie_files_runs_anonymous(tmp_path):
+    m = manager(tmp_path)
+    assert m.acquire() is None
+    assert m.anonymous == 1
+
+
+def test_exhausted_accounts_get_503_instead_of_anonymous(tmp_path, monkeypatch):
+    monkeypatch.setattr(cookies, "ACCOUNT_WAIT", 0.05)
+    m = manager(tmp_path, "a")
+    m.refresh(force=True)
+    account = m._accounts["a"]
+    account.tokens = 0
+    with pytest.raises(HTTPException) as e:
+        m.acquire()
+    assert e.value.status_code == 503
+    assert int(e.value.headers["Retry-After"]) >= 1
+    assert m.exhausted == 1 and m.anonymous == 0
+
+
+def test_queued_request_waits_for_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(cookies, "ACCOUNT_WAIT", 1)
+    m = manager(tmp_path, "a")
+    m.refresh(force=True)
+    account = m._accounts["a"]
+    account.rate = 10.0  # one token every 0.1 s
+    account.tokens = 0
+    started = time.monotonic()
+    assert m.acquire() is account
+    assert 0.05 < time.monotonic() - started < 0.5
+    assert m.queued == 1 and m.exhausted == 0
@@ -0,0 +1,85 @@
+import asyncio
+import contextvars
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from downloaders import deadline, extraction, hedging
+from downloaders.cache import extraction_cache
+
+
+def test_for_item_renews_the_request_budget():
+    async def scenario():
+        deadline.set_current(deadline.Deadline(time.monotonic() + 0.1, budget=8))
+        return deadline.for_item()
+
+    item = asyncio.run(scenario())
+    assert item.budget == 8
+    assert 7.5 < item.remaining() <= 8
+
+
+def test_short_leader_deadline_does_not_cut_the_shared_extraction():
+    url = "https://www.youtube.com/watch?v=dlshared001"
+    seen = []
+
+    def slow(u):
+        seen.append(deadline.current().remaining())
+        time.sleep(0.3)
+        return {"title": "ok"}
+
+    async def request(seconds):
+        deadline.set_current(deadline.Deadline.after(seconds))
+        return await extraction.extract("youtube", url, slow)
+
+    async def scenario():
+        leader = asyncio.ensure_future(request(0.1))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(request(5))
+        with pytest.raises(HTTPException) as info:
+            await leader
+        assert info.value.status_code == 504
+        return await follower
+
+    assert asyncio.run(scenario()) == {"title": "ok"}
+    assert seen[0] > deadline.REQUEST_DEADLINE - 1  # the shared task ran under the default deadline
+
+
+def test_results_finished_past_the_deadline_are_not_cached(monkeypatch):
+    key = ("youtube", "dlexpired01")
+
+    async def finishes_late(platform, func, url):
+        deadline.current().cancel()  # as if the probes ran out of time
+        return {"title": "partial"}
+
+    monkeypatch.setattr(hedging, "run", finishes_late)
+
+    async def scenario():
+        deadline.set_current(deadline.Deadline.after(5))
+        return await extraction._run(key, "https://youtu.be/dlexpired01", None)
+
+    assert asyncio.run(scenario()) == {"title": "partial"}
+    assert extraction_cache.get(key) is None
+
+
+def test_latency_tracks_successful_attempts_only(monkeypatch):
+    tracker = hedging.LatencyTracker()
+    monkeypatch.setattr(hedging, "latency", tracker)
+
+    def attempt(*args):
+        # As on a pool thread: in a context copy, so the attempt's contextvars don't leak
+        return contextvars.copy_context().run(hedging._attempt, *args)
+
+    def fail(url):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        attempt("p", None, hedging.PRIMARY, fail, "u")
+    attempt("p", None, hedging.PRIMARY, lambda u: {"error": "nope"}, "u")
+    loser = deadline.Deadline.after(5)
+    loser.cancel()
+    attempt("p", loser, hedging.HEDGE, lambda u: {"title": "late"}, "u")
+    assert tracker.stats() == {}
+
+    attempt("p", deadline.Deadline.after(5), hedging.PRIMARY, lambda u: {"title": "ok"}, "u")
+    assert tracker.stats()["p"]["samples"] == 1
@@ -0,0 +1,51 @@
+from downloaders.formats import FormatQuery, FormatRecord, best_audio, playable, videos
+
+
+def fmt(format_id, height=0, vcodec="avc1", acodec="mp4a", ext="mp4", protocol="https", tbr=0.0, abr=0.0):
+    return FormatRecord(url=f"https://cdn/{format_id}", format_id=format_id, ext=ext, protocol=protocol,
+                        vcodec=vcodec, acodec=acodec, height=height, tbr=tbr, abr=abr)
+
+
+FORMATS = [
+    fmt("a1", vcodec="none", abr=48),
+    fmt("a2", vcodec="none", ext="webm", acodec="opus", abr=128),
+    fmt("v360", 360, acodec="none"),
+    fmt("18", 360, tbr=500),
+    fmt("18b", 360, ext="webm", vcodec="vp9", tbr=600),
+    fmt("hls-720", 720, protocol="m3u8_native", tbr=2000),
+    fmt("22", 720, tbr=1500),
+    fmt("master", ext="m3u8", vcodec="none", protocol="m3u8_native"),
+]
+
+
+def ids(records):
+    return [f.format_id for f in records]
+
+
+def test_playable_keeps_every_format_in_source_order():
+    assert ids(playable(FORMATS)) == ["18", "18b", "hls-720", "22", "master"]
+    assert ids(playable(FORMATS, manifests=False)) == ["18", "18b", "22"]
+
+
+def test_videos_is_best_per_height_tallest_first():
+    # Same height: a direct file beats a manifest, then higher bitrate wins
+    assert ids(videos(FORMATS)) == ["22", "18b", "master"]
+
+
+def test_query_narrows_the_list():
+    assert ids(playable(FORMATS, FormatQuery(max_height=480))) == ["18", "18b", "master"]
+    assert ids(playable(FORMATS, FormatQuery(prefer="mp4"))) == ["18", "hls-720", "22", "master"]
+    assert ids(videos(FORMATS, FormatQuery(prefer="vp9"))) == ["22", "18b", "master"]
+
+
+def test_best_audio():
+    assert best_audio(FORMATS).format_id == "a2"
+    assert best_audio(FORMATS, FormatQuery(prefer="mp4")).format_id == "a1"
+    assert best_audio(FORMATS, FormatQuery(audio=False)) is None
+
+
+def test_unknown_codecs_count_as_present():
+    unknown = fmt("x", 480, vcodec=None, acodec=None)
+    assert unknown.muxed
+    assert unknown.label() == "480p"
+    assert fmt("y", 0).label() == "y"
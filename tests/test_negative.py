@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from downloaders import deadline, extraction, hedging, ratelimit
+from downloaders.negative import classify
+
+
+@pytest.mark.parametrize("status, message, kind", [
+    (403, "ERROR: [youtube] abc: Private video. Sign in if you've been granted access", "private"),
+    (404, "ERROR: [youtube] abc: Video unavailable", "unavailable"),
+    (404, "This video has been removed by the uploader", "removed"),
+    (400, "Image not found. It may be private or deleted", "not_found"),
+    (404, "There is no video in this post", "no_video"),
+    (400, "No playable formats found", "no_formats"),
+])
+def test_permanent_failures_are_classified(status, message, kind):
+    assert classify(status, message) == kind
+
+
+@pytest.mark.parametrize("status", [408, 429, 502, 503, 504])
+def test_transient_statuses_are_never_cached(status):
+    assert classify(status, "Private video") is None
+
+
+@pytest.mark.parametrize("message", [
+    "Image not found (maybe private or unsupported). Read timed out",
+    "ERROR: [instagram] abc: Requested content is not available, rate-limit reached or login required",
+    "HTTP Error 429: Too Many Requests: video unavailable",
+])
+def test_transient_messages_are_never_cached(message):
+    assert classify(500, message) is None
+
+
+def test_unknown_or_missing_messages_are_not_cached():
+    assert classify(500, "Something else went wrong") is None
+    assert classify(404, None) is None
+    assert classify(404, {"detail": "Private video"}) is None
+
+
+def _extract_twice(url, func):
+    async def request():
+        deadline.set_current(deadline.Deadline.after(5))
+        try:
+            return await extraction.extract("youtube", url, func)
+        except HTTPException as e:
+            return e.status_code, e.detail
+
+    return asyncio.run(request()), asyncio.run(request())
+
+
+def test_permanent_failure_is_recorded_and_replayed():
+    calls = []
+
+    def private(url):
+        calls.append(url)
+        raise HTTPException(status_code=403, detail="Private video")
+
+    first, second = _extract_twice("https://www.youtube.com/watch?v=ngreplay001", private)
+    assert first == second == (403, "Private video")
+    assert len(calls) == 1
+
+
+def test_refused_or_late_attempts_are_not_recorded(monkeypatch):
+    calls = []
+
+    def refused(url):
+        calls.append(url)
+        ratelimit.refused()  # the HTML fallback was skipped by the guard
+        return {"error": "Image not found. It may be private or unsupported."}
+
+    _extract_twice("https://www.youtube.com/watch?v=ngrefused01", refused)
+    assert len(calls) == 2
+
+    async def out_of_time(platform, func, url):
+        calls.append(url)
+        deadline.current().cancel()
+        return {"error": "Image not found. It may be private or unsupported."}
+
+    monkeypatch.setattr(hedging, "run", out_of_time)
+    _extract_twice("https://www.youtube.com/watch?v=ngexpired01", None)
+    assert len(calls) == 4
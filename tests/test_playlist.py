@@ -0,0 +1,89 @@
+import asyncio
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from downloaders import playlist
+from downloaders.playlist import decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("offset", [0, 1, 50, 10_000])
+def test_cursor_round_trip(offset):
+    cursor = encode_cursor(offset)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == offset
+
+
+def test_missing_cursor_is_the_first_page():
+    assert decode_cursor(None) == 0
+    assert decode_cursor("") == 0
+
+
+def _raw(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    _raw("garbage"),
+    _raw('{"x": 5}'),
+    _raw('{"o": -1}'),
+    _raw('{"o": "5"}'),
+    _raw('{"o": 1.5}'),
+    _raw("[1, 2]"),
+    encode_cursor(20)[:-2],
+])
+def test_tampered_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as info:
+        decode_cursor(cursor)
+    assert info.value.status_code == 400
+
+
+def _fake_fetch_page(calls, total, fail_at=None):
+    def fetch_page(url, platform, offset, limit):
+        calls.append((offset, limit))
+        if fail_at is not None and offset >= fail_at:
+            raise HTTPException(status_code=503, detail="busy")
+        entries = [{"index": i, "url": f"https://example.com/v/{i}"}
+                   for i in range(offset, min(total, offset + limit + 1))]
+        return {"id": "list", "title": "List", "offset": offset, "entries": entries[:limit],
+                "next_cursor": encode_cursor(offset + limit) if len(entries) > limit else None}
+    return fetch_page
+
+
+def _stream(monkeypatch, limit, total, fail_at=None):
+    calls = []
+    monkeypatch.setattr(playlist, "fetch_page", _fake_fetch_page(calls, total, fail_at))
+    monkeypatch.setattr(playlist, "PLAYLIST_STREAM_CHUNK", 10)
+    url = "https://example.com/list"
+
+    async def scenario():
+        first = await playlist.fetch_chunk(url, "youtube", 0, min(playlist.PLAYLIST_STREAM_CHUNK, limit))
+        return [json.loads(line) async for line in
+                playlist.stream_entries(url, "youtube", first, 0, limit, False, None)]
+
+    return calls, asyncio.run(scenario())
+
+
+def test_ndjson_pulls_fixed_size_chunks(monkeypatch):
+    calls, lines = _stream(monkeypatch, limit=100, total=25)
+    assert calls == [(0, 10), (10, 10), (20, 10)]
+    assert lines[0] == {"type": "playlist", "id": "list", "title": "List"}
+    assert [line["index"] for line in lines[1:-1]] == list(range(25))
+    assert lines[-1] == {"type": "end", "next_cursor": None}
+
+
+def test_ndjson_stops_at_limit_with_a_cursor(monkeypatch):
+    calls, lines = _stream(monkeypatch, limit=15, total=25)
+    assert calls == [(0, 10), (10, 5)]
+    assert len(lines) == 17
+    assert decode_cursor(lines[-1]["next_cursor"]) == 15
+
+
+def test_ndjson_failed_chunk_ends_with_a_resume_cursor(monkeypatch):
+    _, lines = _stream(monkeypatch, limit=100, total=50, fail_at=20)
+    assert len(lines) == 22
+    assert lines[-1]["status"] == 503
+    assert decode_cursor(lines[-1]["next_cursor"]) == 20
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from downloaders import preview, ratelimit, youtube  # noqa: F401 (registers the platform)
+
+
+def test_parse_duration():
+    assert preview.parse_duration("183") == 183.0
+    assert preview.parse_duration("PT3M3S") == 183.0
+    assert preview.parse_duration("P1DT1H") == 90000.0
+    assert preview.parse_duration("soon") is None
+    assert preview.parse_duration(None) is None
+
+
+def test_parse_fields():
+    assert preview.parse_fields(None) == preview.DEFAULT_FIELDS
+    assert preview.parse_fields("uploader, title") == ("title", "uploader")
+    with pytest.raises(HTTPException):
+        preview.parse_fields("title,bogus")
+
+
+def test_one_token_per_preview_and_cache_hits_say_so(monkeypatch):
+    admits, fetches = [], []
+    admit = ratelimit.UpstreamGuard.admit
+    monkeypatch.setattr(ratelimit.UpstreamGuard, "admit", lambda self: admits.append(self.family) or admit(self))
+
+    def fetch_meta(url, admit=True):
+        fetches.append(admit)
+        return {"og:title": "Title", "og:image": "https://i.ytimg.com/vi/x/hq.jpg", "og:video:duration": "PT1M"}
+    monkeypatch.setattr(preview, "fetch_meta", fetch_meta)
+
+    async def scenario():
+        url = "https://www.youtube.com/watch?v=prevtest001"
+        return await preview.preview(url), await preview.preview(url)
+
+    first, second = asyncio.run(scenario())
+    assert first == {"title": "Title", "thumbnail": "https://i.ytimg.com/vi/x/hq.jpg", "duration": 60.0,
+                     "source": "og"}
+    assert second == {**first, "source": "cache"}
+    assert admits == ["youtube"]
+    assert fetches == [False]
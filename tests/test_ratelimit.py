@@ -0,0 +1,48 @@
+import pytest
+
+from downloaders import ratelimit
+from downloaders.cookies import is_login_wall
+from downloaders.metrics import classify_error
+
+PRIVATE = ("ERROR: [youtube] abc: Private video. Sign in if you've been granted access to this video. "
+           "Use --cookies-from-browser or --cookies for the authentication.")
+
+
+@pytest.mark.parametrize("message, kind", [
+    (PRIVATE, "private"),
+    ("ERROR: [youtube] abc: Video unavailable. This video has been removed by the uploader", "unavailable"),
+    ("HTTP Error 429: Too Many Requests", "rate_limited"),
+    ("Instagram: rate-limit reached or login required", "rate_limited"),
+    ("ERROR: [instagram] abc: Requested content is not available, login required", "login_required"),
+    ("Read timed out", "timeout"),
+])
+def test_classify_error(message, kind):
+    assert classify_error(message) == kind
+
+
+def test_only_throttling_slows_the_upstream():
+    guard = ratelimit.UpstreamGuard("test", 60)
+    for _ in range(ratelimit.FAILURE_THRESHOLD + 1):
+        guard.record(PRIVATE)
+    assert guard.state == ratelimit.CLOSED
+    assert guard.rate == guard.base_rate
+
+    guard.record("HTTP Error 429: Too Many Requests")
+    assert guard.rate == guard.base_rate / 2
+
+
+def test_per_url_errors_are_not_login_walls():
+    assert not is_login_wall(PRIVATE)
+    assert not is_login_wall("Video unavailable. Sign in to continue")
+    assert is_login_wall("checkpoint_required")
+    assert is_login_wall("You must log in to view this content")
+
+
+@pytest.mark.parametrize("url, family", [
+    ("https://instagr.am/p/abc/", "instagram"),
+    ("https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ", "youtube"),
+    ("https://v.redd.it/abc", "v.redd.it"),
+    ("https://old.reddit.com/r/x/comments/abc/", "reddit"),
+])
+def test_guard_for_host_aliases(url, family):
+    assert ratelimit.guard_for(url).family == family
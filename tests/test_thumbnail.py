@@ -0,0 +1,101 @@
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from downloaders import thumbnail
+from downloaders.diskcache import DiskCache
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, body=b""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.body = body
+        self.closed = False
+
+    @property
+    def is_redirect(self):
+        return self.status_code in (301, 302, 303, 307, 308) and "Location" in self.headers
+
+    def iter_content(self, size):
+        yield self.body
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.requested = []
+
+    def get(self, url, allow_redirects=True, **kwargs):
+        assert allow_redirects is False
+        self.requested.append(url)
+        return self.responses[url]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), 10_000)
+    monkeypatch.setattr(thumbnail, "thumb_cache", cache)
+    return cache
+
+
+def test_bucket_and_allowed_hosts():
+    assert thumbnail.bucket(100) == 120
+    assert thumbnail.bucket(721) is None
+    assert thumbnail.allowed("https://i.ytimg.com/vi/x/hq.jpg")
+    assert not thumbnail.allowed("https://evilytimg.com/x.jpg")
+    assert not thumbnail.allowed("file:///etc/passwd")
+
+
+def test_redirects_stay_on_allowed_hosts(cache, monkeypatch):
+    start = "https://i.ytimg.com/vi/x/hq.jpg"
+    session = FakeSession({
+        start: FakeResponse(302, {"Location": "https://yt3.ggpht.com/x.jpg"}),
+        "https://yt3.ggpht.com/x.jpg": FakeResponse(200, {"Content-Type": "image/jpeg"}, b"jpeg"),
+    })
+    monkeypatch.setattr(thumbnail, "get_session", lambda: session)
+    meta = thumbnail.fetch(start, "k" * 64, None)
+    assert meta["ext"] == "jpg"
+    assert session.requested == [start, "https://yt3.ggpht.com/x.jpg"]
+
+
+def test_redirect_off_the_allowed_hosts_is_refused(cache, monkeypatch):
+    start = "https://i.ytimg.com/vi/x/hq.jpg"
+    session = FakeSession({start: FakeResponse(302, {"Location": "http://169.254.169.254/latest/meta-data"})})
+    monkeypatch.setattr(thumbnail, "get_session", lambda: session)
+    with pytest.raises(HTTPException) as info:
+        thumbnail.fetch(start, "k" * 64, None)
+    assert info.value.status_code == 502
+    assert session.requested == [start]
+
+
+def _write(cache, key, size):
+    out, tmp = cache.open_temp(key)
+    with out:
+        out.write(b"x" * size)
+    return cache.commit(key, "bin", tmp)
+
+
+def test_pinned_files_survive_eviction(tmp_path):
+    cache = DiskCache(str(tmp_path), 250)
+    first = _write(cache, "a" * 64, 100)
+    assert cache.pin(first)
+    _write(cache, "b" * 64, 100)
+    _write(cache, "c" * 64, 100)  # over budget: the oldest unpinned file goes instead
+    assert os.path.exists(first)
+    assert cache.get("b" * 64, "bin") is None
+
+    cache.unpin(first)
+    _write(cache, "d" * 64, 100)
+    assert not os.path.exists(first)
+    assert not cache.pin(first)